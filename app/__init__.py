@@ -5,20 +5,21 @@ Contains application main instances and configurations.
 """
 
 from flask import Flask, redirect
-from flask_bcrypt import Bcrypt
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_restful import Api
 from flask_sqlalchemy import SQLAlchemy
 from app.conf import app_config, settings
+from app.core.serializers import JSONEncoder, output_json
 
 
 APP = Flask(__name__)
 CORS(APP)
-bcrypt = Bcrypt(APP)
 APP.config.from_object(app_config.DevelopmentConfig)
-DB = SQLAlchemy(APP)
+APP.json_encoder = JSONEncoder
+DB = SQLAlchemy(APP, session_options={'expire_on_commit': False})
 API = Api(APP, prefix="/api/v1.0/")
+API.representation('application/json')(output_json)
 JWT = JWTManager(APP)
 
 from app.auth import security
@@ -29,6 +30,8 @@ from . import errors
 APP.register_blueprint(auth_blueprint)
 APP.register_blueprint(SHOPPINGLIST)
 
+security.start_blacklist_compactor(APP)
+
 
 @APP.route('/')
 def index():
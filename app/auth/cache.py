@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+In-process caches that sit in front of the token blacklist and users tables.
+
+Revoked token ids are kept in an exact set until the token they belong to expires.
+Token ids that were found to be valid are kept in a bounded LRU for a short time,
+this way a token revoked by another process is picked up once its entry goes stale.
+
+The username and token version of users are kept the same way, versions bumped
+by this process are written through, versions bumped by another process are
+picked up once the entry goes stale.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class BlacklistCache(object):
+    """
+    Bounded cache of known-good and revoked token ids(jti).
+    """
+
+    def __init__(self, max_size, ttl, clock=time.time):
+        """
+        :param max_size: maximum number of known-good jtis to remember.
+        :param ttl: seconds a known-good jti is trusted before the database is asked again.
+        :param clock: callable returning current time in seconds since epoch.
+        """
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._valid = OrderedDict()
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, jti):
+        """
+        Check cached state of a token id.
+
+        :param jti: token id.
+        :return: True if revoked, False if known to be valid and None if unknown.
+        """
+
+        now = self.clock()
+
+        with self._lock:
+            if jti in self._revoked:
+                expires = self._revoked[jti]
+                if expires is None or expires > now:
+                    return True
+
+                del self._revoked[jti]
+                return None
+
+            expires = self._valid.get(jti)
+            if expires is None:
+                return None
+
+            if expires <= now:
+                del self._valid[jti]
+                return None
+
+            self._valid.move_to_end(jti)
+            return False
+
+    def mark_valid(self, jti, expires=None):
+        """
+        Remember that a token id is not blacklisted.
+
+        :param jti: token id.
+        :param expires: token expiry time, entries never outlive it.
+        """
+
+        stale_at = self.clock() + self.ttl
+        if expires is not None:
+            stale_at = min(stale_at, expires)
+
+        with self._lock:
+            if jti in self._revoked:
+                return
+
+            self._valid[jti] = stale_at
+            self._valid.move_to_end(jti)
+
+            while len(self._valid) > self.max_size:
+                self._valid.popitem(last=False)
+
+    def mark_revoked(self, jti, expires=None):
+        """
+        Remember that a token id is blacklisted until its token expires.
+
+        :param jti: token id.
+        :param expires: token expiry time, None keeps the entry forever.
+        """
+
+        now = self.clock()
+
+        with self._lock:
+            self._valid.pop(jti, None)
+            self._revoked[jti] = expires
+
+            # expired tokens are rejected before the blacklist is consulted,
+            # dropping them keeps the exact set bounded by the token lifetime.
+            if len(self._revoked) > self.max_size:
+                self._revoked = {
+                    key: value for key, value in self._revoked.items()
+                    if value is None or value > now}
+
+    def clear(self):
+        """
+        Forget every cached token id.
+        """
+
+        with self._lock:
+            self._valid.clear()
+            self._revoked.clear()
+
+
+class UserVersionCache(object):
+    """
+    Bounded cache of the username and token version of users, by user id.
+    """
+
+    def __init__(self, max_size, ttl, clock=time.time):
+        """
+        :param max_size: maximum number of users to remember.
+        :param ttl: seconds an entry is trusted before the database is asked again.
+        :param clock: callable returning current time in seconds since epoch.
+        """
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, user_id):
+        """
+        Check cached username and version of a user.
+
+        :param user_id: user id.
+        :return: (username, version) tuple or None if unknown.
+        """
+
+        now = self.clock()
+
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+
+            if entry[0] <= now:
+                del self._users[user_id]
+                return None
+
+            self._users.move_to_end(user_id)
+            return entry[1]
+
+    def remember(self, user_id, username, version):
+        """
+        Remember current username and version of a user.
+
+        :param user_id: user id.
+        :param username: user username.
+        :param version: user token version.
+        """
+
+        stale_at = self.clock() + self.ttl
+
+        with self._lock:
+            self._users[user_id] = (stale_at, (username, version))
+            self._users.move_to_end(user_id)
+
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+
+    def forget(self, user_id):
+        """
+        Forget a user, the database is asked on next lookup.
+
+        :param user_id: user id.
+        """
+
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        """
+        Forget every cached user.
+        """
+
+        with self._lock:
+            self._users.clear()
@@ -3,29 +3,258 @@
 This module provides functions that handles user authentication and authorization.
 """
 
+import functools
 import secrets
-from app import JWT
+import threading
+from datetime import datetime
+
+import pytz
+from flask import g, jsonify, make_response
+from flask_jwt_extended import get_jwt_claims, get_jwt_identity
+from sqlalchemy import event
+
+from app import DB, JWT
+from app.conf.settings import (BLACKLIST_CACHE_SIZE, BLACKLIST_CACHE_TTL,
+                               BLACKLIST_COMPACTION_BATCH, USER_VERSION_CACHE_SIZE,
+                               USER_VERSION_CACHE_TTL)
+from app.core.loggers import AppLogger
+from app.db.base import on_commit
+from app.messages import user_not_found
+from .cache import BlacklistCache, UserVersionCache
 from ..models import BlacklistToken, ResetToken, User
 
+blacklist_cache = BlacklistCache(BLACKLIST_CACHE_SIZE, BLACKLIST_CACHE_TTL)
+user_versions = UserVersionCache(USER_VERSION_CACHE_SIZE, USER_VERSION_CACHE_TTL)
+
 
 @JWT.token_in_blacklist_loader
 def check_if_token_in_blacklist(decrypted_token):
     """
-    Checks if token is stored in blacklist model.
+    Checks if token is stored in blacklist model, the blacklist cache
+    is consulted first so that most requests never reach the database.
     :param decrypted_token: auth token.
     :return: True|False
     """
 
     jti = decrypted_token['jti']
-    token = BlacklistToken.query.filter_by(token=jti).first()
+    expires = decrypted_token.get('exp')
 
-    if token:
+    revoked = blacklist_cache.lookup(jti)
+
+    if revoked is not None:
+        return revoked
+
+    if BlacklistToken.is_blacklisted(jti):
+        blacklist_cache.mark_revoked(jti, expires)
         return True
 
     else:
+        blacklist_cache.mark_valid(jti, expires)
         return False
 
 
+def blacklist_token(decrypted_token):
+    """
+    Stores token in blacklist model, the blacklist cache is updated once the
+    token is committed.
+    :param decrypted_token: auth token.
+    """
+
+    jti = decrypted_token['jti']
+    exp = decrypted_token.get('exp')
+    expires = datetime.fromtimestamp(exp, tz=pytz.utc) if exp is not None else None
+
+    BlacklistToken(token=jti, expires=expires).save()
+    on_commit(functools.partial(blacklist_cache.mark_revoked, jti, exp))
+
+
+def purge_blacklist(app, batch_size=BLACKLIST_COMPACTION_BATCH):
+    """
+    Deletes expired tokens from blacklist model.
+
+    :param app: flask application.
+    :param batch_size: maximum number of rows deleted per statement.
+    :return: number of deleted tokens.
+    """
+
+    with app.app_context():
+        return BlacklistToken.purge_expired(
+            batch_size, max_age=app.config['JWT_ACCESS_TOKEN_EXPIRES'])
+
+
+class BlacklistCompactor(threading.Thread):
+    """
+    Background thread that periodically deletes expired blacklisted tokens.
+    """
+
+    def __init__(self, app, interval, batch_size=BLACKLIST_COMPACTION_BATCH):
+        super(BlacklistCompactor, self).__init__(name='blacklist-compactor')
+        self.daemon = True
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                purge_blacklist(self.app, self.batch_size)
+
+            except Exception as e:
+                AppLogger(self.__class__.__name__).logger.warning(e)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def start_blacklist_compactor(app):
+    """
+    Starts blacklist compaction timer if BLACKLIST_COMPACTION_INTERVAL is configured.
+
+    :param app: flask application.
+    :return: compactor thread or None.
+    """
+
+    interval = app.config.get('BLACKLIST_COMPACTION_INTERVAL')
+
+    if not interval:
+        return None
+
+    compactor = BlacklistCompactor(app, interval)
+    compactor.start()
+    return compactor
+
+
+@JWT.user_identity_loader
+def user_identity_lookup(user):
+    """
+    Access tokens are created for user instances, username is kept as the token identity.
+    :param user: user instance or username.
+    :return: username.
+    """
+
+    if isinstance(user, User):
+        return user.username
+
+    return user
+
+
+@JWT.user_claims_loader
+def add_claims_to_access_token(user):
+    """
+    Stores user id and version in access token claims so that requests can
+    filter by owner without looking up the user.
+    :param user: user instance or username.
+    :return: claims.
+    """
+
+    if isinstance(user, User):
+        # the first request made with the token does not have to look the version up.
+        user_versions.remember(user.id, user.username, user.version)
+        return dict(id=user.id, version=user.version)
+
+    return {}
+
+
+@JWT.claims_verification_loader
+def verify_token_version(user_claims):
+    """
+    Rejects tokens of users that no longer exist, changed their username or
+    invalidated their tokens since the token was issued. Versions are read
+    from the user version cache, the database is asked only on a miss.
+    :param user_claims: access token claims.
+    :return: True|False
+    """
+
+    user_id = user_claims.get('id')
+
+    if user_id is None:
+        # tokens issued before user id was stored in claims are checked by `current_user`.
+        return True
+
+    known = user_versions.lookup(user_id)
+
+    if known is None:
+        known = User.get_version(user_id)
+
+        if known is None:
+            return False
+
+        user_versions.remember(user_id, *known)
+
+    # the username guards against ids reused by a later account.
+    return known == (get_jwt_identity(), user_claims.get('version'))
+
+
+@JWT.claims_verification_failed_loader
+def stale_token_response():
+    return make_response(jsonify(dict(message=user_not_found)), 401)
+
+
+def invalidate_tokens(user):
+    """
+    Bumps user version so that every token issued to the user is rejected, the
+    user version cache is updated once the change is committed.
+    :param user: user instance.
+    """
+
+    user.invalidate_tokens()
+    on_commit(functools.partial(user_versions.remember, user.id, user.username, user.version))
+
+
+def forget_user(user_id):
+    """
+    Drops a deleted user from the user version cache once the delete is committed.
+    :param user_id: user id.
+    """
+
+    on_commit(functools.partial(user_versions.forget, user_id))
+
+
+@event.listens_for(DB.Model.metadata, 'before_drop')
+def _clear_user_versions(target, connection, **kw):
+    user_versions.clear()
+
+
+def current_user():
+    """
+    Request scoped loader of the user making the request, the user is loaded at most once
+    per request and None is returned if the user no longer exists or token version is stale.
+    """
+
+    if '_current_user' not in g:
+        claims = get_jwt_claims()
+
+        if 'id' in claims:
+            user = User.get_by_id(claims['id'])
+
+            if user is not None and user.version != claims.get('version'):
+                user = None
+
+        else:
+            # tokens issued before user id was stored in claims.
+            user = User.get_by_username(get_jwt_identity())
+
+        g._current_user = user
+
+    return g._current_user
+
+
+def current_user_id():
+    """
+    Id of the user making the request, read from token claims without a database query.
+    Claims are checked against the user version cache by `verify_token_version`.
+    """
+
+    user_id = get_jwt_claims().get('id')
+
+    if user_id is None:
+        user = current_user()
+        user_id = user.id if user is not None else None
+
+    return user_id
+
+
 def generate_token(user_id):
     """
     Generates password reset token key that is associated with specific user.
@@ -5,21 +5,29 @@ Application module implementing functionalities for user authentication and acco
 
 """
 
-from flask import jsonify, make_response
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_raw_jwt
+import time
+
+from flask import current_app, jsonify, make_response
+from flask_jwt_extended import create_access_token, jwt_required, get_raw_jwt
 from flask_restful import Resource
 from webargs.flaskparser import use_args
 from usernames import is_safe_username
 
+from app.core.serializers import format_datetime
 from app.core.validators import PasswordValidator, UsernameValidator
-from .security import check_user, generate_token
+from app.db.base import atomic
+from .security import (blacklist_token, check_user, current_user, forget_user, generate_token,
+                       invalidate_tokens)
 from .utils import login_args, registration_args, reset_args, update_args, get_password_token_args
 from ..messages import *
-from ..models import User, BlacklistToken, ResetToken
+from ..models import User, ResetToken
+from ..shoppinglist.search import search_index
+from ..shoppinglist.suggest import suggestions
 
 
 class UserRegisterApi(Resource):
     @use_args(registration_args)
+    @atomic
     def post(self, args):
         """
         Handle post request with user data and create user object.
@@ -27,8 +35,6 @@ class UserRegisterApi(Resource):
         :param args: user data: username, email and password.
         :return: Response object.
         """
-        import time
-        time.sleep(10)
 
         username = args.get('username', '').lower()
         email = args.get('email')
@@ -46,46 +52,46 @@ class UserRegisterApi(Resource):
         if validator.has_errors:
             return make_response(jsonify(dict(messages=dict(username=validator.errors))), 422)
 
-        # create user instance
-        user = User(username=username, password=password, email=email)
+        # validate password.
+        pass_validator = PasswordValidator(password)
+        pass_validator()
 
-        try:
-            # check if username exists.
-            User.check_username(username)
+        if pass_validator.has_errors:
+            return make_response(
+                jsonify(dict(messages=dict(password=pass_validator.errors))), 422)
 
-        except user.UsernameExists:
+        # check passwords
+        if password != confirm:
             return make_response(
                 jsonify(dict(
-                    message=username_exists,
-                )), 409)
+                    message=passwords_donot_match
+                )), 400)
 
-        # check if email exists.
+        # password is only hashed once every cheap check has passed.
         try:
-            User.check_email(email)
+            User.check_unique(username, email)
+            User.create(username=username, password=password, email=email)
 
-        except user.EmailExists:
+        except User.UsernameExists:
             return make_response(
                 jsonify(dict(
-                    message=email_exists
+                    message=username_exists,
                 )), 409)
 
-        # validate password.
-        pass_validator = PasswordValidator(password)
-        pass_validator()
-
-        if pass_validator.has_errors:
+        except User.EmailExists:
             return make_response(
-                jsonify(dict(messages=dict(password=pass_validator.errors))), 422)
+                jsonify(dict(
+                    message=email_exists
+                )), 409)
 
-        # check passwords
-        if password != confirm:
+        except User.AccountNotCreated:
             return make_response(
                 jsonify(dict(
-                    message=passwords_donot_match
-                )), 400)
+                    message=account_not_created
+                )), 422)
 
-        # if username and email are okay call the save method.
-        user.save()
+        except User.HashingUnavailable:
+            return make_response(jsonify(dict(message=server_busy)), 503)
 
         return make_response(
             jsonify(dict(
@@ -113,21 +119,39 @@ class UserLoginApi(Resource):
                     message=user_does_not_exist
                 )), 404)
 
-        if not user.verify_password(password):
+        # verify client password within the login latency budget.
+        login_timeout = current_app.config.get('BCRYPT_LOGIN_TIMEOUT')
+        deadline = time.monotonic() + login_timeout
+
+        try:
+            verified = user.verify_password(password, timeout=login_timeout)
+
+        except user.HashingUnavailable:
+            return make_response(
+                jsonify(dict(
+                    message=server_busy
+                )), 503)
+
+        if not verified:
             return make_response(
                 jsonify(dict(
                     message=incorrect_password
                 )), 401)
 
-        # verify client password.
-        if user.verify_password(password):
-            token = create_access_token(identity=username)
+        # move the stored hash to the configured bcrypt cost with what is left of the budget,
+        # the hash is upgraded on a later login if verifying used it up.
+        remaining = deadline - time.monotonic()
 
-            return make_response(
-                jsonify(dict(
-                    message=successful_login,
-                    data=dict(auth_token=token)
-                )), 200)
+        if remaining > 0:
+            user.upgrade_password(password, timeout=remaining)
+
+        token = create_access_token(identity=user)
+
+        return make_response(
+            jsonify(dict(
+                message=successful_login,
+                data=dict(auth_token=token)
+            )), 200)
 
 
 class UserProfileApi(Resource):
@@ -143,29 +167,35 @@ class UserProfileApi(Resource):
         :return: response object.
         """
 
-        # get current client identity.
-        current_user = get_jwt_identity()
+        # get current client.
+        user = current_user()
 
-        user = check_user(current_user)
+        if user is None:
+            return make_response(
+                jsonify(dict(message=user_not_found)), 401)
 
         return make_response(
             jsonify(dict(data=dict(
                 username=user.username,
                 id=user.id,
                 email=user.email,
-                date_joined=user.date_joined.strftime("%Y-%m-%d %H:%M:%S"),
-                updated=user.updated.strftime("%Y-%m-%d %H:%M:%S")))),
+                date_joined=format_datetime(user.date_joined),
+                updated=format_datetime(user.updated)))),
             200)
 
     @use_args(update_args)
     @jwt_required
+    @atomic
     def put(self, args):
         """
         Handles PUT request to update user details.
         """
 
-        current_user = get_jwt_identity()
-        user = check_user(current_user)
+        user = current_user()
+
+        if user is None:
+            return make_response(
+                jsonify(dict(message=user_not_found)), 401)
 
         username = args.get('username', None)
 
@@ -197,8 +227,9 @@ class UserProfileApi(Resource):
 
         # if everything checks out correctly, we save the new details.
         user.username.strip()
+        invalidate_tokens(user)
         user.save()
-        BlacklistToken(token=get_raw_jwt()['jti']).save()
+        blacklist_token(get_raw_jwt())
 
         return make_response(
             jsonify(dict(
@@ -206,11 +237,12 @@ class UserProfileApi(Resource):
                 data=dict(
                     username=user.username,
                     email=user.email,
-                    date_joined=user.date_joined.strftime("%Y-%m-%d %H:%M:%S"),
-                    updated=user.updated.strftime("%Y-%m-%d %H:%M:%S"))
+                    date_joined=format_datetime(user.date_joined),
+                    updated=format_datetime(user.updated))
             )), 200)
 
     @jwt_required
+    @atomic
     def delete(self):
         """
         Handles DELETE request to remove/delete client from database.
@@ -218,12 +250,18 @@ class UserProfileApi(Resource):
         :return: response
         """
 
-        current_user = get_jwt_identity()
-        user = check_user(current_user)
+        user = current_user()
+
+        if user is None:
+            return make_response(
+                jsonify(dict(message=user_not_found)), 401)
 
+        search_index.remove_owner(user.id)
+        suggestions.invalidate(user.id)
+        forget_user(user.id)
         user.delete()
 
-        BlacklistToken(token=get_raw_jwt()['jti']).save()
+        blacklist_token(get_raw_jwt())
 
         return make_response(
             jsonify(dict(
@@ -238,10 +276,10 @@ class UserLogoutApi(Resource):
     """
 
     @jwt_required
+    @atomic
     def delete(self):
 
-        jti = get_raw_jwt()['jti']
-        BlacklistToken(token=jti).save()
+        blacklist_token(get_raw_jwt())
 
         return make_response(
             jsonify(dict(message=logout_successful)), 200)
@@ -253,6 +291,7 @@ class PasswordResetTokenApi(Resource):
     """
 
     @use_args(get_password_token_args)
+    @atomic
     def post(self, data):
         email = data.get('email', '')
 
@@ -281,6 +320,7 @@ class PasswordResetTokenApi(Resource):
 
 class PasswordResetApi(Resource):
     @use_args(reset_args)
+    @atomic
     def post(self, data):
         """
         Handle POST requests.
@@ -319,8 +359,15 @@ class PasswordResetApi(Resource):
                 return make_response(
                     jsonify(dict(message=dict(password=passwords_donot_match))), 409)
 
-            user.password = user.hash_password(new_password)
+            try:
+                user.password = user.hash_password(new_password)
+
+            except user.HashingUnavailable:
+                return make_response(
+                    jsonify(dict(message=server_busy)), 503)
+
             rt.expire_token()
+            invalidate_tokens(user)
             user.save()
 
             return make_response(
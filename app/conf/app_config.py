@@ -15,16 +15,27 @@ class Config(object):
     DEBUG = False
     TESTING = False
     SECRET_KEY = os.environ.get('SECRET_KEY')
-    SQLALCHEMY_TRACK_MODIFICATIONS = True
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
     JWT_BLACKLIST_ENABLED = True
     JWT_BLACKLIST_TOKEN_CHECKS = ['access', 'refresh']
     JWT_ACCESS_TOKEN_EXPIRES = datetime.timedelta(seconds=360000)
     JWT_HEADER_NAME = 'x-access-token'
     JWT_HEADER_TYPE = None
+    BLACKLIST_COMPACTION_INTERVAL = int(os.environ.get('BLACKLIST_COMPACTION_INTERVAL', 0))
     HOST = '0.0.0.0'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     JSON_SORT_KEYS = False
+    # compact jsonify output is the layout the fast json encoders write.
+    JSONIFY_PRETTYPRINT_REGULAR = False
+    PAGINATION_COUNT = os.environ.get('PAGINATION_COUNT', 'exact')
+    FUZZY_SEARCH_THRESHOLD = float(os.environ.get('FUZZY_SEARCH_THRESHOLD', 0.3))
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    BCRYPT_TARGET_LATENCY = float(os.environ.get('BCRYPT_TARGET_LATENCY', 0.25))
+    BCRYPT_POOL_SIZE = int(os.environ.get('BCRYPT_POOL_SIZE', 2))
+    BCRYPT_QUEUE_LIMIT = int(os.environ.get('BCRYPT_QUEUE_LIMIT', 32))
+    BCRYPT_TIMEOUT = float(os.environ.get('BCRYPT_TIMEOUT', 10))
+    BCRYPT_LOGIN_TIMEOUT = float(os.environ.get('BCRYPT_LOGIN_TIMEOUT', 2))
 
 
 class ProductionConfig(Config):
@@ -50,3 +61,4 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DB_URL')
     TESTING = True
     JWT_ACCESS_TOKEN_EXPIRES = datetime.timedelta(seconds=5)
+    BCRYPT_LOG_ROUNDS = 4
@@ -8,3 +8,30 @@ MAX_ITEMS_PER_PAGE = 20
 USE_TZ = True
 
 TIME_ZONE = 'Africa/Nairobi'
+
+# number of known-good token ids kept in memory by the blacklist cache.
+BLACKLIST_CACHE_SIZE = 10000
+
+# seconds a known-good token id is trusted before the blacklist table is queried again.
+BLACKLIST_CACHE_TTL = 60
+
+# number of users whose token version is kept in memory.
+USER_VERSION_CACHE_SIZE = 10000
+
+# seconds a cached token version is trusted before the users table is queried again.
+USER_VERSION_CACHE_TTL = 60
+
+# maximum number of expired blacklisted tokens deleted per statement.
+BLACKLIST_COMPACTION_BATCH = 500
+
+# maximum number of trie nodes kept in memory by item name suggestions, across all users.
+SUGGESTION_CACHE_MAX_NODES = 200000
+
+# maximum number of item name suggestions returned.
+MAX_SUGGESTIONS = 10
+
+# number of formatted datetimes kept in memory by response serializers.
+DATETIME_CACHE_SIZE = 4096
+
+# number of rows fetched and encoded at a time by streamed responses.
+STREAM_CHUNK_SIZE = 500
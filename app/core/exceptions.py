@@ -11,3 +11,23 @@ class UsernameExists(Exception):
 
 class EmailExists(Exception):
     """Raised when email already exists in the database"""
+
+
+class AccountNotCreated(Exception):
+    """Raised when a new user breaks a database constraint other than unique username or email"""
+
+
+class ShoppingListExists(Exception):
+    """Raised when the owner already has a shopping list with the same name"""
+
+
+class ShoppingItemExists(Exception):
+    """Raised when a shopping list already has an item with the same name and quantity"""
+
+
+class HashingUnavailable(Exception):
+    """Raised when password hashing exceeds its queue depth or latency budget"""
+
+
+class InvalidCursor(Exception):
+    """Raised when a pagination cursor cannot be decoded"""
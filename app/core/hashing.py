@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""
+Password hashing executor.
+
+bcrypt is deliberately slow, running it on a request thread blocks one of the few
+server worker threads for the whole duration of the hash. PasswordHasher hands the
+work to a dedicated process pool and enforces a queue depth and latency budget so
+that a burst of logins fails fast instead of piling up behind the pool.
+"""
+
+import hmac
+import statistics
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+import bcrypt
+from flask import current_app
+
+from .exceptions import HashingUnavailable
+
+
+def _to_bytes(value):
+    if isinstance(value, str):
+        return value.encode('utf-8')
+
+    return bytes(value)
+
+
+def _hash(raw_password, rounds):
+    return bcrypt.hashpw(raw_password, bcrypt.gensalt(rounds=rounds))
+
+
+def _check(hashed_password, raw_password):
+    return hmac.compare_digest(bcrypt.hashpw(raw_password, hashed_password), hashed_password)
+
+
+def hash_cost(hashed_password):
+    """
+    Reads bcrypt cost(log rounds) stored in a password hash.
+
+    :param hashed_password: bcrypt hash, eg `$2b$12$...`.
+    :return: cost or None if the hash is not recognized.
+    """
+
+    try:
+        return int(_to_bytes(hashed_password).split(b'$')[2])
+
+    except (IndexError, ValueError):
+        return None
+
+
+def calibrate(target, min_rounds=4, max_rounds=16, samples=3):
+    """
+    Benchmarks bcrypt on this machine and picks the highest cost whose median
+    hashing time does not exceed target.
+
+    :param target: login latency target in seconds.
+    :param min_rounds: lowest cost considered.
+    :param max_rounds: highest cost considered.
+    :param samples: number of hashes timed per cost.
+    :return: tuple of chosen cost and a list of (cost, median seconds) measured.
+    """
+
+    chosen = min_rounds
+    timings = []
+
+    for rounds in range(min_rounds, max_rounds + 1):
+        durations = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            _hash(b'calibration-password', rounds)
+            durations.append(time.perf_counter() - start)
+
+        median = statistics.median(durations)
+        timings.append((rounds, median))
+
+        if median > target:
+            break
+
+        chosen = rounds
+
+    return chosen, timings
+
+
+class PasswordHasher(object):
+    """
+    Runs bcrypt hashing and verification on a process pool.
+
+    The pool is created lazily using BCRYPT_POOL_SIZE, a size of 0 runs
+    bcrypt on the calling thread.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._pool_size = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """
+        Number of hashing jobs submitted and not yet completed.
+        """
+
+        return self._pending
+
+    def hash(self, raw_password, rounds=None, timeout=None):
+        """
+        Hash raw password.
+
+        :param raw_password: plain text password.
+        :param rounds: bcrypt cost, defaults to BCRYPT_LOG_ROUNDS.
+        :param timeout: seconds to wait for the result, defaults to BCRYPT_TIMEOUT.
+        :return: hashed password.
+        """
+
+        if not raw_password:
+            raise ValueError('Password must be non-empty.')
+
+        if rounds is None:
+            rounds = current_app.config.get('BCRYPT_LOG_ROUNDS', 12)
+
+        return self._run(_hash, timeout, _to_bytes(raw_password), rounds)
+
+    def check(self, hashed_password, raw_password, timeout=None):
+        """
+        Verify raw password against a stored hash.
+
+        :param hashed_password: stored password hash.
+        :param raw_password: plain text password.
+        :param timeout: seconds to wait for the result, defaults to BCRYPT_TIMEOUT.
+        :return: True|False
+        """
+
+        return self._run(_check, timeout, _to_bytes(hashed_password), _to_bytes(raw_password))
+
+    def shutdown(self):
+        """
+        Stop pool workers, a new pool is created on next use.
+        """
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _get_executor(self):
+        pool_size = current_app.config.get('BCRYPT_POOL_SIZE', 0)
+
+        if not pool_size:
+            return None
+
+        with self._lock:
+            if self._executor is None or self._pool_size != pool_size:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+
+                self._executor = ProcessPoolExecutor(max_workers=pool_size)
+                self._pool_size = pool_size
+
+            return self._executor
+
+    def _job_done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def _run(self, func, timeout, *args):
+        executor = self._get_executor()
+
+        if executor is None:
+            return func(*args)
+
+        if timeout is None:
+            timeout = current_app.config.get('BCRYPT_TIMEOUT')
+
+        queue_limit = current_app.config.get('BCRYPT_QUEUE_LIMIT')
+
+        with self._lock:
+            if queue_limit and self._pending >= queue_limit:
+                raise HashingUnavailable('hashing queue is full')
+
+            self._pending += 1
+
+        try:
+            future = executor.submit(func, *args)
+
+        except Exception:
+            self._job_done(None)
+            raise
+
+        future.add_done_callback(self._job_done)
+
+        try:
+            return future.result(timeout=timeout)
+
+        except TimeoutError:
+            future.cancel()
+            raise HashingUnavailable('hashing took longer than %(timeout)s seconds' % dict(
+                timeout=timeout))
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+"""
+Response serialization helpers.
+
+`JSONEncoder` is installed as the application json encoder so that `jsonify` and
+Flask-RESTful representations encode with orjson or ujson when one of them is
+installed, falling back to the standard library for anything they reject.
+
+`make_serializer` builds the function that turns a model instance or a projected
+row into a dict once, per model, instead of looking fields up on every call.
+
+`stream_json` encodes large collections chunk by chunk so they can be sent as
+they are read from the database.
+"""
+
+import decimal
+import functools
+import json
+import operator
+
+from flask import current_app, make_response
+from flask.json import JSONEncoder as FlaskJSONEncoder
+
+from ..conf.settings import DATETIME_CACHE_SIZE
+
+try:
+    import orjson
+
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+
+except ImportError:  # pragma: no cover
+    ujson = None
+
+if orjson is not None:
+    BACKEND = 'orjson'
+
+elif ujson is not None:  # pragma: no cover
+    BACKEND = 'ujson'
+
+else:  # pragma: no cover
+    BACKEND = 'json'
+
+
+@functools.lru_cache(maxsize=DATETIME_CACHE_SIZE)
+def _format_datetime(value, tzinfo):
+    return value.isoformat(' ')[:19]
+
+
+def format_datetime(value):
+    """
+    Formats datetime as `%Y-%m-%d %H:%M:%S`, rows written together share
+    timestamps so formatted values are cached.
+
+    :param value: datetime.
+    :return: formatted datetime.
+    """
+
+    # the time zone is part of the key, equal instants in other zones read differently.
+    return _format_datetime(value, value.tzinfo)
+
+
+def make_serializer(fields, formatters=None):
+    """
+    Builds a function that converts an object into a dict.
+
+    :param fields: sequence of two or more (key, attribute name) pairs, in output order.
+    :param formatters: dict of key to callable applied to the attribute value.
+    :return: function taking an instance or projected row and returning a dict.
+    """
+
+    keys = tuple(key for key, _ in fields)
+    getter = operator.attrgetter(*[attribute for _, attribute in fields])
+    formatted = [(keys.index(key), formatter) for key, formatter in (formatters or {}).items()]
+
+    def serialize(instance):
+        values = getter(instance)
+
+        if formatted:
+            values = list(values)
+            for index, formatter in formatted:
+                if values[index] is not None:
+                    values[index] = formatter(values[index])
+
+        return dict(zip(keys, values))
+
+    return serialize
+
+
+class JSONEncoder(FlaskJSONEncoder):
+    """
+    Flask json encoder that hands encoding to the fastest json library installed.
+
+    The libraries only write compact text or text indented by two spaces, other
+    layouts and ascii-only output they cannot match are left to the standard
+    library so that responses read the same whichever library is installed.
+    """
+
+    def default(self, o):
+        if isinstance(o, decimal.Decimal):
+            return float(o)
+
+        return super(JSONEncoder, self).default(o)
+
+    @property
+    def native(self):
+        """
+        Check if the json library can write the layout asked for.
+        """
+
+        separators = (self.item_separator, self.key_separator)
+
+        if self.indent is None:
+            return separators == (',', ':')
+
+        return self.indent == 2 and separators == (',', ': ')
+
+    def encode(self, o):
+        if BACKEND != 'json' and self.native:
+            try:
+                if BACKEND == 'orjson':
+                    # datetimes keep the format Flask gives them.
+                    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                    if self.indent:
+                        option |= orjson.OPT_INDENT_2
+
+                    if self.sort_keys:
+                        option |= orjson.OPT_SORT_KEYS
+
+                    encoded = orjson.dumps(o, default=self.default, option=option).decode('utf-8')
+
+                    # orjson never escapes non-ascii characters.
+                    if not self.ensure_ascii or _is_ascii(encoded):
+                        return encoded
+
+                else:  # pragma: no cover
+                    return ujson.dumps(o, ensure_ascii=self.ensure_ascii, sort_keys=self.sort_keys,
+                                       indent=self.indent or 0, default=self.default)
+
+            except (TypeError, ValueError, OverflowError):
+                # types or values the library does not support.
+                pass
+
+        return super(JSONEncoder, self).encode(o)
+
+
+def _is_ascii(text):
+    try:
+        text.encode('ascii')
+
+    except UnicodeEncodeError:
+        return False
+
+    return True
+
+
+def output_json(data, code, headers=None):
+    """
+    Flask-RESTful representation encoding responses with `JSONEncoder`.
+    """
+
+    settings = current_app.config.get('RESTFUL_JSON', {})
+    response = make_response(json.dumps(data, cls=JSONEncoder, **settings) + '\n', code)
+    response.headers.extend(headers or {})
+    return response
+
+
+def stream_json(key, rows, serialize, chunk_size, count_key=None):
+    """
+    Encodes rows as a json object holding an array, one chunk of rows at a time.
+
+    :param key: key of the array.
+    :param rows: iterable of rows, usually a query using `yield_per`.
+    :param serialize: function converting a row into a dict.
+    :param chunk_size: number of rows encoded per chunk.
+    :param count_key: key under which the number of rows is added after the array.
+    :return: generator of json text.
+    """
+
+    encode = JSONEncoder(separators=(',', ':')).encode
+    count = 0
+    chunk = []
+
+    yield '{%(key)s: [' % dict(key=encode(key))
+
+    for row in rows:
+        chunk.append(serialize(row))
+
+        if len(chunk) == chunk_size:
+            yield (',' if count else '') + encode(chunk)[1:-1]
+            count += len(chunk)
+            chunk = []
+
+    if chunk:
+        yield (',' if count else '') + encode(chunk)[1:-1]
+        count += len(chunk)
+
+    if count_key is not None:
+        yield '], %(key)s: %(count)s}' % dict(key=encode(count_key), count=count)
+
+    else:
+        yield ']}'
@@ -8,13 +8,269 @@ BaseModel contains methods that are used by all models.
 BaseUserManager contains methods that are specific to only
 User model.
 
+`unit_of_work` and `atomic` group every change made within them into one
+transaction, model methods that would commit only flush while one is open.
+Writes that may break a constraint run in `write_scope`, a SAVEPOINT within a
+unit of work, so a handled conflict does not undo the rest of the unit.
+`before_commit` and `on_commit` defer work to the end of the outermost unit of
+work, before and after it commits.
+
+Timestamps are generated by the database and fetched in the statement that
+writes them(RETURNING on Postgres), objects are not expired on commit so
+responses built after a save do not have to reload the row.
+
 """
-import pytz
-from datetime import datetime
+import collections
+import contextlib
+import functools
+import sqlite3
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+from app import DB
+from app.core.exceptions import (AccountNotCreated, EmailExists, HashingUnavailable,
+                                 ShoppingItemExists, ShoppingListExists, UsernameExists)
+from app.core.hashing import hash_cost, hasher
+
+
+@event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """
+    SQLite ignores foreign keys unless asked, enforce them so that
+    ON DELETE CASCADE behaves the same as on Postgres.
+
+    pysqlite starts transactions on its own and does not know about SAVEPOINT,
+    its transaction handling is turned off and `begin_sqlite_transaction`
+    emits BEGIN instead.
+    """
+
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.isolation_level = None
+
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+@event.listens_for(Engine, 'begin')
+def begin_sqlite_transaction(connection):
+    if connection.dialect.name == 'sqlite':
+        connection.execute('BEGIN')
+
+
+class utcnow(FunctionElement):
+    """
+    Current time generated by the database.
+    """
+
+    type = DB.DateTime(timezone=True)
+
+
+@compiles(utcnow)
+def _compile_utcnow(element, compiler, **kw):
+    return 'CURRENT_TIMESTAMP'
+
+
+@compiles(utcnow, 'sqlite')
+def _compile_utcnow_sqlite(element, compiler, **kw):
+    # same text format SQLAlchemy writes datetimes in, so values compare correctly.
+    return "(STRFTIME('%Y-%m-%d %H:%M:%f000', 'now'))"
+
+
+def unique_violation(error):
+    """
+    Name of the unique constraint or unique index an IntegrityError violated.
+
+    Unnamed unique constraints are reported by the name Postgres gives them,
+    `<table>_<columns>_key`, on every database.
+
+    :param error: IntegrityError raised by a flush.
+    :return: name or None if another kind of constraint was violated.
+    """
+
+    orig = getattr(error, 'orig', None)
 
-from app import bcrypt, DB
-from app.conf.settings import TIME_ZONE
-from app.core.exceptions import EmailExists, UsernameExists
+    if getattr(orig, 'pgcode', None) is not None:
+        # 23505 is unique_violation.
+        return orig.diag.constraint_name if orig.pgcode == '23505' else None
+
+    message = str(orig)
+    prefix = 'UNIQUE constraint failed: '
+
+    if not message.startswith(prefix):
+        return None
+
+    qualified = [name.strip() for name in message[len(prefix):].split(',')]
+    table_name = qualified[0].split('.')[0]
+    columns = [name.split('.', 1)[1] for name in qualified]
+    table = DB.metadata.tables.get(table_name)
+
+    if table is not None:
+        for index in table.indexes:
+            if index.unique and [column.name for column in index.columns] == columns:
+                return index.name
+
+    return '%(table)s_%(columns)s_key' % dict(table=table_name, columns='_'.join(columns))
+
+
+UOW_DEPTH = 'unit_of_work_depth'
+BEFORE_COMMIT = 'before_commit_callbacks'
+ON_COMMIT = 'on_commit_callbacks'
+
+
+def in_unit_of_work():
+    """
+    Check if a unit of work is open on the current session.
+    """
+
+    return DB.session.info.get(UOW_DEPTH, 0) > 0
+
+
+def commit_or_flush():
+    """
+    Commit the session, inside a unit of work changes are only flushed and
+    committed when the outermost unit of work ends.
+    """
+
+    if in_unit_of_work():
+        DB.session.flush()
+
+    else:
+        DB.session.commit()
+
+
+def _register(name, callback, key):
+    if not in_unit_of_work():
+        callback()
+        return
+
+    callbacks = DB.session.info.setdefault(name, collections.OrderedDict())
+    callbacks.setdefault(object() if key is None else key, callback)
+
+
+def before_commit(callback, key=None):
+    """
+    Run callback in the transaction of the current unit of work, right before
+    the outermost unit of work commits. Runs at once outside a unit of work.
+
+    :param callback: callable taking no arguments.
+    :param key: callbacks registered again with the same key run only once.
+    """
+
+    _register(BEFORE_COMMIT, callback, key)
+
+
+def on_commit(callback, key=None):
+    """
+    Run callback once the outermost unit of work has committed, it is dropped if
+    the unit of work rolls back. Runs at once outside a unit of work.
+
+    Used to keep in-process state in step with the database.
+
+    :param callback: callable taking no arguments.
+    :param key: callbacks registered again with the same key run only once.
+    """
+
+    _register(ON_COMMIT, callback, key)
+
+
+def _run_callbacks(session, name):
+    # callbacks may register more callbacks.
+    while session.info.get(name):
+        callbacks = session.info.pop(name)
+        for callback in callbacks.values():
+            callback()
+
+
+@contextlib.contextmanager
+def unit_of_work():
+    """
+    Group model changes into one transaction, committed when the block ends and
+    rolled back if it raises. Units of work nest, only the outermost one commits.
+
+    Example:
+        with unit_of_work():
+            shoppinglist.save()
+            item.save()
+    """
+
+    session = DB.session()
+    depth = session.info.get(UOW_DEPTH, 0)
+    session.info[UOW_DEPTH] = depth + 1
+
+    try:
+        yield session
+
+        if depth == 0:
+            _run_callbacks(session, BEFORE_COMMIT)
+
+        session.info[UOW_DEPTH] = depth
+        if depth == 0:
+            session.commit()
+
+    except Exception:
+        session.info[UOW_DEPTH] = depth
+        if depth == 0:
+            session.info.pop(BEFORE_COMMIT, None)
+            session.info.pop(ON_COMMIT, None)
+            session.rollback()
+
+        raise
+
+    if depth == 0:
+        _run_callbacks(session, ON_COMMIT)
+
+
+@contextlib.contextmanager
+def write_scope():
+    """
+    Scope of a write that may break a database constraint, an IntegrityError
+    is re-raised for the caller to handle.
+
+    Inside a unit of work the write runs in a SAVEPOINT so that a failure only
+    undoes the write and the unit can carry on, otherwise the session is
+    rolled back.
+
+    Example:
+        try:
+            with write_scope():
+                DB.session.add(item)
+
+        except IntegrityError:
+            ...
+    """
+
+    if in_unit_of_work():
+        with DB.session.begin_nested():
+            yield
+
+        return
+
+    try:
+        yield
+        DB.session.flush()
+
+    except IntegrityError:
+        DB.session.rollback()
+        raise
+
+
+def atomic(func):
+    """
+    Run a function, usually a Resource method, in a unit of work.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with unit_of_work():
+            return func(*args, **kwargs)
+
+    return wrapper
 
 
 class BaseModel(DB.Model):
@@ -38,13 +294,17 @@ class BaseModel(DB.Model):
 
     UsernameExists = UsernameExists
     EmailExists = EmailExists
+    AccountNotCreated = AccountNotCreated
+    HashingUnavailable = HashingUnavailable
+    ShoppingListExists = ShoppingListExists
+    ShoppingItemExists = ShoppingItemExists
     # ------------------------------------------- #
 
-    timestamp = DB.Column(DB.DateTime(timezone=True),
-                          default=datetime.now(tz=pytz.timezone(TIME_ZONE)).now)
-    updated = DB.Column(DB.DateTime(timezone=True),
-                        default=datetime.now(tz=pytz.timezone(TIME_ZONE)).now,
-                        onupdate=datetime.now(tz=pytz.timezone(TIME_ZONE)).now)
+    timestamp = DB.Column(DB.DateTime(timezone=True), server_default=utcnow())
+    updated = DB.Column(DB.DateTime(timezone=True), server_default=utcnow(), onupdate=utcnow())
+
+    # load generated timestamps while flushing instead of on first access.
+    __mapper_args__ = {'eager_defaults': True}
 
     def delete(self):
         """
@@ -52,7 +312,7 @@ class BaseModel(DB.Model):
         """
 
         DB.session.delete(self)
-        DB.session.commit()
+        commit_or_flush()
         return None
 
     def save(self):
@@ -65,7 +325,7 @@ class BaseModel(DB.Model):
 
     def _save(self):
         DB.session.add(self)
-        DB.session.commit()
+        commit_or_flush()
 
 
 class BaseUserManager(object):
@@ -74,14 +334,14 @@ class BaseUserManager(object):
     """
 
     @classmethod
-    def hash_password(cls, raw_password):
+    def hash_password(cls, raw_password, timeout=None):
         """
         Never store passwords in plaintext.
 
-        This method hashes the raw password and returns hashed password.
+        This method hashes the raw password on the hashing pool and returns hashed password.
         """
 
-        return bcrypt.generate_password_hash(raw_password)
+        return hasher.hash(raw_password, timeout=timeout)
 
     @classmethod
     def normalize_email(cls, email):
@@ -102,14 +362,43 @@ class BaseUserManager(object):
 
         return email
 
-    def _verify_password(self, raw_password):
+    def _verify_password(self, raw_password, timeout=None):
         """
         Used to verify user password using the provided raw_password since password stored are hashed.
         """
 
-        return bcrypt.check_password_hash(self.password, raw_password)
+        return hasher.check(self.password, raw_password, timeout=timeout)
 
-    def verify_password(self, password):
+    def verify_password(self, password, timeout=None):
         """Outer method that verifies stored hashed password and returns either True or False."""
 
-        return self._verify_password(password)
+        return self._verify_password(password, timeout=timeout)
+
+    def password_needs_rehash(self):
+        """
+        Checks if stored password hash was made with a cost other than BCRYPT_LOG_ROUNDS.
+        """
+
+        return hash_cost(self.password) != current_app.config.get('BCRYPT_LOG_ROUNDS', 12)
+
+    def upgrade_password(self, raw_password, timeout=None):
+        """
+        Rehash and store password using the configured cost, should only be called
+        with a raw_password that has just been verified.
+
+        :param timeout: seconds to wait for the hash, defaults to BCRYPT_TIMEOUT.
+        :return: True if password was rehashed otherwise False.
+        """
+
+        if not self.password_needs_rehash():
+            return False
+
+        try:
+            self.password = self.hash_password(raw_password, timeout=timeout)
+
+        except HashingUnavailable:
+            # the hash is upgraded on a later login.
+            return False
+
+        self.save()
+        return True
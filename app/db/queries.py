@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module keeps a registry of baked queries for lookups that run on every request.
+
+A baked query is built and compiled once, later calls only bind new parameters
+to the cached statement. Every registered query has its own compile cache so
+hits and misses can be reported per query.
+
+Example:
+    @queries.register('user_by_username')
+    def user_by_username(session):
+        return session.query(User).filter(User.username == DB.bindparam('username'))
+
+    user = queries.run('user_by_username', username='gideon').first()
+"""
+
+import collections
+import threading
+
+from sqlalchemy.ext.baked import BakedQuery
+from sqlalchemy.util import LRUCache
+
+from app import DB
+
+QueryStats = collections.namedtuple('QueryStats', ['hits', 'misses', 'hit_rate'])
+
+
+class CountingCache(LRUCache):
+    """
+    LRU cache of compiled query contexts that counts lookups, the compiled SQL
+    of the query is cached in it too so every run makes two lookups.
+    """
+
+    def __init__(self, capacity=10):
+        super(CountingCache, self).__init__(capacity)
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    def get(self, key, default=None):
+        value = super(CountingCache, self).get(key, default)
+
+        with self._counter_lock:
+            if value is default:
+                self.misses += 1
+
+            else:
+                self.hits += 1
+
+        return value
+
+    def reset_stats(self):
+        with self._counter_lock:
+            self.hits = self.misses = 0
+
+
+class QueryRegistry(object):
+    """
+    Named baked queries and their compile cache statistics.
+    """
+
+    def __init__(self):
+        self._queries = {}
+        self._caches = {}
+
+    def register(self, name):
+        """
+        Decorator registering a function that builds a query from a session,
+        parameters are declared with `bindparam`.
+
+        :param name: name the query is run by.
+        """
+
+        def decorator(build):
+            if name in self._queries:
+                raise ValueError('query %(name)s is already registered' % dict(name=name))
+
+            self._caches[name] = CountingCache()
+            self._queries[name] = BakedQuery(self._caches[name], build)
+            return build
+
+        return decorator
+
+    def run(self, name, **params):
+        """
+        Bind parameters to a registered query on the current session.
+
+        :param name: registered query name.
+        :param params: values of the query bind parameters.
+        :return: baked query result, call `first()`, `all()` or iterate it.
+        """
+
+        return self._queries[name](DB.session()).params(**params)
+
+    def stats(self):
+        """
+        Compile cache statistics.
+
+        :return: dict of query name to `QueryStats`.
+        """
+
+        stats = {}
+
+        for name, cache in self._caches.items():
+            hits, misses = cache.hits, cache.misses
+            lookups = hits + misses
+            stats[name] = QueryStats(hits, misses, hits / float(lookups) if lookups else 0.0)
+
+        return stats
+
+    def reset_stats(self):
+        for cache in self._caches.values():
+            cache.reset_stats()
+
+
+queries = QueryRegistry()
@@ -3,14 +3,14 @@ This module implements default response messages for all endpoints.
 """
 
 __all__ = [
-    'account_created', 'account_deleted', 'account_not_updated', 'account_updated',
+    'account_created', 'account_deleted', 'account_not_created', 'account_not_updated', 'account_updated',
     'credentials_required', 'data_required', 'email_does_not_exist', 'email_not_provided',
     'email_exists', 'incomplete_delete', 'incorrect_old_password', 'incorrect_password',
-    'invalid_email', 'invalid_limit', 'invalid_page', 'shoppingitems_deleted', 'login_again',
+    'invalid_cursor', 'invalid_email', 'invalid_limit', 'invalid_page', 'shoppingitems_deleted', 'login_again',
     'negative_limit', 'negative_page', 'new_email_exists', 'new_username_exists',
     'password_changed', 'passwords_donot_match', 'password_not_provided', 'reset_token_sent',
     'reset_token_expired', 'reset_token_does_not_exist', 'reset_token_required', 'search_not_found',
-    'server_error', 'shoppingitem_created', 'shoppingitem_deleted', 'shoppingitem_exists',
+    'server_busy', 'server_error', 'shoppingitem_created', 'shoppingitem_deleted', 'shoppingitem_exists',
     'shoppingitem_not_deleted', 'shoppingitem_not_found', 'shoppingitem_not_updated',
     'shoppingitem_updated', 'shoppinglist_created', 'shoppinglist_empty', 'shoppinglist_deleted',
     'shoppinglists_deleted', 'shoppingitems_not_deleted', 'shoppinglists_empty',
@@ -32,6 +32,7 @@ username_exists = 'The username you provided already exists, ' \
                   'use a different username or login if it belongs to you'
 email_exists = 'User with that email exists, use a different email id or login if it belongs to you'
 account_created = 'Account created, you can now login with your username and password.'
+account_not_created = 'Your account could not be created, please check your details and try again.'
 account_updated = 'Your account has been successfully updated.'
 account_deleted = 'Your account has been deleted successfully.'
 password_changed = 'Your password has been successfully changed'
@@ -84,12 +85,14 @@ shoppingitems_not_deleted = 'items not deleted, you provided an incorrect ' \
 
 # server error message
 server_error = 'Server error, try again'
+server_busy = 'Server is busy, try again shortly.'
 
 # url params error messages
 invalid_limit = 'limit parameter should be an integer'
 invalid_page = 'page parameter should be an integer'
 negative_limit = 'limit parameter should be an integer greater than 0'
 negative_page = 'page parameter should be an integer greater than 0'
+invalid_cursor = 'cursor parameter is invalid, start again from the first page'
 
 # search messages.
 search_not_found = "Your search did not match any shoppings, try again."
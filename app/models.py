@@ -7,13 +7,26 @@
             3. `ShoppingItem`
 """
 
+import collections
 import pytz
 from datetime import datetime
 
+from sqlalchemy.exc import IntegrityError
+
 from app import DB
-from app.conf.settings import TIME_ZONE
-from .core.exceptions import UsernameExists, EmailExists
-from .db.base import BaseUserManager, BaseModel
+from .core.exceptions import (AccountNotCreated, UsernameExists, EmailExists, ShoppingListExists,
+                              ShoppingItemExists)
+from .db.base import (BaseUserManager, BaseModel, commit_or_flush, unique_violation, utcnow,
+                      write_scope)
+from .db.queries import queries
+
+# unique constraints whose violations are reported to clients.
+USERNAME_UNIQUE = 'users_username_key'
+EMAIL_UNIQUE = 'users_email_key'
+SHOPPINGLIST_NAME_UNIQUE = 'ix_shopping_list_owner_id_name'
+SHOPPINGITEM_NAME_UNIQUE = 'ix_shopping_item_shoppinglist_id_name_quantity'
+
+ItemStats = collections.namedtuple('ItemStats', ['total_items', 'bought_items', 'total_price'])
 
 
 class User(BaseUserManager, BaseModel, DB.Model):
@@ -31,8 +44,8 @@ class User(BaseUserManager, BaseModel, DB.Model):
                                      lazy='dynamic', cascade='all, delete-orphan')
     reset_tokens = DB.relationship('ResetToken', backref='user',
                                    lazy='dynamic', cascade='all, delete-orphan')
-    date_joined = DB.Column(DB.DateTime(timezone=True),
-                            default=datetime.now(tz=pytz.timezone(TIME_ZONE)).now)
+    date_joined = DB.Column(DB.DateTime(timezone=True), server_default=utcnow())
+    version = DB.Column(DB.Integer, nullable=False, default=1)
 
     def __init__(self, username, password, email):
         """Initialize model values."""
@@ -40,6 +53,13 @@ class User(BaseUserManager, BaseModel, DB.Model):
         self.password = self.hash_password(password)
         self.email = self.normalize_email(email)
 
+    def invalidate_tokens(self):
+        """
+        Bump user version, tokens carrying an older version are no longer accepted.
+        """
+
+        self.version = (self.version or 1) + 1
+
     # TODO
     def get_reset_url(self):
         return self.reset_tokens.filter_by(expired=False).first()
@@ -68,6 +88,80 @@ class User(BaseUserManager, BaseModel, DB.Model):
         if User.query.filter_by(username=username).first():
             raise UsernameExists
 
+    @staticmethod
+    def check_unique(username, email):
+        """
+        Check if username or email exists using a single query and raise an exception,
+        username conflicts are reported first.
+        """
+
+        email = User.normalize_email(email)
+        rows = DB.session.query(User.username, User.email).filter(
+            DB.or_(User.username == username, User.email == email)).limit(2).all()
+
+        if any(row.username == username for row in rows):
+            raise UsernameExists
+
+        if rows:
+            raise EmailExists
+
+    @staticmethod
+    def create(username, password, email):
+        """
+        Hash password and insert a new user, uniqueness of username and email
+        is enforced by the table constraints.
+
+        :raises UsernameExists: if the username is taken.
+        :raises EmailExists: if the email is taken.
+        :raises AccountNotCreated: if any other constraint is violated.
+        :return: instance.
+        """
+
+        user = User(username=username, password=password, email=email)
+
+        try:
+            with write_scope():
+                DB.session.add(user)
+
+        except IntegrityError as error:
+            # a concurrent registration won the race, report which value was taken.
+            constraint = unique_violation(error)
+
+            if constraint == USERNAME_UNIQUE:
+                raise UsernameExists
+
+            if constraint == EMAIL_UNIQUE:
+                raise EmailExists
+
+            raise AccountNotCreated(str(error.orig))
+
+        commit_or_flush()
+
+        return user
+
+    @staticmethod
+    def get_by_id(user_id):
+        """
+        Gets user instance using provided id.
+
+        :param user_id: user id.
+        :return: instance.
+        """
+
+        return DB.session.query(User).get(user_id)
+
+    @staticmethod
+    def get_version(user_id):
+        """
+        Gets username and token version of a user without loading the instance.
+
+        :param user_id: user id.
+        :return: (username, version) tuple or None if the user does not exist.
+        """
+
+        row = queries.run('user_version', user_id=user_id).first()
+        return tuple(row) if row is not None else None
+
     @staticmethod
     def get_by_username(username):
         """
@@ -77,7 +171,7 @@ class User(BaseUserManager, BaseModel, DB.Model):
         :return: instance.
         """
 
-        return DB.session.query(User).filter_by(username=username).first()
+        return queries.run('user_by_username', username=username).first()
 
     @staticmethod
     def get_by_email(email):
@@ -100,9 +194,65 @@ class BlacklistToken(BaseModel, DB.Model):
     """
     id = DB.Column(DB.Integer, primary_key=True)
     token = DB.Column(DB.String(500), unique=True, nullable=False)
+    expires = DB.Column(DB.DateTime(timezone=True), nullable=True, index=True)
 
-    def __init__(self, token):
+    def __init__(self, token, expires=None):
         self.token = token
+        self.expires = expires
+
+    @staticmethod
+    def is_blacklisted(token):
+        """
+        Check if token is blacklisted, expired rows are ignored since
+        expired tokens are rejected before the blacklist is consulted.
+
+        :param token: token id(jti).
+        :return: True|False
+        """
+
+        row = queries.run(
+            'blacklisted_token', token=token, now=datetime.now(tz=pytz.utc)).first()
+
+        return row is not None
+
+    @staticmethod
+    def purge_expired(batch_size, max_age=None):
+        """
+        Delete expired tokens in small batches, each batch is committed on its own
+        so that no long lived locks are held on the table.
+
+        :param batch_size: maximum number of rows deleted per statement.
+        :param max_age: lifetime of tokens stored without an expiry time(timedelta),
+                        such rows are kept forever when not provided.
+        :return: number of deleted rows.
+        """
+
+        now = datetime.now(tz=pytz.utc)
+        expired = BlacklistToken.expires <= now
+
+        if max_age is not None:
+            expired = DB.or_(
+                expired, DB.and_(BlacklistToken.expires.is_(None),
+                                 BlacklistToken.timestamp <= now - max_age))
+
+        deleted = 0
+
+        while True:
+            ids = [row.id for row in
+                   DB.session.query(BlacklistToken.id).filter(expired).limit(batch_size)]
+
+            if not ids:
+                break
+
+            DB.session.query(BlacklistToken).filter(
+                BlacklistToken.id.in_(ids)).delete(synchronize_session=False)
+            DB.session.commit()
+            deleted += len(ids)
+
+            if len(ids) < batch_size:
+                break
+
+        return deleted
 
     def __repr__(self):
         return '<id: token: {}'.format(self.token)
@@ -115,9 +265,45 @@ class ShoppingList(BaseModel, DB.Model):
     name = DB.Column(DB.String(100), nullable=False)
     owner_id = DB.Column(DB.Integer, DB.ForeignKey('users.id'))
     shopping_items = DB.relationship('ShoppingItem', backref='shopping_list',
-                                     lazy='dynamic', cascade='all, delete-orphan')
+                                     lazy='dynamic', cascade='all, delete-orphan',
+                                     passive_deletes=True)
     description = DB.Column(DB.Text(), nullable=True, default="")
 
+    # item counters maintained by the item views, see `adjust_counters`.
+    item_count = DB.Column(DB.Integer, nullable=False, default=0, server_default='0')
+    bought_count = DB.Column(DB.Integer, nullable=False, default=0, server_default='0')
+    total_price = DB.Column(DB.Float, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        DB.Index(SHOPPINGLIST_NAME_UNIQUE, 'owner_id', 'name', unique=True),
+        DB.Index('ix_shopping_list_owner_id_id', 'owner_id', 'id'),
+    )
+
+    @staticmethod
+    def for_owner(ownerId):
+        """
+        Query of all shopping lists owned by a user.
+
+        :param ownerId: user id.
+        :return: query.
+        """
+
+        return DB.session.query(ShoppingList).filter_by(owner_id=ownerId)
+
+    @staticmethod
+    def rows_for_owner(ownerId):
+        """
+        Query of the columns listings of a user's shopping lists need, rows are
+        plain tuples so they skip the identity map and change tracking.
+
+        :param ownerId: user id.
+        :return: query of rows.
+        """
+
+        return DB.session.query(
+            ShoppingList.id, ShoppingList.name, ShoppingList.description,
+            ShoppingList.updated).filter(ShoppingList.owner_id == ownerId)
+
     @staticmethod
     def get(shoppinglistId, ownerId):
         """
@@ -128,20 +314,239 @@ class ShoppingList(BaseModel, DB.Model):
         :param ownerId: user id.
         :return: instance.
         """
-        instance = DB.session.query(ShoppingList).filter_by(id=shoppinglistId,
-                                                            owner_id=ownerId).first()
+        instance = queries.run(
+            'shoppinglist_by_owner', shoppinglist_id=shoppinglistId, owner_id=ownerId).first()
         return instance
 
+    @staticmethod
+    def item_stats_for(shoppinglistIds):
+        """
+        Aggregates items of several shopping lists in one grouped statement.
+
+        :param shoppinglistIds: shopping list ids.
+        :return: dict of shopping list id to `ItemStats`, lists without items are left out.
+        """
+
+        bought = DB.case([(ShoppingItem.bought == DB.true(), 1)], else_=0)
+        rows = DB.session.query(
+            ShoppingItem.shoppinglist_id,
+            DB.func.count(ShoppingItem.id),
+            DB.func.sum(bought),
+            DB.func.sum(ShoppingItem.price)).filter(
+            ShoppingItem.shoppinglist_id.in_(shoppinglistIds)).group_by(
+            ShoppingItem.shoppinglist_id)
+
+        return {shl_id: ItemStats(count, bought_count or 0, price or 0)
+                for shl_id, count, bought_count, price in rows}
+
+    def item_stats(self):
+        """
+        Counts items, bought items and sums item prices in a single query.
+
+        :return: `ItemStats`.
+        """
+
+        return self.item_stats_for([self.id]).get(self.id, ItemStats(0, 0, 0))
+
     def cost(self):
         """
         Calculates total amount(item price * quantity).
         :return: calculated price.
         """
 
-        return sum([item.price for item in
-                    DB.session.query(self.__class__).
-                   filter_by(id=self.id).first().
-                   shopping_items.all()])
+        return self.item_stats().total_price
+
+    def adjust_counters(self, items=0, bought=0, price=0):
+        """
+        Adjust item counters within the current transaction, the counters are
+        incremented in SQL so that concurrent item changes are not lost.
+
+        :param items: change in number of items.
+        :param bought: change in number of bought items.
+        :param price: change in sum of item prices.
+        """
+
+        if not (items or bought or price):
+            return
+
+        DB.session.query(ShoppingList).filter_by(id=self.id).update({
+            ShoppingList.item_count: ShoppingList.item_count + items,
+            ShoppingList.bought_count: ShoppingList.bought_count + bought,
+            ShoppingList.total_price: ShoppingList.total_price + float(price)},
+            synchronize_session='evaluate')
+
+    @staticmethod
+    def delete_all(ownerId):
+        """
+        Deletes every shopping list of a user with one statement, their items
+        are removed by the database through ON DELETE CASCADE.
+
+        :param ownerId: id of user.
+        :return: number of deleted shopping lists.
+        """
+
+        deleted = ShoppingList.query.filter_by(owner_id=ownerId).delete(synchronize_session='evaluate')
+        commit_or_flush()
+
+        return deleted
+
+    def save(self, **changes):
+        """
+        Saves shopping list, names are unique per owner.
+
+        :param changes: new values of list attributes, applied so that a conflict undoes them.
+        :raises ShoppingListExists: if the owner has another list with the same name.
+        """
+
+        try:
+            with write_scope():
+                for key, value in changes.items():
+                    setattr(self, key, value)
+
+                DB.session.add(self)
+
+        except IntegrityError as error:
+            if unique_violation(error) == SHOPPINGLIST_NAME_UNIQUE:
+                raise ShoppingListExists(self.name)
+
+            raise
+
+        commit_or_flush()
+
+    def add_item(self, item):
+        """
+        Saves new item and updates item counters in one transaction.
+
+        :param item: shopping item instance.
+        :raises ShoppingItemExists: if the list has an item with the same name and quantity.
+        """
+
+        item.shoppinglist_id = self.id
+
+        try:
+            with write_scope():
+                DB.session.add(item)
+                self.adjust_counters(1, int(bool(item.bought)), item.price)
+
+        except IntegrityError as error:
+            if unique_violation(error) == SHOPPINGITEM_NAME_UNIQUE:
+                raise ShoppingItemExists(item.name)
+
+            raise
+
+        commit_or_flush()
+
+    def update_item(self, item, **changes):
+        """
+        Applies changes to item and updates item counters in one transaction.
+
+        :param item: shopping item instance.
+        :param changes: new values of item attributes.
+        :raises ShoppingItemExists: if the list has another item with the same name and quantity.
+        """
+
+        old_bought, old_price = bool(item.bought), float(item.price)
+
+        try:
+            with write_scope():
+                # changes are made within the scope so a conflict undoes them.
+                for key, value in changes.items():
+                    setattr(item, key, value)
+
+                DB.session.add(item)
+                self.adjust_counters(
+                    bought=int(bool(item.bought)) - int(bool(old_bought)),
+                    price=float(item.price) - old_price)
+
+        except IntegrityError as error:
+            if unique_violation(error) == SHOPPINGITEM_NAME_UNIQUE:
+                raise ShoppingItemExists(item.name)
+
+            raise
+
+        commit_or_flush()
+
+    def remove_item(self, item):
+        """
+        Deletes item and updates item counters in one transaction.
+
+        :param item: shopping item instance.
+        """
+
+        self.adjust_counters(-1, -int(bool(item.bought)), -item.price)
+        DB.session.delete(item)
+        commit_or_flush()
+
+    def clear_items(self, bought=None):
+        """
+        Deletes items of the list with one statement and recomputes item counters
+        in the same transaction.
+
+        :param bought: delete only bought(True) or not bought(False) items, all items when not provided.
+        :return: number of deleted items.
+        """
+
+        query = ShoppingItem.query.filter(ShoppingItem.shoppinglist_id == self.id)
+
+        if bought is not None:
+            query = query.filter(ShoppingItem.bought == bought)
+
+        deleted = query.delete(synchronize_session='evaluate')
+
+        if deleted:
+            ShoppingList.recount([self.id])
+
+        commit_or_flush()
+
+        return deleted
+
+    @staticmethod
+    def repair_counters(shoppinglistIds=None):
+        """
+        Recompute item counters from shopping items in a single bulk statement.
+
+        :param shoppinglistIds: shopping list ids to repair, all lists when not provided.
+        :return: number of repaired shopping lists.
+        """
+
+        repaired = ShoppingList.recount(shoppinglistIds)
+        commit_or_flush()
+
+        return repaired
+
+    @staticmethod
+    def recount(shoppinglistIds=None):
+        """
+        Recompute item counters within the current transaction.
+
+        :param shoppinglistIds: shopping list ids to recount, all lists when not provided.
+        :return: number of updated shopping lists.
+        """
+
+        items = ShoppingItem.__table__
+        owned = items.c.shoppinglist_id == ShoppingList.id
+        bought = DB.case([(items.c.bought == DB.true(), 1)], else_=0)
+
+        query = DB.session.query(ShoppingList)
+
+        if shoppinglistIds is not None:
+            query = query.filter(ShoppingList.id.in_(shoppinglistIds))
+
+        updated = query.update({
+            ShoppingList.item_count: DB.select(
+                [DB.func.count(items.c.id)]).where(owned).as_scalar(),
+            ShoppingList.bought_count: DB.select(
+                [DB.func.coalesce(DB.func.sum(bought), 0)]).where(owned).as_scalar(),
+            ShoppingList.total_price: DB.select(
+                [DB.func.coalesce(DB.func.sum(items.c.price), 0)]).where(owned).as_scalar()},
+            synchronize_session=False)
+
+        # loaded lists are not expired on commit, reload their counters on next access.
+        for key, instance in list(DB.session.identity_map.items()):
+            if key[0] is ShoppingList and (shoppinglistIds is None or key[1][0] in shoppinglistIds):
+                DB.session.expire(instance, ['item_count', 'bought_count', 'total_price'])
+
+        return updated
 
     def get_all_items(self):
         """
@@ -164,7 +569,107 @@ class ShoppingItem(BaseModel, DB.Model):
     quantity_description = DB.Column(DB.String(200), nullable=False)
     price = DB.Column(DB.Float, nullable=False)
     bought = DB.Column(DB.Boolean, default=False)
-    shoppinglist_id = DB.Column(DB.Integer, DB.ForeignKey('shopping_list.id'))
+    shoppinglist_id = DB.Column(DB.Integer, DB.ForeignKey('shopping_list.id', ondelete='CASCADE'))
+
+    __table_args__ = (
+        DB.Index(SHOPPINGITEM_NAME_UNIQUE,
+                 'shoppinglist_id', 'name', 'quantity_description', unique=True),
+        DB.Index('ix_shopping_item_shoppinglist_id_bought', 'shoppinglist_id', 'bought'),
+        # case insensitive prefix search, text_pattern_ops lets Postgres answer LIKE
+        # from the index whatever the database collation.
+        DB.Index('ix_shopping_item_lower_name', DB.func.lower(name).label('lower_name'),
+                 postgresql_ops={'lower_name': 'text_pattern_ops'}),
+        DB.Index('ix_shopping_item_lower_quantity_description',
+                 DB.func.lower(quantity_description).label('lower_quantity_description'),
+                 postgresql_ops={'lower_quantity_description': 'text_pattern_ops'}),
+    )
+
+    @staticmethod
+    def search(ownerId, term):
+        """
+        Query items whose name or quantity description start with term across
+        every shopping list of a user.
+
+        :param ownerId: id of user whose items are searched.
+        :param term: prefix to match, case insensitive.
+        :return: query of item rows with the id and name of their shopping list.
+        """
+
+        escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+        # lower(column) LIKE 'prefix%' is answered from the lower() indexes, ilike is not.
+        prefix = DB.func.lower(DB.literal(escaped)).concat('%')
+
+        return DB.session.query(
+            ShoppingItem.id, ShoppingItem.name, ShoppingItem.price, ShoppingItem.bought,
+            ShoppingItem.quantity_description, ShoppingItem.shoppinglist_id,
+            ShoppingList.name.label('shoppinglist_name')
+        ).join(ShoppingList, ShoppingItem.shoppinglist_id == ShoppingList.id).filter(
+            ShoppingList.owner_id == ownerId,
+            DB.or_(DB.func.lower(ShoppingItem.name).like(prefix, escape='\\'),
+                   DB.func.lower(ShoppingItem.quantity_description).like(prefix, escape='\\')))
+
+    @staticmethod
+    def get(shoppinglistId, itemId):
+        """
+        Get item by its id within a shopping list.
+
+        :param shoppinglistId: shopping list id.
+        :param itemId: item id.
+        :return: instance or None.
+        """
+
+        return queries.run('shoppingitem_in_list', shoppinglist_id=shoppinglistId,
+                           item_id=itemId).first()
+
+    @staticmethod
+    def rows_for_list(shoppinglistId):
+        """
+        Query of the columns listings of shopping items need, rows are plain
+        tuples so they skip the identity map and change tracking.
+
+        :param shoppinglistId: shopping list id.
+        :return: query of rows.
+        """
+
+        return DB.session.query(
+            ShoppingItem.id, ShoppingItem.name, ShoppingItem.price, ShoppingItem.bought,
+            ShoppingItem.quantity_description, ShoppingItem.timestamp,
+            ShoppingItem.updated).filter(ShoppingItem.shoppinglist_id == shoppinglistId)
+
+    @staticmethod
+    def names_by_list(shoppinglistIds, limit=None):
+        """
+        Loads item names of several shopping lists with a single query.
+
+        :param shoppinglistIds: shopping list ids.
+        :param limit: maximum number of names per shopping list, all names when not provided.
+        :return: dict of shopping list id to item names ordered by item id.
+        """
+
+        names = {shl_id: [] for shl_id in shoppinglistIds}
+
+        if not names:
+            return names
+
+        if limit is None:
+            query = DB.session.query(ShoppingItem.shoppinglist_id, ShoppingItem.name).filter(
+                ShoppingItem.shoppinglist_id.in_(shoppinglistIds)).order_by(
+                ShoppingItem.shoppinglist_id, ShoppingItem.id)
+
+        else:
+            rank = DB.func.row_number().over(
+                partition_by=ShoppingItem.shoppinglist_id, order_by=ShoppingItem.id).label('rank')
+            ranked = DB.session.query(
+                ShoppingItem.shoppinglist_id, ShoppingItem.name, ShoppingItem.id, rank).filter(
+                ShoppingItem.shoppinglist_id.in_(shoppinglistIds)).subquery()
+            query = DB.session.query(ranked.c.shoppinglist_id, ranked.c.name).filter(
+                ranked.c.rank <= limit).order_by(ranked.c.shoppinglist_id, ranked.c.id)
+
+        for shl_id, name in query:
+            names[shl_id].append(name)
+
+        return names
 
     def __repr__(self):
         return '<%(name)s obj>' % dict(name=self.name.capitalize())
@@ -176,6 +681,10 @@ class ResetToken(BaseModel, DB.Model):
     user_id = DB.Column(DB.Integer, DB.ForeignKey('users.id'))
     expired = DB.Column(DB.Boolean, default=False)
 
+    __table_args__ = (
+        DB.Index('ix_reset_token_token_user_id', 'token', 'user_id'),
+    )
+
     def __init__(self, user_id, token):
         self.user_id = user_id
         self.token = token
@@ -192,3 +701,36 @@ class ResetToken(BaseModel, DB.Model):
     def get_instance(token, user_id):
         instance = DB.session.query(ResetToken).filter_by(token=token, user_id=user_id).first()
         return instance
+
+
+# ---- baked queries of lookups made on every request ---- #
+
+@queries.register('user_by_username')
+def _user_by_username(session):
+    return session.query(User).filter(User.username == DB.bindparam('username'))
+
+
+@queries.register('user_version')
+def _user_version(session):
+    return session.query(User.username, User.version).filter(User.id == DB.bindparam('user_id'))
+
+
+@queries.register('blacklisted_token')
+def _blacklisted_token(session):
+    return session.query(BlacklistToken.id).filter(
+        BlacklistToken.token == DB.bindparam('token'),
+        DB.or_(BlacklistToken.expires.is_(None), BlacklistToken.expires > DB.bindparam('now')))
+
+
+@queries.register('shoppinglist_by_owner')
+def _shoppinglist_by_owner(session):
+    return session.query(ShoppingList).filter(
+        ShoppingList.id == DB.bindparam('shoppinglist_id'),
+        ShoppingList.owner_id == DB.bindparam('owner_id'))
+
+
+@queries.register('shoppingitem_in_list')
+def _shoppingitem_in_list(session):
+    return session.query(ShoppingItem).filter(
+        ShoppingItem.shoppinglist_id == DB.bindparam('shoppinglist_id'),
+        ShoppingItem.id == DB.bindparam('item_id'))
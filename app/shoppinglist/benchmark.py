@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module measures the cost of serializing a large shopping list.
+
+Items are read either as ORM instances, which go through the identity map and
+change tracking, or as projected rows and serialized the same way. Encoding
+compares building item dicts with `strftime` and the standard library encoder
+against the precompiled item serializer and the application json encoder, both
+in the compact layout `jsonify` writes responses in.
+
+Time is the best of several runs and memory is the peak traced by `tracemalloc`,
+the fixture rows are rolled back afterwards.
+"""
+
+import collections
+import json
+import time
+import tracemalloc
+
+from app import DB
+from .utils import shoppingitem_data
+from ..core.serializers import JSONEncoder
+from ..models import ShoppingItem, ShoppingList, User
+
+Timing = collections.namedtuple('Timing', ['name', 'seconds', 'peak_bytes'])
+
+
+def _orm_read(shoppinglistId):
+    shoppinglist = DB.session.query(ShoppingList).get(shoppinglistId)
+    output = [shoppingitem_data(item, shoppinglist.name) for item in shoppinglist.shopping_items.all()]
+
+    # later runs must not find the instances already loaded.
+    DB.session.expunge_all()
+    return output
+
+
+def _projected_read(shoppinglistId):
+    name = DB.session.query(ShoppingList.name).filter_by(id=shoppinglistId).scalar()
+    return [shoppingitem_data(item, name) for item in ShoppingItem.rows_for_list(shoppinglistId)]
+
+
+def _plain_encode(rows):
+    output = [
+        {'id': item.id,
+         'name': item.name,
+         'parent_name': 'benchmark',
+         'price': item.price,
+         'bought': item.bought,
+         'quantity_description': item.quantity_description,
+         'created_on': item.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+         'updated_on': item.updated.strftime("%Y-%m-%d %H:%M:%S")} for item in rows]
+
+    return json.dumps(dict(shopping_items=output), separators=(',', ':'))
+
+
+def _fast_encode(rows):
+    output = [shoppingitem_data(item, 'benchmark') for item in rows]
+    return JSONEncoder(separators=(',', ':')).encode(dict(shopping_items=output))
+
+
+def _measure(name, func, argument, repeat):
+    seconds = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(argument)
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    tracemalloc.start()
+    try:
+        func(argument)
+        peak = tracemalloc.get_traced_memory()[1]
+
+    finally:
+        tracemalloc.stop()
+
+    return Timing(name, seconds, peak)
+
+
+def _create_fixture(items):
+    owner_id = DB.session.execute(User.__table__.insert().values(
+        username='benchmark-user', password=b'-', email='benchmark@example.com',
+        version=1)).inserted_primary_key[0]
+    shoppinglist_id = DB.session.execute(ShoppingList.__table__.insert().values(
+        name='benchmark', owner_id=owner_id, item_count=items)).inserted_primary_key[0]
+
+    DB.session.execute(ShoppingItem.__table__.insert(), [
+        dict(name='item %(index)s' % dict(index=index), quantity_description='1',
+             price=index % 100, bought=bool(index % 2), shoppinglist_id=shoppinglist_id)
+        for index in range(items)])
+
+    return shoppinglist_id
+
+
+def compare_item_reads(items=10000, repeat=3):
+    """
+    Serialize a shopping list of `items` items with both read paths.
+
+    :param items: number of items in the shopping list.
+    :param repeat: number of timed runs per read path.
+    :return: list of `Timing`, ORM read first.
+    """
+
+    try:
+        shoppinglist_id = _create_fixture(items)
+
+        return [_measure('orm', _orm_read, shoppinglist_id, repeat),
+                _measure('projected', _projected_read, shoppinglist_id, repeat)]
+
+    finally:
+        DB.session.rollback()
+
+
+def compare_item_encoding(items=10000, repeat=3):
+    """
+    Encode projected rows of a shopping list of `items` items with both encoders.
+
+    :param items: number of items in the shopping list.
+    :param repeat: number of timed runs per encoder.
+    :return: list of `Timing`, standard library encoding first.
+    """
+
+    try:
+        rows = ShoppingItem.rows_for_list(_create_fixture(items)).all()
+
+        return [_measure('stdlib', _plain_encode, rows, repeat),
+                _measure('fast', _fast_encode, rows, repeat)]
+
+    finally:
+        DB.session.rollback()
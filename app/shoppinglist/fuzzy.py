@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module implements an in-process trigram index used for typo tolerant search
+when the database has no trigram support of its own.
+
+Words are broken into trigrams the same way `pg_trgm` does it, the word is lower
+cased and padded with two spaces in front and one behind. Similarity of two words
+is the number of trigrams they share divided by the number of distinct trigrams
+of both.
+
+The index keeps, per user, a posting list of words for every trigram and a set of
+shopping lists for every word. A lookup only visits postings of the trigrams of
+the searched words so its cost does not grow with the number of lists a user has.
+"""
+
+import collections
+import threading
+
+from app import DB
+from ..models import ShoppingList, ShoppingItem
+
+
+def trigrams(word):
+    """
+    Trigrams of a word.
+
+    :param word: lower case word.
+    :return: set of trigrams.
+    """
+
+    padded = '  %(word)s ' % dict(word=word)
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def load_documents(ownerId=None, shoppinglistId=None):
+    """
+    Reads text of shopping lists and the names of their items.
+
+    :param ownerId: read every shopping list of this user.
+    :param shoppinglistId: read this shopping list only.
+    :return: dict of shopping list id to tuple of owner id and list of texts.
+    """
+
+    lists = DB.session.query(
+        ShoppingList.id, ShoppingList.owner_id, ShoppingList.name, ShoppingList.description)
+
+    if ownerId is not None:
+        lists = lists.filter(ShoppingList.owner_id == ownerId)
+
+    if shoppinglistId is not None:
+        lists = lists.filter(ShoppingList.id == shoppinglistId)
+
+    documents = {
+        row.id: (row.owner_id, [row.name, row.description or '']) for row in lists}
+
+    if documents:
+        items = DB.session.query(ShoppingItem.shoppinglist_id, ShoppingItem.name).filter(
+            ShoppingItem.shoppinglist_id.in_(list(documents)))
+
+        for row in items:
+            documents[row.shoppinglist_id][1].append(row.name)
+
+    return documents
+
+
+class TrigramIndex(object):
+    """
+    Per user trigram inverted index of shopping list words.
+
+    Users are loaded from the database the first time they are searched, updates
+    for users that are not loaded yet are ignored.
+    """
+
+    def __init__(self, tokenizer):
+        """
+        :param tokenizer: callable splitting text into lower case words.
+        """
+
+        self.tokenizer = tokenizer
+        self._lists = {}
+        self._words = {}
+        self._trigrams = {}
+        self._lock = threading.Lock()
+
+    def is_loaded(self, ownerId):
+        return ownerId in self._words
+
+    def load_owner(self, ownerId):
+        """
+        Index every shopping list of a user.
+        """
+
+        documents = load_documents(ownerId=ownerId)
+
+        with self._lock:
+            self._drop_owner(ownerId)
+            self._words[ownerId] = {}
+            self._trigrams[ownerId] = collections.defaultdict(set)
+
+            for shoppinglistId, (_, texts) in documents.items():
+                self._add(ownerId, shoppinglistId, texts)
+
+    def index_list(self, shoppinglistId):
+        """
+        Refresh words of a shopping list.
+        """
+
+        with self._lock:
+            self._remove(shoppinglistId)
+
+        documents = load_documents(shoppinglistId=shoppinglistId)
+
+        with self._lock:
+            for shoppinglistId, (ownerId, texts) in documents.items():
+                if self.is_loaded(ownerId):
+                    self._remove(shoppinglistId)
+                    self._add(ownerId, shoppinglistId, texts)
+
+    def remove_list(self, shoppinglistId):
+        with self._lock:
+            self._remove(shoppinglistId)
+
+    def remove_owner(self, ownerId):
+        with self._lock:
+            self._drop_owner(ownerId)
+
+    def clear(self):
+        with self._lock:
+            self._lists.clear()
+            self._words.clear()
+            self._trigrams.clear()
+
+    def match(self, ownerId, term, threshold):
+        """
+        Find shopping lists with words similar to the words of term.
+
+        A list scores the average, over the searched words, of the similarity of
+        its closest word.
+
+        :param ownerId: id of user whose lists are searched.
+        :param term: raw search term.
+        :param threshold: minimum score, between 0 and 1.
+        :return: list of (shopping list id, score) tuples, best first.
+        """
+
+        words = self.tokenizer(term)
+        if not words:
+            return []
+
+        if not self.is_loaded(ownerId):
+            self.load_owner(ownerId)
+
+        scores = collections.defaultdict(float)
+
+        with self._lock:
+            postings = self._trigrams.get(ownerId, {})
+            owner_words = self._words.get(ownerId, {})
+
+            for word in words:
+                wanted = trigrams(word)
+                shared = collections.Counter()
+
+                for trigram in wanted:
+                    shared.update(postings.get(trigram, ()))
+
+                best = {}
+                for candidate, count in shared.items():
+                    similarity = count / float(len(wanted) + len(trigrams(candidate)) - count)
+
+                    for shoppinglistId in owner_words[candidate]:
+                        if similarity > best.get(shoppinglistId, 0):
+                            best[shoppinglistId] = similarity
+
+                for shoppinglistId, similarity in best.items():
+                    scores[shoppinglistId] += similarity / len(words)
+
+        matches = [(shoppinglistId, score) for shoppinglistId, score in scores.items()
+                   if score >= threshold]
+
+        return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+    def _add(self, ownerId, shoppinglistId, texts):
+        words = set()
+        for text in texts:
+            words.update(self.tokenizer(text))
+
+        self._lists[shoppinglistId] = (ownerId, words)
+
+        for word in words:
+            if word not in self._words[ownerId]:
+                self._words[ownerId][word] = set()
+                for trigram in trigrams(word):
+                    self._trigrams[ownerId][trigram].add(word)
+
+            self._words[ownerId][word].add(shoppinglistId)
+
+    def _remove(self, shoppinglistId):
+        ownerId, words = self._lists.pop(shoppinglistId, (None, ()))
+
+        for word in words:
+            shoppinglists = self._words[ownerId][word]
+            shoppinglists.discard(shoppinglistId)
+
+            if not shoppinglists:
+                del self._words[ownerId][word]
+                for trigram in trigrams(word):
+                    postings = self._trigrams[ownerId][trigram]
+                    postings.discard(word)
+
+                    if not postings:
+                        del self._trigrams[ownerId][trigram]
+
+    def _drop_owner(self, ownerId):
+        self._words.pop(ownerId, None)
+        self._trigrams.pop(ownerId, None)
+
+        for shoppinglistId in [key for key, value in self._lists.items() if value[0] == ownerId]:
+            del self._lists[shoppinglistId]
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module implements offset and keyset(cursor) pagination.
+
+Rows are ordered by `(id)` or `(updated, id)` and a page starts right after
+the key of the last row of the previous page, so the database never has to
+skip over rows with OFFSET no matter how deep the page is.
+
+Cursors are opaque to clients, they are url safe base64 encoded json documents
+holding the key of the row the page starts after and the paging direction.
+
+Totals are optional, `count_rows` counts exactly, estimates or skips counting
+altogether for clients that only page forward.
+"""
+
+import base64
+import binascii
+import collections
+import json
+import math
+from datetime import datetime
+
+from app import DB
+from ..core.exceptions import InvalidCursor
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+ORDERINGS = ('id', 'updated')
+
+COUNT_MODES = ('exact', 'estimate', 'none')
+
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+KeysetPage = collections.namedtuple('KeysetPage', ['items', 'next_cursor', 'prev_cursor'])
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            return dict(dt=value.strftime(DATETIME_FORMAT + '%z'))
+
+        return dict(dt=value.strftime(DATETIME_FORMAT))
+
+    return value
+
+
+def _load_value(value):
+    if isinstance(value, dict):
+        text = value['dt']
+        if len(text) > 26:
+            return datetime.strptime(text, DATETIME_FORMAT + '%z')
+
+        return datetime.strptime(text, DATETIME_FORMAT)
+
+    return value
+
+
+def encode_cursor(key, direction):
+    """
+    Makes opaque cursor.
+
+    :param key: key values of the row the page starts after.
+    :param direction: NEXT or PREVIOUS.
+    :return: cursor.
+    """
+
+    document = json.dumps(dict(k=[_dump_value(value) for value in key], d=direction),
+                          separators=(',', ':'))
+    return base64.urlsafe_b64encode(document.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Reads opaque cursor.
+
+    :param cursor: cursor made by `encode_cursor`.
+    :return: tuple of key values and direction.
+    """
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        document = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        key = [_load_value(value) for value in document['k']]
+        direction = document['d']
+
+    except (binascii.Error, KeyError, TypeError, ValueError, UnicodeError):
+        raise InvalidCursor(cursor)
+
+    if direction not in (NEXT, PREVIOUS):
+        raise InvalidCursor(cursor)
+
+    return key, direction
+
+
+def key_columns(model, order='id'):
+    """
+    Columns rows are ordered by, id always comes last to make keys unique.
+    """
+
+    if order == 'updated':
+        return [model.updated, model.id]
+
+    return [model.id]
+
+
+def _after(columns, key):
+    first, rest = columns[0], columns[1:]
+
+    if not rest:
+        return first > key[0]
+
+    return (first > key[0]) | ((first == key[0]) & _after(rest, key[1:]))
+
+
+def _before(columns, key):
+    first, rest = columns[0], columns[1:]
+
+    if not rest:
+        return first < key[0]
+
+    return (first < key[0]) | ((first == key[0]) & _before(rest, key[1:]))
+
+
+def keyset_paginate(query, model, cursor, limit, order='id'):
+    """
+    Fetch one page of rows using keyset pagination.
+
+    :param query: query of model rows.
+    :param model: model class whose key columns are used for ordering.
+    :param cursor: cursor returned with a previous page, empty for the first page.
+    :param limit: number of rows in page.
+    :param order: `id` or `updated`.
+    :return: `KeysetPage`.
+    """
+
+    columns = key_columns(model, order)
+    direction = NEXT
+
+    if cursor:
+        key, direction = decode_cursor(cursor)
+
+        if len(key) != len(columns):
+            raise InvalidCursor(cursor)
+
+        if direction == NEXT:
+            query = query.filter(_after(columns, key))
+
+        else:
+            query = query.filter(_before(columns, key))
+
+    if direction == NEXT:
+        query = query.order_by(*[column.asc() for column in columns])
+
+    else:
+        query = query.order_by(*[column.desc() for column in columns])
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if direction == PREVIOUS:
+        rows.reverse()
+
+    def key_of(row):
+        return [getattr(row, column.key) for column in columns]
+
+    next_cursor = prev_cursor = None
+
+    if rows:
+        if has_more or direction == PREVIOUS:
+            next_cursor = encode_cursor(key_of(rows[-1]), NEXT)
+
+        if (has_more and direction == PREVIOUS) or (cursor and direction == NEXT):
+            prev_cursor = encode_cursor(key_of(rows[0]), PREVIOUS)
+
+    return KeysetPage(rows, next_cursor, prev_cursor)
+
+
+class OffsetPage(object):
+    """
+    Page of rows fetched with LIMIT and OFFSET, `total` and `pages` are None
+    when counting was skipped.
+    """
+
+    def __init__(self, items, page, per_page, total, has_next):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.has_next = has_next
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+
+        return int(math.ceil(self.total / float(self.per_page))) if self.per_page else 0
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+
+def offset_paginate(query, page, per_page, total=None):
+    """
+    Fetch one page of rows using LIMIT and OFFSET without issuing a COUNT,
+    one extra row is fetched to find out if there is a next page.
+
+    :param query: query of rows.
+    :param page: page number, starting at 1.
+    :param per_page: number of rows in page.
+    :param total: total number of rows if already known.
+    :return: `OffsetPage`.
+    """
+
+    page = max(page, 1)
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+
+    return OffsetPage(rows[:per_page], page, per_page, total, len(rows) > per_page)
+
+
+def estimate_rows(query):
+    """
+    Estimate number of rows a query returns from planner statistics, databases
+    without a usable estimate fall back to an exact count.
+
+    :param query: query of rows.
+    :return: estimated number of rows.
+    """
+
+    connection = DB.session.connection()
+
+    if connection.dialect.name != 'postgresql':
+        return query.order_by(None).count()
+
+    compiled = query.order_by(None).statement.compile(dialect=connection.dialect)
+    plan = connection.execute('EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params).scalar()
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_rows(query, mode, estimate=None):
+    """
+    Count rows of a query according to count mode.
+
+    :param query: query of rows.
+    :param mode: `exact`, `estimate` or `none`.
+    :param estimate: callable returning a cached count, used in estimate mode
+                     instead of planner statistics.
+    :return: number of rows or None if counting is skipped.
+    """
+
+    if mode == 'none':
+        return None
+
+    if mode == 'estimate':
+        if estimate is not None:
+            return estimate()
+
+        return estimate_rows(query)
+
+    return query.order_by(None).count()
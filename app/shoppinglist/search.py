@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module implements full-text search of shopping lists.
+
+Every shopping list has one search document made of its name, description and
+the names of its items. The document lives in a side table maintained by the
+views, the backend is picked from the database dialect:
+
+    postgresql  `shopping_list_search` table with a `tsvector` column and GIN index.
+    sqlite      `shopping_list_fts` FTS5 virtual table.
+    others      `ilike` on shopping list names.
+
+Documents are rebuilt once per changed list when the unit of work of a request
+commits rather than on every item write, in-process indexes are updated only
+after the commit.
+
+Results are ranked, names weigh more than descriptions which weigh more than item names.
+
+Fuzzy search tolerates typos by comparing trigrams of words, Postgres uses `pg_trgm`
+on the document text while other databases use the in-process `TrigramIndex`.
+"""
+
+import functools
+import re
+
+from flask import current_app
+from sqlalchemy import event, text
+
+from app import DB
+from ..db.base import before_commit, commit_or_flush, on_commit
+from .fuzzy import TrigramIndex
+from .pagination import OffsetPage
+from .utils import prep_keyword
+from ..models import ShoppingList
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(term):
+    """
+    Splits search term into lower case words, punctuation is dropped.
+
+    :param term: raw search term.
+    :return: list of words.
+    """
+
+    return _WORD.findall(term.lower())
+
+
+class SearchBackend(object):
+    """
+    Search backend interface, the base class matches shopping list names with `ilike`
+    and keeps only the in-process trigram index for fuzzy search.
+    """
+
+    def __init__(self):
+        self.trigrams = TrigramIndex(tokenize)
+
+    def create(self, connection):
+        """
+        Create index structures, called after tables are created.
+        """
+
+    def drop(self, connection):
+        """
+        Drop index structures, called before tables are dropped.
+        """
+
+        self.trigrams.clear()
+
+    def index_list(self, shoppinglistId):
+        """
+        Add or refresh search document of a shopping list.
+
+        Within a unit of work the document is written once, however many times
+        the list changed, right before the unit commits. The trigram index is
+        refreshed after the commit so a rollback leaves it untouched.
+        """
+
+        before_commit(functools.partial(self.write_document, shoppinglistId),
+                      key=('search', shoppinglistId))
+        on_commit(functools.partial(self.trigrams.index_list, shoppinglistId),
+                  key=('trigrams', shoppinglistId))
+
+    def write_document(self, shoppinglistId):
+        """
+        Write search document of a shopping list from its current rows.
+        """
+
+    def remove_list(self, shoppinglistId):
+        """
+        Remove search document of a shopping list.
+        """
+
+        on_commit(functools.partial(self.trigrams.remove_list, shoppinglistId))
+
+    def remove_owner(self, ownerId):
+        """
+        Remove search documents of every shopping list of a user.
+        """
+
+        on_commit(functools.partial(self.trigrams.remove_owner, ownerId))
+
+    def rebuild(self):
+        """
+        Rebuild search documents of all shopping lists.
+
+        :return: number of documents indexed.
+        """
+
+        self.trigrams.clear()
+        return 0
+
+    def match(self, ownerId, term, offset, limit):
+        """
+        Find shopping lists matching term.
+
+        :param ownerId: id of user whose lists are searched.
+        :param term: raw search term.
+        :param offset: number of matches to skip.
+        :param limit: maximum number of matches.
+        :return: tuple of list ids in rank order and total number of matches.
+        """
+
+        query = ShoppingList.for_owner(ownerId).filter(
+            ShoppingList.name.ilike(prep_keyword(term)))
+
+        ids = [row.id for row in query.with_entities(ShoppingList.id).order_by(
+            ShoppingList.id).limit(limit).offset(offset)]
+
+        return ids, query.count()
+
+    def fuzzy_match(self, ownerId, term, offset, limit, threshold):
+        """
+        Find shopping lists with words similar to term.
+
+        :param ownerId: id of user whose lists are searched.
+        :param term: raw search term.
+        :param offset: number of matches to skip.
+        :param limit: maximum number of matches.
+        :param threshold: minimum similarity, between 0 and 1.
+        :return: tuple of list ids in similarity order and total number of matches.
+        """
+
+        matches = self.trigrams.match(ownerId, term, threshold)
+        return [shl_id for shl_id, _ in matches[offset:offset + limit]], len(matches)
+
+    def search(self, ownerId, term, page, per_page, mode='fulltext', threshold=0.3):
+        """
+        Fetch one page of shopping lists matching term.
+
+        :param ownerId: id of user whose lists are searched.
+        :param term: raw search term.
+        :param page: page number, starting at 1.
+        :param per_page: number of results per page.
+        :param mode: `fulltext` or `fuzzy`.
+        :param threshold: minimum similarity of fuzzy matches.
+        :return: `OffsetPage` of shopping lists in rank order.
+        """
+
+        page = max(page, 1)
+        offset = (page - 1) * per_page
+
+        if mode == 'fuzzy':
+            ids, total = self.fuzzy_match(ownerId, term, offset, per_page, threshold)
+
+        else:
+            ids, total = self.match(ownerId, term, offset, per_page)
+
+        shoppinglists = {}
+        if ids:
+            shoppinglists = {shl.id: shl for shl in ShoppingList.query.filter(
+                ShoppingList.id.in_(ids))}
+
+        items = [shoppinglists[shl_id] for shl_id in ids if shl_id in shoppinglists]
+        return OffsetPage(items, page, per_page, total, page * per_page < total)
+
+    def _execute(self, statement, **params):
+        DB.session.execute(text(statement), params)
+        commit_or_flush()
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Search documents stored as weighted `tsvector` values behind a GIN index, their
+    plain text is kept next to them behind a trigram GIN index for fuzzy search.
+    """
+
+    DOCUMENT = """
+        setweight(to_tsvector('simple', l.name), 'A') ||
+        setweight(to_tsvector('simple', coalesce(l.description, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(
+            (SELECT string_agg(i.name, ' ') FROM shopping_item i
+             WHERE i.shoppinglist_id = l.id), '')), 'C')
+    """
+
+    BODY = """
+        lower(l.name || ' ' || coalesce(l.description, '') || ' ' || coalesce(
+            (SELECT string_agg(i.name, ' ') FROM shopping_item i
+             WHERE i.shoppinglist_id = l.id), ''))
+    """
+
+    UPSERT = """
+        INSERT INTO shopping_list_search (shoppinglist_id, owner_id, document, body)
+        SELECT l.id, l.owner_id, %(document)s, %(body)s FROM shopping_list l %(where)s
+        ON CONFLICT (shoppinglist_id) DO UPDATE
+        SET owner_id = EXCLUDED.owner_id, document = EXCLUDED.document, body = EXCLUDED.body
+    """
+
+    def create(self, connection):
+        connection.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS shopping_list_search ('
+            'shoppinglist_id INTEGER PRIMARY KEY REFERENCES shopping_list (id) ON DELETE CASCADE, '
+            'owner_id INTEGER NOT NULL, '
+            'document TSVECTOR NOT NULL, '
+            'body TEXT NOT NULL)')
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS ix_shopping_list_search_body '
+            'ON shopping_list_search USING GIN (body gin_trgm_ops)')
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS ix_shopping_list_search_document '
+            'ON shopping_list_search USING GIN (document)')
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS ix_shopping_list_search_owner_id '
+            'ON shopping_list_search (owner_id)')
+
+    def drop(self, connection):
+        connection.execute('DROP TABLE IF EXISTS shopping_list_search')
+
+    def index_list(self, shoppinglistId):
+        # fuzzy search uses pg_trgm, there is no trigram index to refresh.
+        before_commit(functools.partial(self.write_document, shoppinglistId),
+                      key=('search', shoppinglistId))
+
+    def write_document(self, shoppinglistId):
+        self._execute(self.UPSERT % dict(
+            document=self.DOCUMENT, body=self.BODY, where='WHERE l.id = :id'), id=shoppinglistId)
+
+    def remove_list(self, shoppinglistId):
+        self._execute('DELETE FROM shopping_list_search WHERE shoppinglist_id = :id',
+                      id=shoppinglistId)
+
+    def remove_owner(self, ownerId):
+        self._execute('DELETE FROM shopping_list_search WHERE owner_id = :owner',
+                      owner=ownerId)
+
+    def rebuild(self):
+        DB.session.execute(text('DELETE FROM shopping_list_search'))
+        result = DB.session.execute(text(self.UPSERT % dict(
+            document=self.DOCUMENT, body=self.BODY, where='')))
+        commit_or_flush()
+        return result.rowcount
+
+    def match(self, ownerId, term, offset, limit):
+        words = tokenize(term)
+        if not words:
+            return [], 0
+
+        # every word must match, the last one can be incomplete.
+        params = dict(owner=ownerId, query=' & '.join(word + ':*' for word in words))
+
+        total = DB.session.execute(text(
+            "SELECT count(*) FROM shopping_list_search "
+            "WHERE owner_id = :owner AND document @@ to_tsquery('simple', :query)"),
+            params).scalar()
+
+        rows = DB.session.execute(text(
+            "SELECT s.shoppinglist_id FROM shopping_list_search s, "
+            "to_tsquery('simple', :query) q "
+            "WHERE s.owner_id = :owner AND s.document @@ q "
+            "ORDER BY ts_rank(s.document, q) DESC, s.shoppinglist_id "
+            "LIMIT :limit OFFSET :offset"),
+            dict(params, limit=limit, offset=offset))
+
+        return [row[0] for row in rows], total
+
+    def fuzzy_match(self, ownerId, term, offset, limit, threshold):
+        words = tokenize(term)
+        if not words:
+            return [], 0
+
+        params = dict(owner=ownerId, query=' '.join(words))
+
+        # `<%` uses the word similarity threshold of the current transaction.
+        DB.session.execute(text(
+            "SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+            dict(threshold=str(threshold)))
+
+        total = DB.session.execute(text(
+            'SELECT count(*) FROM shopping_list_search '
+            'WHERE owner_id = :owner AND :query <% body'), params).scalar()
+
+        rows = DB.session.execute(text(
+            'SELECT shoppinglist_id FROM shopping_list_search '
+            'WHERE owner_id = :owner AND :query <% body '
+            'ORDER BY word_similarity(:query, body) DESC, shoppinglist_id '
+            'LIMIT :limit OFFSET :offset'),
+            dict(params, limit=limit, offset=offset))
+
+        return [row[0] for row in rows], total
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    Search documents stored in an FTS5 table whose rowid is the shopping list id.
+    """
+
+    INSERT = """
+        INSERT INTO shopping_list_fts (rowid, name, description, items, owner_id)
+        SELECT l.id, l.name, coalesce(l.description, ''), coalesce(
+            (SELECT group_concat(i.name, ' ') FROM shopping_item i
+             WHERE i.shoppinglist_id = l.id), ''), l.owner_id
+        FROM shopping_list l %(where)s
+    """
+
+    # bm25 weights of name, description and items columns.
+    RANK = 'bm25(shopping_list_fts, 10.0, 4.0, 1.0)'
+
+    def create(self, connection):
+        connection.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS shopping_list_fts '
+            'USING fts5(name, description, items, owner_id UNINDEXED)')
+
+    def drop(self, connection):
+        connection.execute('DROP TABLE IF EXISTS shopping_list_fts')
+        super(SQLiteSearchBackend, self).drop(connection)
+
+    def write_document(self, shoppinglistId):
+        DB.session.execute(text('DELETE FROM shopping_list_fts WHERE rowid = :id'),
+                           dict(id=shoppinglistId))
+        self._execute(self.INSERT % dict(where='WHERE l.id = :id'), id=shoppinglistId)
+
+    def remove_list(self, shoppinglistId):
+        self._execute('DELETE FROM shopping_list_fts WHERE rowid = :id', id=shoppinglistId)
+        super(SQLiteSearchBackend, self).remove_list(shoppinglistId)
+
+    def remove_owner(self, ownerId):
+        self._execute('DELETE FROM shopping_list_fts WHERE owner_id = :owner', owner=ownerId)
+        super(SQLiteSearchBackend, self).remove_owner(ownerId)
+
+    def rebuild(self):
+        self.trigrams.clear()
+        DB.session.execute(text('DELETE FROM shopping_list_fts'))
+        result = DB.session.execute(text(self.INSERT % dict(where='')))
+        commit_or_flush()
+        return result.rowcount
+
+    def match(self, ownerId, term, offset, limit):
+        words = tokenize(term)
+        if not words:
+            return [], 0
+
+        # every word must match as a prefix.
+        params = dict(owner=ownerId, query=' '.join('"%s"*' % word for word in words))
+
+        total = DB.session.execute(text(
+            'SELECT count(*) FROM shopping_list_fts '
+            'WHERE shopping_list_fts MATCH :query AND owner_id = :owner'),
+            params).scalar()
+
+        rows = DB.session.execute(text(
+            'SELECT rowid FROM shopping_list_fts '
+            'WHERE shopping_list_fts MATCH :query AND owner_id = :owner '
+            'ORDER BY %(rank)s, rowid LIMIT :limit OFFSET :offset' % dict(rank=self.RANK)),
+            dict(params, limit=limit, offset=offset))
+
+        return [row[0] for row in rows], total
+
+
+class SearchIndex(object):
+    """
+    Dispatches search index operations to the backend of the current database.
+    """
+
+    backends = {
+        'postgresql': PostgresSearchBackend(),
+        'sqlite': SQLiteSearchBackend(),
+    }
+
+    default_backend = SearchBackend()
+
+    def backend_for(self, dialect_name):
+        return self.backends.get(dialect_name, self.default_backend)
+
+    @property
+    def backend(self):
+        return self.backend_for(DB.session.get_bind().dialect.name)
+
+    def index_list(self, shoppinglistId):
+        self.backend.index_list(shoppinglistId)
+
+    def remove_list(self, shoppinglistId):
+        self.backend.remove_list(shoppinglistId)
+
+    def remove_owner(self, ownerId):
+        self.backend.remove_owner(ownerId)
+
+    def rebuild(self):
+        return self.backend.rebuild()
+
+    def search(self, ownerId, term, page, per_page, mode='fulltext'):
+        return self.backend.search(
+            ownerId, term, page, per_page, mode=mode,
+            threshold=current_app.config.get('FUZZY_SEARCH_THRESHOLD', 0.3))
+
+
+search_index = SearchIndex()
+
+
+@event.listens_for(DB.Model.metadata, 'after_create')
+def _create_search_index(target, connection, **kw):
+    search_index.backend_for(connection.dialect.name).create(connection)
+
+
+@event.listens_for(DB.Model.metadata, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    search_index.backend_for(connection.dialect.name).drop(connection)
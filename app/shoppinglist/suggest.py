@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module implements item name suggestions from a user's own shopping history.
+
+Every user gets a prefix trie of the names of their shopping items, built from the
+database the first time they ask for suggestions and then kept up to date by the
+item views once their unit of work has committed. Tries live in a LRU cache bounded
+by the total number of trie nodes, users that have not asked for suggestions
+recently are evicted first.
+"""
+
+import functools
+import heapq
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+from app import DB
+from ..conf.settings import SUGGESTION_CACHE_MAX_NODES
+from ..db.base import on_commit
+from ..models import ShoppingList, ShoppingItem
+
+
+class _Node(object):
+    __slots__ = ('children', 'names')
+
+    def __init__(self):
+        self.children = {}
+        # display names ending at this node and the number of items using them.
+        self.names = None
+
+
+class PrefixTrie(object):
+    """
+    Case insensitive prefix trie of item names counting how often each name is used.
+    """
+
+    def __init__(self):
+        self.root = _Node()
+        self.size = 1
+
+    def add(self, name, count=1):
+        node = self.root
+
+        for char in name.lower():
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node()
+                self.size += 1
+
+            node = child
+
+        if node.names is None:
+            node.names = {}
+
+        node.names[name] = node.names.get(name, 0) + count
+
+    def remove(self, name):
+        path = [self.root]
+
+        for char in name.lower():
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+
+            path.append(node)
+
+        node = path[-1]
+        if not node.names or name not in node.names:
+            return
+
+        node.names[name] -= 1
+        if node.names[name] <= 0:
+            del node.names[name]
+
+        if not node.names:
+            node.names = None
+
+        # prune branches left without names.
+        key = name.lower()
+        for depth in range(len(path) - 1, 0, -1):
+            node = path[depth]
+            if node.children or node.names:
+                break
+
+            del path[depth - 1].children[key[depth - 1]]
+            self.size -= 1
+
+    def suggest(self, prefix, limit):
+        """
+        Most used names starting with prefix.
+
+        :param prefix: start of item name.
+        :param limit: maximum number of names.
+        :return: list of names, most used first.
+        """
+
+        node = self.root
+        for char in prefix.lower():
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        names = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.names:
+                names.extend((-count, name) for name, count in node.names.items())
+
+            stack.extend(node.children.values())
+
+        return [name for _, name in heapq.nsmallest(limit, names)]
+
+
+class SuggestionCache(object):
+    """
+    LRU cache of per-user prefix tries bounded by the total number of trie nodes.
+    """
+
+    def __init__(self, max_nodes):
+        """
+        :param max_nodes: maximum number of trie nodes kept across all users.
+        """
+
+        self.max_nodes = max_nodes
+        self._tries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        """
+        Number of trie nodes kept across all users.
+        """
+
+        return self._size
+
+    def suggest(self, ownerId, prefix, limit):
+        """
+        Item names of a user starting with prefix, the trie is built on first use.
+
+        :param ownerId: id of user.
+        :param prefix: start of item name.
+        :param limit: maximum number of names.
+        :return: list of names, most used first.
+        """
+
+        with self._lock:
+            trie = self._tries.get(ownerId)
+            if trie is not None:
+                self._tries.move_to_end(ownerId)
+                return trie.suggest(prefix, limit)
+
+        trie = self._load(ownerId)
+
+        with self._lock:
+            if ownerId in self._tries:
+                self._size -= self._tries[ownerId].size
+
+            self._tries[ownerId] = trie
+            self._size += trie.size
+            self._evict(ownerId)
+            return trie.suggest(prefix, limit)
+
+    def add(self, ownerId, name):
+        """
+        Record a new item name of a user, ignored if the user has no trie yet.
+        """
+
+        on_commit(functools.partial(self._add, ownerId, name))
+
+    def remove(self, ownerId, name):
+        """
+        Forget one use of an item name of a user.
+        """
+
+        on_commit(functools.partial(self._remove, ownerId, name))
+
+    def rename(self, ownerId, old_name, new_name):
+        if old_name != new_name:
+            self.remove(ownerId, old_name)
+            self.add(ownerId, new_name)
+
+    def invalidate(self, ownerId):
+        """
+        Drop trie of a user, it is rebuilt on next use.
+        """
+
+        on_commit(functools.partial(self._invalidate, ownerId))
+
+    def clear(self):
+        with self._lock:
+            self._tries.clear()
+            self._size = 0
+
+    def _add(self, ownerId, name):
+        with self._lock:
+            trie = self._tries.get(ownerId)
+            if trie is not None:
+                before = trie.size
+                trie.add(name)
+                self._size += trie.size - before
+                self._evict(ownerId)
+
+    def _remove(self, ownerId, name):
+        with self._lock:
+            trie = self._tries.get(ownerId)
+            if trie is not None:
+                before = trie.size
+                trie.remove(name)
+                self._size += trie.size - before
+
+    def _invalidate(self, ownerId):
+        with self._lock:
+            trie = self._tries.pop(ownerId, None)
+            if trie is not None:
+                self._size -= trie.size
+
+    def _load(self, ownerId):
+        trie = PrefixTrie()
+
+        rows = DB.session.query(ShoppingItem.name, DB.func.count(ShoppingItem.id)).join(
+            ShoppingList, ShoppingItem.shoppinglist_id == ShoppingList.id).filter(
+            ShoppingList.owner_id == ownerId).group_by(ShoppingItem.name)
+
+        for name, count in rows:
+            trie.add(name, count)
+
+        return trie
+
+    def _evict(self, ownerId):
+        while self._size > self.max_nodes and len(self._tries) > 1:
+            victim = next(iter(self._tries))
+            if victim == ownerId:
+                self._tries.move_to_end(ownerId)
+                continue
+
+            self._size -= self._tries.pop(victim).size
+
+
+suggestions = SuggestionCache(SUGGESTION_CACHE_MAX_NODES)
+
+
+@event.listens_for(DB.Model.metadata, 'before_drop')
+def _clear_suggestions(target, connection, **kw):
+    suggestions.clear()
@@ -10,7 +10,8 @@ from app import API
 
 from .views import \
     (ShoppingListsApi, ShoppingListDetailApi, ShoppingItemListApi,
-     ShoppingItemDetailApi, SearchShoppingListApi)
+     ShoppingItemDetailApi, SearchShoppingListApi, SearchShoppingItemApi,
+     SuggestShoppingItemApi)
 
 SHOPPINGLIST = Blueprint('shopping_list', __name__)
 
@@ -34,3 +35,9 @@ API.add_resource(
 
 API.add_resource(
     SearchShoppingListApi, 'shopping-lists/search', endpoint='shoppinglist_search')
+
+API.add_resource(
+    SearchShoppingItemApi, 'shopping-items/search', endpoint='shoppingitem_search')
+
+API.add_resource(
+    SuggestShoppingItemApi, 'shopping-items/suggest', endpoint='shoppingitem_suggest')
@@ -13,6 +13,9 @@ import collections
 
 from webargs import fields, validate
 
+from .pagination import COUNT_MODES, ORDERINGS
+from ..core.serializers import format_datetime, make_serializer
+
 create_args = collections.OrderedDict(
     [
         ('name', fields.Str(required=True,
@@ -50,15 +53,47 @@ item_update_args = collections.OrderedDict(
 pagination_args = collections.OrderedDict(
     [
         ('page', fields.Int(required=False)),
-        ('limit', fields.Int(required=False))
+        ('limit', fields.Int(required=False)),
+        ('cursor', fields.Str(required=False)),
+        ('order', fields.Str(required=False, validate=validate.OneOf(ORDERINGS))),
+        ('count', fields.Str(required=False, validate=validate.OneOf(COUNT_MODES)))
     ]
 )
 
+SEARCH_MODES = ('fulltext', 'fuzzy')
+
 search_args = collections.OrderedDict(
     [
         ('q', fields.Str(required=True, location='querystring')),
         ('page', fields.Int(required=False, location='querystring')),
         ('limit', fields.Int(required=False, location='querystring')),
+        ('items_limit', fields.Int(required=False, location='querystring',
+                                   validate=validate.Range(min=0))),
+        ('mode', fields.Str(required=False, location='querystring',
+                            validate=validate.OneOf(SEARCH_MODES))),
+    ]
+)
+
+item_search_args = collections.OrderedDict(
+    [
+        ('q', fields.Str(required=True, location='querystring')),
+        ('cursor', fields.Str(required=False, location='querystring')),
+        ('limit', fields.Int(required=False, location='querystring')),
+    ]
+)
+
+clear_args = collections.OrderedDict(
+    [
+        ('bought', fields.Str(required=False, location='querystring',
+                              validate=validate.OneOf(['0', '1']))),
+    ]
+)
+
+suggest_args = collections.OrderedDict(
+    [
+        ('prefix', fields.Str(required=True, location='querystring')),
+        ('limit', fields.Int(required=False, location='querystring',
+                             validate=validate.Range(min=1))),
     ]
 )
 
@@ -79,10 +114,14 @@ class MakePaginationUrls(object):
         self.page = page
         self.limit = limit
 
-    def make_url(self, term=None, for_search=False):
+    def make_url(self, term=None, for_search=False, count=None, order=None):
         """
         Method to generate pagination urls.
 
+        :param term: search term, if paging through search results.
+        :param for_search: whether the url pages through search results.
+        :param count: counting mode requested for the pages.
+        :param order: ordering requested for the pages.
         :return: url.
         """
         url = ''
@@ -99,9 +138,76 @@ class MakePaginationUrls(object):
                               page=self.page,
                               limit=self.limit)
 
+        return self.add_params(url, count=count, order=order)
+
+    def make_cursor_url(self, cursor, order=None, term=None, count=None):
+        """
+        Method to generate cursor pagination urls.
+
+        :param cursor: opaque cursor of the page.
+        :param order: ordering used by the cursor.
+        :param term: search term, if paging through search results.
+        :param count: counting mode requested for the pages.
+        :return: url.
+        """
+
+        _url = "%(base)s?cursor=%(cursor)s&limit=%(limit)s"
+        url = _url % dict(base=self.request.base_url,
+                          cursor=cursor,
+                          limit=self.limit)
+
+        if term is not None:
+            url = '%(url)s&q=%(term)s' % dict(url=url, term=term)
+
+        if order == 'id':
+            order = None
+
+        return self.add_params(url, count=count, order=order)
+
+    @staticmethod
+    def add_params(url, count=None, order=None):
+        """
+        Carries the counting mode and ordering of the current page to url.
+
+        :param url: page url.
+        :param count: counting mode requested for the pages.
+        :param order: ordering requested for the pages.
+        :return: url.
+        """
+
+        if count is not None:
+            url = '%(url)s&count=%(count)s' % dict(url=url, count=count)
+
+        if order is not None:
+            url = '%(url)s&order=%(order)s' % dict(url=url, order=order)
+
         return url
 
 
+shoppinglist_data = make_serializer(
+    [('id', 'id'), ('name', 'name'), ('description', 'description')])
+
+_shoppingitem_data = make_serializer(
+    [('id', 'id'), ('name', 'name'), ('price', 'price'), ('bought', 'bought'),
+     ('quantity_description', 'quantity_description'), ('created_on', 'timestamp'),
+     ('updated_on', 'updated')],
+    formatters=dict(created_on=format_datetime, updated_on=format_datetime))
+
+
+def shoppingitem_data(item, parent_name):
+    """
+    Listing representation of a shopping item.
+
+    :param item: instance or projected row.
+    :param parent_name: name of the shopping list of the item.
+    :return: dict.
+    """
+
+    data = _shoppingitem_data(item)
+    data['parent_name'] = parent_name
+    return data
+
+
 def prep_keyword(keyword):
     """
     prepares keywords used for search.
@@ -5,17 +5,46 @@ This module provides endpoint resources that manages all CRUD operations of user
 and shopping items functionalities.
 """
 
-from flask import jsonify, make_response, request
+from flask import Response, current_app, jsonify, make_response, request, stream_with_context
 from flask_restful import Resource
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from webargs.flaskparser import use_args
 
+from .pagination import count_rows, keyset_paginate, offset_paginate
+from .search import search_index
+from .suggest import suggestions
 from .utils import *
-from ..conf.settings import MAX_ITEMS_PER_PAGE
-from ..core.loggers import AppLogger
+from ..conf.settings import MAX_ITEMS_PER_PAGE, MAX_SUGGESTIONS, STREAM_CHUNK_SIZE
+from ..core.exceptions import InvalidCursor
+from ..core.serializers import format_datetime, stream_json
 from ..core.validators import NameValidator
+from ..db.base import atomic
 from ..messages import *
-from ..models import User, ShoppingList, ShoppingItem
+from ..auth.security import current_user_id
+from ..models import ShoppingList, ShoppingItem
+
+
+def set_cursor_links(response, page, limit, order, term=None, count=None):
+    """
+    Adds cursors of adjacent pages and their urls to response.
+
+    :param response: response data.
+    :param page: `KeysetPage`.
+    :param limit: number of results per page.
+    :param order: ordering used by the cursors.
+    :param term: search term, if paging through search results.
+    :param count: counting mode requested for the pages.
+    """
+
+    urls = urlmaker(request, None, limit)
+
+    if page.prev_cursor:
+        response.setdefault('prev_cursor', page.prev_cursor)
+        response.setdefault('previous_page_url', urls.make_cursor_url(page.prev_cursor, order, term, count))
+
+    if page.next_cursor:
+        response.setdefault('next_cursor', page.next_cursor)
+        response.setdefault('next_page_url', urls.make_cursor_url(page.next_cursor, order, term, count))
 
 
 class ShoppingListsApi(Resource):
@@ -39,55 +68,77 @@ class ShoppingListsApi(Resource):
                 )), 422
             )
 
-        current_user = get_jwt_identity()
-        user = User.query.filter_by(username=current_user).first()
+        shoppinglists = ShoppingList.rows_for_owner(current_user_id())
 
         response = {}
 
-        response.setdefault('total_shoppinglist', user.shopping_lists.count())
-
         page = args.get('page', 1)
         limit = args.get('limit', MAX_ITEMS_PER_PAGE)
+        cursor = args.get('cursor', None)
+        count = args.get('count', current_app.config['PAGINATION_COUNT'])
+
+        # cursor pagination, pages are fetched after the key of the previous page.
+        if cursor is not None:
+            if limit < 1:
+                return params_error(negative_limit)
+
+            order = args.get('order', 'id')
+
+            try:
+                keyset_page = keyset_paginate(shoppinglists, ShoppingList, cursor, limit, order)
+
+            except InvalidCursor:
+                return params_error(invalid_cursor)
+
+            total = count_rows(shoppinglists, count)
+
+            if total is not None:
+                response.setdefault('total_shoppinglist', total)
+
+            set_cursor_links(response, keyset_page, limit, order, count=args.get('count'))
+
+            output = [shoppinglist_data(shl) for shl in keyset_page.items]
+
+            response.setdefault('data', output)
 
         # if the values are default, then no need for pagination.
-        if any([page != 1, limit != MAX_ITEMS_PER_PAGE]):
+        elif any([page != 1, limit != MAX_ITEMS_PER_PAGE]):
             if page < 0:
                 return params_error(negative_page)
 
             if limit < 0:
                 return params_error(negative_limit)
 
-            paginated = user.shopping_lists.paginate(page=page, per_page=limit, error_out=False)
+            # the same total is reported for the listing and its pages.
+            total = count_rows(shoppinglists, count)
+            url_params = dict(count=args.get('count'), order=args.get('order'))
+            paginated = offset_paginate(shoppinglists, page, limit, total)
+
+            if total is not None:
+                response.setdefault('total_shoppinglist', total)
+                response.setdefault('total_pages', paginated.pages)
+                response.setdefault('total_items', total)
 
             response.setdefault('current_page', paginated.page)
-            response.setdefault('total_pages', paginated.pages)
-            response.setdefault('total_items', paginated.total)
 
             if paginated.has_prev:
-                prev_page_url = urlmaker(request, paginated.prev_num, limit).make_url()
+                prev_page_url = urlmaker(request, paginated.prev_num, limit).make_url(**url_params)
                 response.setdefault('previous_page', paginated.prev_num)
                 response.setdefault('previous_page_url', prev_page_url)
 
             if paginated.has_next:
-                next_page_url = urlmaker(request, paginated.next_num, limit).make_url()
+                next_page_url = urlmaker(request, paginated.next_num, limit).make_url(**url_params)
                 response.setdefault('next_page', paginated.next_num)
                 response.setdefault('next_page_url', next_page_url)
 
-            output = [{
-                'id': shl.id,
-                'name': shl.name,
-                'description': shl.description} for shl in paginated.items]
+            output = [shoppinglist_data(shl) for shl in paginated.items]
 
             response.setdefault('data', output)
 
         else:
-            shoppinglists = user.shopping_lists.all()
-
-            output = [{
-                'id': shl.id,
-                'name': shl.name,
-                'description': shl.description} for shl in shoppinglists]
+            output = [shoppinglist_data(shl) for shl in shoppinglists.all()]
 
+            response.setdefault('total_shoppinglist', len(output))
             response.setdefault('shopping_lists', output)
 
         return make_response(
@@ -95,18 +146,17 @@ class ShoppingListsApi(Resource):
 
     @use_args(create_args)
     @jwt_required
+    @atomic
     def post(self, data):
         """
         Handles creation of shoppinglist objects.
         """
 
-        current_user = get_jwt_identity()
+        owner_id = current_user_id()
 
         name = data.get('name')
         description = data.get('description')
 
-        user = User.query.filter_by(username=current_user).first()
-
         validator = NameValidator(name)
         validator()
 
@@ -115,21 +165,17 @@ class ShoppingListsApi(Resource):
 
         name = name.strip()
 
-        # check if shopping list exists
-        old_shl = ShoppingList.query.filter_by(name=name, owner_id=user.id).first()
+        # save shopping list, names are unique per owner.
+        shl = ShoppingList(name=name, owner_id=owner_id, description=description)
 
-        # if shopping list exists return bad request response.
-        if old_shl:
+        try:
+            shl.save()
 
+        except ShoppingList.ShoppingListExists:
             return make_response(
                 jsonify(dict(message=shoppinglist_name_exists)), 409)
 
-        # get user instance.
-        user = User.query.filter_by(username=current_user).first()
-
-        # save shopping list.
-        shl = ShoppingList(name=name, owner_id=user.id, description=description)
-        shl.save()
+        search_index.index_list(shl.id)
 
         return make_response(
             jsonify(dict(
@@ -137,10 +183,11 @@ class ShoppingListsApi(Resource):
                 data=dict(
                     id=shl.id,
                     name=shl.name,
-                    created_on=shl.timestamp.strftime("%Y-%m-%d %H:%M:%S"))
+                    created_on=format_datetime(shl.timestamp))
             )), 201)
 
     @jwt_required
+    @atomic
     def delete(self):
         """
         Deletes all user shopping lists
@@ -148,15 +195,11 @@ class ShoppingListsApi(Resource):
         :return: response.
         """
 
-        current_user = get_jwt_identity()
+        owner_id = current_user_id()
 
-        # get user instance.
-        user = User.get_by_username(username=current_user)
-
-        shoppinglists = user.shopping_lists
-        if shoppinglists.count() > 0:
-            for shl in shoppinglists:
-                shl.delete()
+        if ShoppingList.delete_all(owner_id) > 0:
+            search_index.remove_owner(owner_id)
+            suggestions.invalidate(owner_id)
 
             return make_response(jsonify(dict(message=shoppinglists_deleted)), 200)
 
@@ -178,44 +221,33 @@ class ShoppingListDetailApi(Resource):
         :param shl_id: id of shopping list.
         :return: response.
         """
-        current_user = get_jwt_identity()
-
-        # get user instance.
-        user = User.get_by_username(username=current_user)
-
         data = {}
 
-        # get shoppinglist using provided id, if not found raise error 404 and
-        # return response to client.
-        try:
-            shoppinglist = user.shopping_lists.filter_by(
-                id=int(shl_id)).first_or_404()
+        # get shoppinglist using provided id, if not found return error 404 to client.
+        shoppinglist = ShoppingList.get(shl_id, current_user_id())
 
-        except Exception as e:
-            AppLogger(self.__class__.__name__).logger.warning(e)
+        if not shoppinglist:
             return make_response(
                 jsonify(dict(
                     message=shoppinglist_not_found)), 404)
 
-        # filter bought items and those not bought.
-        bought = shoppinglist.shopping_items.filter_by(bought=True).count()
-        not_bought = shoppinglist.shopping_items.filter_by(bought=False).count()
-
+        # item totals are read from counters maintained by the item views.
         data.setdefault('id', shoppinglist.id)
         data.setdefault('name', shoppinglist.name)
         data.setdefault('description', shoppinglist.description)
-        data.setdefault('total_items', shoppinglist.shopping_items.count())
-        data.setdefault('bought_items', bought)
-        data.setdefault('items_not_bought', not_bought)
-        data.setdefault('total', shoppinglist.cost())
-        data.setdefault('created_on', shoppinglist.timestamp.strftime("%Y-%m-%d %H:%M:%S"))
-        data.setdefault('updated_on', shoppinglist.updated.strftime("%Y-%m-%d %H:%M:%S"))
+        data.setdefault('total_items', shoppinglist.item_count)
+        data.setdefault('bought_items', shoppinglist.bought_count)
+        data.setdefault('items_not_bought', shoppinglist.item_count - shoppinglist.bought_count)
+        data.setdefault('total', shoppinglist.total_price)
+        data.setdefault('created_on', format_datetime(shoppinglist.timestamp))
+        data.setdefault('updated_on', format_datetime(shoppinglist.updated))
 
         return make_response(
             jsonify(dict(data=data)), 200)
 
     @use_args(update_args)
     @jwt_required
+    @atomic
     def put(self, args, shl_id):
         """
         Handles PUT request to update user shopping list.
@@ -224,7 +256,7 @@ class ShoppingListDetailApi(Resource):
         :param shl_id: shopping list id
         :return: response
         """
-        current_user = get_jwt_identity()
+        owner_id = current_user_id()
 
         def response():
             return make_response(
@@ -233,18 +265,15 @@ class ShoppingListDetailApi(Resource):
                     data=dict(
                         name=shoppinglist.name,
                         description=shoppinglist.description,
-                        updated_on=shoppinglist.updated.strftime("%Y-%m-%d %H:%M:%S"))
+                        updated_on=format_datetime(shoppinglist.updated))
                 )), 200)
 
-        # get user instance
-        user = User.query.filter_by(username=current_user).first()
-
         # new name provided by client
         name = args.get('name', None)
         description = args.get('description', None)
 
         # check if shopping list exists, if not, return 404 response to client.
-        shoppinglist = user.shopping_lists.filter_by(id=int(shl_id)).first()
+        shoppinglist = ShoppingList.get(int(shl_id), owner_id)
 
         if not shoppinglist:
             return make_response(
@@ -262,26 +291,27 @@ class ShoppingListDetailApi(Resource):
                 if validator.has_errors:
                     return make_response(jsonify(dict(messages=dict(name=validator.errors))), 422)
 
-                # check if shopping list with the same name exists.
-                shl = ShoppingList.query.filter_by(name=name, owner_id=user.id).first()
-
-                # if shopping list exists and it is not owned by the client return bad request.
-                if shl and shl.id != shoppinglist.id:
-                    msg = shoppinglist_name_exists
-                    return make_response(
-                        jsonify(dict(message=msg)), 409)
+                changes = dict(name=name)
 
                 if description:
-                    shoppinglist.description = description
+                    changes['description'] = description
+
+                # another shopping list of the client with the same name is a conflict.
+                try:
+                    shoppinglist.save(**changes)
+
+                except ShoppingList.ShoppingListExists:
+                    return make_response(
+                        jsonify(dict(message=shoppinglist_name_exists)), 409)
 
-                shoppinglist.name = name
-                shoppinglist.save()
+                search_index.index_list(shoppinglist.id)
                 return response()
 
         return make_response(
             jsonify(dict(message=shoppinglist_not_updated)), 200)
 
     @jwt_required
+    @atomic
     def delete(self, shl_id):
         """
         Handles DELETE request to delete shopping list using its id.
@@ -290,17 +320,14 @@ class ShoppingListDetailApi(Resource):
         :return: response
         """
 
-        current_user = get_jwt_identity()
-
-        # get user instance.
-        user = User.query.filter_by(username=current_user).first()
-
-        instance = user.shopping_lists.filter_by(id=shl_id).first()
+        instance = ShoppingList.get(shl_id, current_user_id())
 
         if not instance:
             return make_response(jsonify(dict(message=shoppinglist_not_found)), 404)
 
+        search_index.remove_list(instance.id)
         instance.delete()
+        suggestions.invalidate(instance.owner_id)
 
         return make_response(
             jsonify(dict(message=shoppinglist_deleted)), 200)
@@ -334,24 +361,53 @@ class ShoppingItemListApi(Resource):
 
         data = {}
 
-        current_user = get_jwt_identity()
-
-        # user instance
-        user = User.query.filter_by(username=current_user).first()
-
         # get shoppinglist instance
-        shoppinglist = ShoppingList.get(shl_id, user.id)
+        shoppinglist = ShoppingList.get(shl_id, current_user_id())
 
         if not shoppinglist:
             return make_response(
                 jsonify(dict(message=shoppinglist_not_found)), 404)
 
-        data.setdefault('total_items', shoppinglist.shopping_items.count())
-
         page = query_args.get('page', 1)
         limit = query_args.get('limit', MAX_ITEMS_PER_PAGE)
+        cursor = query_args.get('cursor', None)
+        count = query_args.get('count', current_app.config['PAGINATION_COUNT'])
 
-        if any([page != 1, limit != MAX_ITEMS_PER_PAGE]):
+        items = ShoppingItem.rows_for_list(shoppinglist.id)
+
+        def total_items():
+            """
+            Counts items according to count mode, estimates are read from shoppinglist counters.
+            """
+
+            return count_rows(items, count,
+                              estimate=lambda: shoppinglist.item_count)
+
+        # cursor pagination, pages are fetched after the key of the previous page.
+        if cursor is not None:
+            if limit < 1:
+                return params_error(negative_limit)
+
+            order = query_args.get('order', 'id')
+
+            try:
+                keyset_page = keyset_paginate(items, ShoppingItem, cursor, limit, order)
+
+            except InvalidCursor:
+                return params_error(invalid_cursor)
+
+            total = total_items()
+
+            if total is not None:
+                data.setdefault('total_items', total)
+
+            set_cursor_links(data, keyset_page, limit, order, count=query_args.get('count'))
+
+            output = [shoppingitem_data(item, shoppinglist.name) for item in keyset_page.items]
+
+            data.setdefault('shopping_items', output)
+
+        elif any([page != 1, limit != MAX_ITEMS_PER_PAGE]):
 
             if page < 0:
                 return params_error(negative_page)
@@ -359,78 +415,67 @@ class ShoppingItemListApi(Resource):
             if limit < 0:
                 return params_error(negative_limit)
 
-            paginated = shoppinglist.shopping_items.paginate(page, limit, False)
+            total = total_items()
+            paginated = offset_paginate(items, page, limit, total)
+            url_params = dict(count=query_args.get('count'), order=query_args.get('order'))
+
+            if total is not None:
+                data.setdefault('total_items', total)
+                data.setdefault('total_pages', paginated.pages)
 
             data.setdefault('current_page', paginated.page)
-            data.setdefault('total_pages', paginated.pages)
-            data.setdefault('total_items', paginated.total)
 
             if paginated.has_prev:
-                prev_page_url = urlmaker(request, paginated.prev_num, limit).make_url()
+                prev_page_url = urlmaker(request, paginated.prev_num, limit).make_url(**url_params)
                 data.setdefault('previous_page', paginated.prev_num)
                 data.setdefault('previous_page_url', prev_page_url)
 
             if paginated.has_next:
-                next_page_url = urlmaker(request, paginated.next_num, limit).make_url()
+                next_page_url = urlmaker(request, paginated.next_num, limit).make_url(**url_params)
                 data.setdefault('next_page', paginated.next_num)
                 data.setdefault('next_page_url', next_page_url)
 
-            output = [
-                {'id': item.id,
-                 'parent_name': shoppinglist.name,
-                 'name': item.name,
-                 'price': item.price,
-                 'bought': item.bought,
-                 'quantity_description': item.quantity_description,
-                 'created_on': item.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                 'updated_on': item.updated.strftime("%Y-%m-%d %H:%M:%S")} for item in paginated.items]
+            output = [shoppingitem_data(item, shoppinglist.name) for item in paginated.items]
 
-            data.setdefault('total_pages', paginated.pages)
             data.setdefault('shopping_items', output)
 
         else:
-            items = [
-                {'id': item.id,
-                 'name': item.name,
-                 'parent_name': shoppinglist.name,
-                 'price': item.price,
-                 'bought': item.bought,
-                 'quantity_description': item.quantity_description,
-                 'created_on': item.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                 'updated_on': item.updated.strftime("%Y-%m-%d %H:%M:%S")}
-                for item in shoppinglist.shopping_items.all()]
-            data.setdefault('shopping_items', items)
+            # every item is sent, rows are read and encoded in chunks as the response is written.
+            parent_name = shoppinglist.name
+            chunks = stream_json(
+                'shopping_items', items.yield_per(STREAM_CHUNK_SIZE),
+                lambda item: shoppingitem_data(item, parent_name), STREAM_CHUNK_SIZE,
+                count_key='total_items')
 
-            for item in shoppinglist.shopping_items.all():
-                print(item.bought)
+            return Response(stream_with_context(chunks), 200, mimetype='application/json')
 
         return make_response(jsonify(data), 200)
 
+    @use_args(clear_args)
     @jwt_required
-    def delete(self, shl_id):
+    @atomic
+    def delete(self, args, shl_id):
         """
-        Handles deletion of all items in user shoppinglist.
+        Handles deletion of all items in user shoppinglist, `bought=1` deletes only
+        bought items and `bought=0` only items not bought yet.
 
         :return:
         """
 
-        current_user = get_jwt_identity()
-
-        # user instance
-        user = User.get_by_username(username=current_user)
-
         # get shoppinglist instance
-        shoppinglist = ShoppingList.get(shl_id, user.id)
+        shoppinglist = ShoppingList.get(shl_id, current_user_id())
 
         if not shoppinglist:
             return make_response(
                 jsonify(dict(message=shoppinglist_not_found)), 404)
 
-        items = shoppinglist.shopping_items
+        bought = args.get('bought')
+        if bought is not None:
+            bought = bought == '1'
 
-        if items.count() > 0:
-            for item in items:
-                shoppinglist.shopping_items.filter_by(id=item.id).first().delete()
+        if shoppinglist.clear_items(bought) > 0:
+            search_index.index_list(shoppinglist.id)
+            suggestions.invalidate(shoppinglist.owner_id)
 
             return make_response(
                 jsonify(dict(message=shoppingitems_deleted)), 200)
@@ -453,19 +498,14 @@ class ShoppingItemDetailApi(Resource):
 
         data = {}
 
-        current_user = get_jwt_identity()
-
-        # user instance
-        user = User.query.filter_by(username=current_user).first()
-
         # get shoppinglist instance.
-        shoppinglist = ShoppingList.get(shl_id, user.id)
+        shoppinglist = ShoppingList.get(shl_id, current_user_id())
 
         if not shoppinglist:
             return make_response(
                 jsonify(dict(message=shoppinglist_not_found)), 404)
 
-        shoppingitem = shoppinglist.shopping_items.filter_by(id=item_id).first()
+        shoppingitem = ShoppingItem.get(shoppinglist.id, item_id)
 
         if not shoppingitem:
             return make_response(
@@ -476,23 +516,19 @@ class ShoppingItemDetailApi(Resource):
         data.setdefault('price', shoppingitem.price)
         data.setdefault('bought', shoppingitem.bought)
         data.setdefault('quantity_description', shoppingitem.quantity_description)
-        data.setdefault('created_on', shoppingitem.timestamp.strftime("%Y-%m-%d %H:%M:%S"))
-        data.setdefault('updated_on', shoppingitem.updated.strftime("%Y-%m-%d %H:%M:%S"))
+        data.setdefault('created_on', format_datetime(shoppingitem.timestamp))
+        data.setdefault('updated_on', format_datetime(shoppingitem.updated))
         return make_response(
             jsonify(dict(data=data)), 200)
 
     @use_args(item_create_args)
     @jwt_required
+    @atomic
     def post(self, args, shl_id):
         """
         Handles post request to create shoppingitem object.
         """
 
-        current_user = get_jwt_identity()
-
-        # get user instance.
-        user = User.query.filter_by(username=current_user).first()
-
         # get shoppingitems data.
         name = args.get('name')
         price = args.get('price')
@@ -507,26 +543,25 @@ class ShoppingItemDetailApi(Resource):
         name = name.strip()
 
         # get shoppinglist instance.
-        instance = ShoppingList.get(shoppinglistId=shl_id, ownerId=user.id)
+        instance = ShoppingList.get(shoppinglistId=shl_id, ownerId=current_user_id())
 
         if not instance:
             return make_response(
                 jsonify(dict(message=shoppinglist_not_found)), 404)
 
-        # check if quantity description are similar.
-        exists = instance.shopping_items.filter_by(name=name, quantity_description=quantity).first()
-        if exists:
-            return make_response(jsonify(dict(message=shoppingitem_exists)), 409)
-
         # create shoppingitem instance.
-        item = ShoppingItem(name=name, price=price, quantity_description=quantity)
+        item = ShoppingItem(name=name, price=float(price), quantity_description=quantity, bought=False)
+
+        # save item and update shoppinglist item counters, items with the same
+        # name and quantity description are a conflict.
+        try:
+            instance.add_item(item)
 
-        # save item
-        item.save()
+        except ShoppingItem.ShoppingItemExists:
+            return make_response(jsonify(dict(message=shoppingitem_exists)), 409)
 
-        # add item to shopping_items list and save
-        instance.shopping_items.append(item)
-        instance.save()
+        search_index.index_list(instance.id)
+        suggestions.add(instance.owner_id, item.name)
 
         return make_response(
             jsonify(dict(
@@ -543,6 +578,7 @@ class ShoppingItemDetailApi(Resource):
 
     @use_args(item_update_args)
     @jwt_required
+    @atomic
     def put(self, args, shl_id, item_id=None):
         """
         Handles PUT request from client and updates specified shoppingitem.
@@ -552,13 +588,8 @@ class ShoppingItemDetailApi(Resource):
         :return: response.
         """
 
-        current_user = get_jwt_identity()
-
-        # get user instance.
-        user = User.get_by_username(current_user)
-
         # get shoppinglist instance.
-        shoppinglist = user.shopping_lists.filter_by(id=shl_id).first()
+        shoppinglist = ShoppingList.get(shl_id, current_user_id())
 
         # check if it exists.
         if not shoppinglist:
@@ -566,7 +597,7 @@ class ShoppingItemDetailApi(Resource):
                 jsonify(dict(message=shoppinglist_not_found)), 404)
 
         # get shoppingitem instance.
-        shoppingitem = shoppinglist.shopping_items.filter_by(id=item_id).first()
+        shoppingitem = ShoppingItem.get(shoppinglist.id, item_id)
 
         # check if it exists.
         if not shoppingitem:
@@ -582,11 +613,7 @@ class ShoppingItemDetailApi(Resource):
         bought = args.get('bought', None)
 
         if any([name, price, quantity, bought]):
-            # check if quantity description are similar.
-            exists = shoppinglist.shopping_items.filter_by(name=name, quantity_description=quantity).first()
-            print(exists)
-            if exists and exists.id != shoppingitem.id:
-                return make_response(jsonify(dict(message=shoppingitem_exists)), 409)
+            old_name = shoppingitem.name
 
             if not name:
                 name = shoppingitem.name
@@ -598,17 +625,15 @@ class ShoppingItemDetailApi(Resource):
             if validator.has_errors:
                 return make_response(jsonify(dict(messages=dict(name=validator.errors))), 422)
 
-            name = name.strip()
-
-            shoppingitem.name = name
+            changes = dict(name=name.strip())
 
             # assign new price.
             if price:
-                shoppingitem.price = price
+                changes['price'] = float(price)
 
             if quantity:
                 # quantity description should not be similar.
-                shoppingitem.quantity_description = quantity
+                changes['quantity_description'] = quantity
 
             # set new bought flag
             if bought:
@@ -621,10 +646,17 @@ class ShoppingItemDetailApi(Resource):
                 if bought == '0':
                     bought = False
 
-                shoppingitem.bought = bought
+                changes['bought'] = bought
+
+            # finally save changes together with shoppinglist item counters.
+            try:
+                shoppinglist.update_item(shoppingitem, **changes)
 
-            # finally save changes.
-            shoppingitem.save()
+            except ShoppingItem.ShoppingItemExists:
+                return make_response(jsonify(dict(message=shoppingitem_exists)), 409)
+
+            search_index.index_list(shoppinglist.id)
+            suggestions.rename(shoppinglist.owner_id, old_name, shoppingitem.name)
 
             # return response to client.
             return make_response(
@@ -636,7 +668,7 @@ class ShoppingItemDetailApi(Resource):
                         price=shoppingitem.price,
                         quantity_description=shoppingitem.quantity_description,
                         bought=shoppingitem.bought,
-                        updated_on=shoppingitem.updated.strftime("%Y-%m-%d %H:%M:%S")
+                        updated_on=format_datetime(shoppingitem.updated)
                     )
                 )), 200)
 
@@ -649,11 +681,12 @@ class ShoppingItemDetailApi(Resource):
                         price=shoppingitem.price,
                         quantity_description=shoppingitem.quantity_description,
                         bought=shoppingitem.bought,
-                        updated_on=shoppingitem.updated.strftime("%Y-%m-%d %H:%M:%S")
+                        updated_on=format_datetime(shoppingitem.updated)
                     )
             )), 200)
 
     @jwt_required
+    @atomic
     def delete(self, shl_id, item_id):
         """
         Handles DELETE request from client to delete a single shoppingitem identified by
@@ -663,12 +696,8 @@ class ShoppingItemDetailApi(Resource):
         :return: response.
         """
 
-        current_user = get_jwt_identity()
-
-        user = User.get_by_username(current_user)
-
         # get shoppinglist
-        shoppinglist = user.shopping_lists.filter_by(id=shl_id).first()
+        shoppinglist = ShoppingList.get(shl_id, current_user_id())
 
         # check if shoppinglist exists.
         if not shoppinglist:
@@ -678,7 +707,7 @@ class ShoppingItemDetailApi(Resource):
                 )), 404)
 
         # get shoppingitem.
-        shoppingitem = shoppinglist.shopping_items.filter_by(id=item_id).first()
+        shoppingitem = ShoppingItem.get(shoppinglist.id, item_id)
 
         # check if shoppingitem exists.
         if not shoppingitem:
@@ -687,8 +716,10 @@ class ShoppingItemDetailApi(Resource):
                     message=shoppingitem_not_found
                 )), 404)
 
-        # delete shoppingitem.
-        shoppingitem.delete()
+        # delete shoppingitem and update shoppinglist item counters.
+        shoppinglist.remove_item(shoppingitem)
+        search_index.index_list(shoppinglist.id)
+        suggestions.remove(shoppinglist.owner_id, shoppingitem.name)
 
         # return response to client.
         return make_response(jsonify(dict(
@@ -697,7 +728,8 @@ class ShoppingItemDetailApi(Resource):
 
 class SearchShoppingListApi(Resource):
     """
-    Search shopping lists names using provided keywords
+    Full-text search of shopping list names, descriptions and item names, `mode=fuzzy`
+    tolerates misspelled words.
     """
 
     @use_args(search_args)
@@ -712,10 +744,6 @@ class SearchShoppingListApi(Resource):
         page = args.get('page', 1)
         limit = args.get('limit', MAX_ITEMS_PER_PAGE)
 
-        current_user = get_jwt_identity()
-
-        user = User.get_by_username(current_user)
-
         _term = args.get('q')
 
         if _term == '':
@@ -724,23 +752,25 @@ class SearchShoppingListApi(Resource):
                     message="please provide query value"
                 )), 422)
 
-        term = prep_keyword(_term)
-
-        # search through shoppinglist objects first.
-        shoppinglists = user.\
-            shopping_lists.filter(
-            ShoppingList.name.ilike(term)
-        ).paginate(page, limit)
+        # ranked matches of the search index.
+        shoppinglists = search_index.search(
+            current_user_id(), _term, page, limit, mode=args.get('mode', 'fulltext'))
 
         if any(shoppinglists.items):
             response.setdefault('total_pages', shoppinglists.pages)
             response.setdefault('current_page', shoppinglists.page)
             response.setdefault('total_items', shoppinglists.total)
+
+            # load item names of every list in the page with one query.
+            item_names = ShoppingItem.names_by_list(
+                [shl.id for shl in shoppinglists.items], limit=args.get('items_limit'))
+
             results = [
                 {'name': shl.name,
                  'id': shl.id,
                  'description': shl.description,
-                 'items': [item.name for item in shl.shopping_items.all()]
+                 'item_count': shl.item_count,
+                 'items': item_names[shl.id]
                  } for shl in shoppinglists.items]
             response.setdefault('shoppinglists', results)
 
@@ -760,3 +790,83 @@ class SearchShoppingListApi(Resource):
 
         response.setdefault('items_in_page', len(shoppinglists.items))
         return make_response(jsonify(response), 200)
+
+
+class SearchShoppingItemApi(Resource):
+    """
+    Search shopping items of all user shopping lists by name or quantity description.
+    """
+
+    @use_args(item_search_args)
+    @jwt_required
+    def get(self, args):
+        """
+        Handles GET request to search for shoppingitems.
+        """
+
+        response = {}
+
+        limit = args.get('limit', MAX_ITEMS_PER_PAGE)
+        _term = args.get('q').strip()
+
+        if _term == '':
+            return make_response(
+                jsonify(dict(
+                    message="please provide query value"
+                )), 422)
+
+        # results are paged by key, a page holds at least one item.
+        if limit < 1:
+            return make_response(jsonify(dict(message=negative_limit)), 422)
+
+        try:
+            items_page = keyset_paginate(
+                ShoppingItem.search(current_user_id(), _term), ShoppingItem,
+                args.get('cursor'), limit)
+
+        except InvalidCursor:
+            return make_response(jsonify(dict(message=invalid_cursor)), 422)
+
+        if items_page.items:
+            response.setdefault('shoppingitems', [
+                {'id': item.id,
+                 'name': item.name,
+                 'price': item.price,
+                 'bought': item.bought,
+                 'quantity_description': item.quantity_description,
+                 'shoppinglist': {'id': item.shoppinglist_id, 'name': item.shoppinglist_name}
+                 } for item in items_page.items])
+
+            set_cursor_links(response, items_page, limit, 'id', term=_term)
+
+        else:
+            response.setdefault('message', search_not_found)
+            response.setdefault('results', [])
+
+        response.setdefault('items_in_page', len(items_page.items))
+        return make_response(jsonify(response), 200)
+
+
+class SuggestShoppingItemApi(Resource):
+    """
+    Suggest item names from the user's own shopping items.
+    """
+
+    @use_args(suggest_args)
+    @jwt_required
+    def get(self, args):
+        """
+        Handles GET request for item names starting with prefix.
+        """
+
+        prefix = args.get('prefix').strip()
+
+        if prefix == '':
+            return make_response(
+                jsonify(dict(
+                    message="please provide prefix value"
+                )), 422)
+
+        names = suggestions.suggest(current_user_id(), prefix, args.get('limit', MAX_SUGGESTIONS))
+
+        return make_response(jsonify(dict(suggestions=names)), 200)
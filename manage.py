@@ -1,11 +1,96 @@
 from flask_migrate import Migrate, MigrateCommand
 from flask_script import Manager
 from app import APP, DB
+from app.auth.security import purge_blacklist
+from app.conf.settings import BLACKLIST_COMPACTION_BATCH
+from app.core.hashing import calibrate
+from app.core.serializers import BACKEND
+from app.models import ShoppingList
+from app.shoppinglist.benchmark import compare_item_encoding, compare_item_reads
+from app.shoppinglist.search import search_index
 
 
 manager = Manager(APP)
-migrate = Migrate(APP, DB)
+migrate = Migrate(APP, DB, render_as_batch=True)
 manager.add_command('db', MigrateCommand)
 
+
+@manager.option('-b', '--batch-size', dest='batch_size', type=int,
+                default=BLACKLIST_COMPACTION_BATCH)
+def purge_blacklist_tokens(batch_size):
+    """
+    Delete expired tokens from the blacklist table.
+    """
+
+    deleted = purge_blacklist(APP, batch_size)
+    print('%(deleted)s expired tokens deleted.' % dict(deleted=deleted))
+
+
+@manager.option('-t', '--target', dest='target', type=float, default=None,
+                help='login latency target in seconds, defaults to BCRYPT_TARGET_LATENCY')
+@manager.option('-m', '--max-rounds', dest='max_rounds', type=int, default=16)
+def calibrate_bcrypt(target, max_rounds):
+    """
+    Benchmark bcrypt on this machine and recommend BCRYPT_LOG_ROUNDS.
+    """
+
+    if target is None:
+        target = APP.config['BCRYPT_TARGET_LATENCY']
+
+    rounds, timings = calibrate(target, max_rounds=max_rounds)
+
+    for cost, seconds in timings:
+        print('cost %(cost)2s: %(ms)8.1f ms' % dict(cost=cost, ms=seconds * 1000))
+
+    print('highest cost within %(ms).0f ms: %(rounds)s' % dict(ms=target * 1000, rounds=rounds))
+    print('export BCRYPT_LOG_ROUNDS=%(rounds)s' % dict(rounds=rounds))
+
+
+@manager.command
+def repair_counters():
+    """
+    Recompute shopping list item counters from shopping items.
+    """
+
+    repaired = ShoppingList.repair_counters()
+    print('%(repaired)s shopping lists repaired.' % dict(repaired=repaired))
+
+
+@manager.command
+def reindex_search():
+    """
+    Rebuild the shopping list search index.
+    """
+
+    indexed = search_index.rebuild()
+    print('%(indexed)s shopping lists indexed.' % dict(indexed=indexed))
+
+
+@manager.option('-i', '--items', dest='items', type=int, default=10000)
+@manager.option('-r', '--repeat', dest='repeat', type=int, default=3)
+def benchmark_item_reads(items, repeat):
+    """
+    Compare reading a large shopping list as ORM instances and as projected rows.
+    """
+
+    for timing in compare_item_reads(items, repeat):
+        print('%(name)-10s %(ms)8.1f ms %(mib)8.1f MiB peak' % dict(
+            name=timing.name, ms=timing.seconds * 1000, mib=timing.peak_bytes / 1048576.0))
+
+
+@manager.option('-i', '--items', dest='items', type=int, default=10000)
+@manager.option('-r', '--repeat', dest='repeat', type=int, default=3)
+def benchmark_item_encoding(items, repeat):
+    """
+    Compare encoding a large shopping list with the standard library and the app encoder.
+    """
+
+    print('json backend: %(backend)s' % dict(backend=BACKEND))
+
+    for timing in compare_item_encoding(items, repeat):
+        print('%(name)-10s %(ms)8.1f ms %(mib)8.1f MiB peak' % dict(
+            name=timing.name, ms=timing.seconds * 1000, mib=timing.peak_bytes / 1048576.0))
+
+
 if __name__ == '__main__':
     manager.run()
@@ -0,0 +1,60 @@
+"""server side timestamps
+
+Revision ID: a3d5c07e9b12
+Revises: f98b3e7b39a0
+Create Date: 2026-10-18 09:12:47.803114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d5c07e9b12'
+down_revision = 'f98b3e7b39a0'
+branch_labels = None
+depends_on = None
+
+NAMING_CONVENTION = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+
+TIMESTAMP_COLUMNS = {
+    'users': ['timestamp', 'updated', 'date_joined'],
+    'blacklist_token': ['timestamp', 'updated'],
+    'shopping_list': ['timestamp', 'updated'],
+    'shopping_item': ['timestamp', 'updated'],
+    'reset_token': ['timestamp', 'updated'],
+}
+
+
+def now():
+    if op.get_bind().dialect.name == 'sqlite':
+        # same text format SQLAlchemy writes datetimes in.
+        return sa.text("(STRFTIME('%Y-%m-%d %H:%M:%f000', 'now'))")
+
+    return sa.text('CURRENT_TIMESTAMP')
+
+
+def set_defaults(server_default):
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+
+    if sqlite:
+        # batch mode recreates tables, dropping a parent table would cascade to its children.
+        op.execute('PRAGMA foreign_keys=OFF')
+
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        with op.batch_alter_table(table, schema=None,
+                                  naming_convention=NAMING_CONVENTION) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.DateTime(timezone=True),
+                                      server_default=server_default)
+
+    if sqlite:
+        op.execute('PRAGMA foreign_keys=ON')
+
+
+def upgrade():
+    set_defaults(now())
+
+
+def downgrade():
+    set_defaults(None)
@@ -0,0 +1,32 @@
+"""lower item search indexes
+
+Revision ID: c7e2f4a9d816
+Revises: a3d5c07e9b12
+Create Date: 2026-10-18 14:05:31.420967
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2f4a9d816'
+down_revision = 'a3d5c07e9b12'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ['name', 'quantity_description']
+
+
+def upgrade():
+    # text_pattern_ops is Postgres only, other databases get a plain expression index.
+    ops = ' text_pattern_ops' if op.get_bind().dialect.name == 'postgresql' else ''
+
+    for column in COLUMNS:
+        op.create_index('ix_shopping_item_lower_%s' % column, 'shopping_item',
+                        [sa.text('lower(%s)%s' % (column, ops))], unique=False)
+
+
+def downgrade():
+    for column in reversed(COLUMNS):
+        op.drop_index('ix_shopping_item_lower_%s' % column, table_name='shopping_item')
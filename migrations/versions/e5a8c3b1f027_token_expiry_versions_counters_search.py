@@ -0,0 +1,123 @@
+"""token expiry, user versions, item counters and search
+
+Revision ID: e5a8c3b1f027
+Revises: 01079b8fe708
+Create Date: 2026-10-18 02:36:41.508273
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a8c3b1f027'
+down_revision = '01079b8fe708'
+branch_labels = None
+depends_on = None
+
+# search documents of existing lists, the statements `rebuild` of the search backends runs.
+POSTGRES_DOCUMENTS = """
+    INSERT INTO shopping_list_search (shoppinglist_id, owner_id, document, body)
+    SELECT l.id, l.owner_id,
+        setweight(to_tsvector('simple', l.name), 'A') ||
+        setweight(to_tsvector('simple', coalesce(l.description, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(
+            (SELECT string_agg(i.name, ' ') FROM shopping_item i
+             WHERE i.shoppinglist_id = l.id), '')), 'C'),
+        lower(l.name || ' ' || coalesce(l.description, '') || ' ' || coalesce(
+            (SELECT string_agg(i.name, ' ') FROM shopping_item i
+             WHERE i.shoppinglist_id = l.id), ''))
+    FROM shopping_list l WHERE l.owner_id IS NOT NULL
+"""
+
+SQLITE_DOCUMENTS = """
+    INSERT INTO shopping_list_fts (rowid, name, description, items, owner_id)
+    SELECT l.id, l.name, coalesce(l.description, ''), coalesce(
+        (SELECT group_concat(i.name, ' ') FROM shopping_item i
+         WHERE i.shoppinglist_id = l.id), ''), l.owner_id
+    FROM shopping_list l
+"""
+
+
+def upgrade():
+    with op.batch_alter_table('blacklist_token', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('expires', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_index(batch_op.f('ix_blacklist_token_expires'), ['expires'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+    with op.batch_alter_table('shopping_list', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('item_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('bought_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('total_price', sa.Float(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_shopping_list_owner_id'), ['owner_id'], unique=False)
+
+    with op.batch_alter_table('shopping_item', schema=None) as batch_op:
+        batch_op.create_index('ix_shopping_item_shoppinglist_id_name', ['shoppinglist_id', 'name'],
+                              unique=False)
+
+    # counters of lists that already have items.
+    op.execute(
+        'UPDATE shopping_list SET '
+        'item_count = (SELECT count(*) FROM shopping_item i '
+        'WHERE i.shoppinglist_id = shopping_list.id), '
+        'bought_count = (SELECT count(*) FROM shopping_item i '
+        'WHERE i.shoppinglist_id = shopping_list.id AND i.bought), '
+        'total_price = (SELECT coalesce(sum(i.price), 0) FROM shopping_item i '
+        'WHERE i.shoppinglist_id = shopping_list.id)')
+
+    # search index, see app/shoppinglist/search.py
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute(
+            'CREATE TABLE shopping_list_search ('
+            'shoppinglist_id INTEGER PRIMARY KEY REFERENCES shopping_list (id) ON DELETE CASCADE, '
+            'owner_id INTEGER NOT NULL, '
+            'document TSVECTOR NOT NULL, '
+            'body TEXT NOT NULL)')
+        op.execute('CREATE INDEX ix_shopping_list_search_document '
+                   'ON shopping_list_search USING GIN (document)')
+        op.execute('CREATE INDEX ix_shopping_list_search_body '
+                   'ON shopping_list_search USING GIN (body gin_trgm_ops)')
+        op.execute('CREATE INDEX ix_shopping_list_search_owner_id '
+                   'ON shopping_list_search (owner_id)')
+        op.execute(POSTGRES_DOCUMENTS)
+
+    elif dialect == 'sqlite':
+        op.execute('CREATE VIRTUAL TABLE shopping_list_fts '
+                   'USING fts5(name, description, items, owner_id UNINDEXED)')
+        op.execute(SQLITE_DOCUMENTS)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('DROP TABLE shopping_list_search')
+
+    elif dialect == 'sqlite':
+        op.execute('DROP TABLE shopping_list_fts')
+        # batch mode recreates tables, dropping a parent table would cascade to its children.
+        op.execute('PRAGMA foreign_keys=OFF')
+
+    with op.batch_alter_table('shopping_item', schema=None) as batch_op:
+        batch_op.drop_index('ix_shopping_item_shoppinglist_id_name')
+
+    with op.batch_alter_table('shopping_list', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_shopping_list_owner_id'))
+        batch_op.drop_column('total_price')
+        batch_op.drop_column('bought_count')
+        batch_op.drop_column('item_count')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('blacklist_token', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_blacklist_token_expires'))
+        batch_op.drop_column('expires')
+
+    if dialect == 'sqlite':
+        op.execute('PRAGMA foreign_keys=ON')
@@ -1,9 +1,34 @@
 """Base class for all tests for the application configuration"""
 
+import contextlib
+
 from flask_testing import TestCase
-from app import APP
+from sqlalchemy import event
+
+from app import APP, DB
 
 
 class TestBaseCase(TestCase):
     def create_app(self):
         return APP
+
+    @contextlib.contextmanager
+    def record_statements(self):
+        """
+        Collects SQL statements executed within the block, leaving out the BEGIN
+        emitted for SQLite transactions.
+        """
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement != 'BEGIN':
+                statements.append(statement)
+
+        event.listen(DB.engine, 'before_cursor_execute', record)
+
+        try:
+            yield statements
+
+        finally:
+            event.remove(DB.engine, 'before_cursor_execute', record)
@@ -84,12 +84,12 @@ class TestShoppingListBaseCase(TestAuthenticationBaseCase):
         url = url_for('shoppinglist_list')
         return self.client.post(url, data=details, headers={self.header_name: token})
 
-    def get_shoppinglists(self, token, limit=None, page=None):
+    def get_shoppinglists(self, token, limit=None, page=None, **params):
         """
         Method to make get request to fetch user shopping lists.
         """
 
-        url = url_for('shoppinglist_list', limit=limit, page=page)
+        url = url_for('shoppinglist_list', limit=limit, page=page, **params)
 
         return self.client.get(url, headers={self.header_name: token})
 
@@ -169,7 +169,7 @@ class TestShoppingItemsBaseCase(TestShoppingListBaseCase):
 
         return self.client.post(url, data=data, headers={self.header_name: token})
 
-    def get_shoppingitems(self, token, shl_id, limit=None, page=None):
+    def get_shoppingitems(self, token, shl_id, limit=None, page=None, **params):
         """
         Makes POST request as client to create shoppingitems.
 
@@ -180,7 +180,7 @@ class TestShoppingItemsBaseCase(TestShoppingListBaseCase):
         :return: response.
         """
 
-        url = url_for('shoppingitem_detail', shl_id=shl_id, limit=limit, page=page)
+        url = url_for('shoppingitem_detail', shl_id=shl_id, limit=limit, page=page, **params)
 
         return self.client.get(url, headers={self.header_name: token})
 
@@ -291,7 +291,7 @@ class TestSearchAndPaginationBaseCase(TestShoppingItemsBaseCase):
 
         return token, shl_id
 
-    def search_shoppinglist(self, token, keyword, limit=None, page=None):
+    def search_shoppinglist(self, token, keyword, limit=None, page=None, **params):
         """
         Method to make search shopping lists.
         :param token: user auth token.
@@ -299,6 +299,17 @@ class TestSearchAndPaginationBaseCase(TestShoppingItemsBaseCase):
         :return: response.
         """
 
-        url = url_for('shoppinglist_search', q=keyword, limit=limit, page=page)
+        url = url_for('shoppinglist_search', q=keyword, limit=limit, page=page, **params)
         return self.client.get(url, headers={self.header_name: token})
 
+
+    def search_shoppingitems(self, token, keyword, **params):
+        """
+        Method to search shopping items across shopping lists.
+        :param token: user auth token.
+        :param keyword: prefix of item name or quantity description.
+        :return: response.
+        """
+
+        url = url_for('shoppingitem_search', q=keyword, **params)
+        return self.client.get(url, headers={self.header_name: token})
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module tests the in-process token blacklist and user version caches and blacklist
+compaction.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytz
+from flask import json
+
+from app import DB
+from app.auth.cache import BlacklistCache, UserVersionCache
+from app.auth.security import blacklist_cache, blacklist_token, purge_blacklist
+from app.db.base import unit_of_work
+from app.models import BlacklistToken
+from .auth_base import TestAuthenticationBaseCase
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestBlacklistCache(TestAuthenticationBaseCase):
+    def setUp(self):
+        super(TestBlacklistCache, self).setUp()
+        self.clock = FakeClock()
+        self.cache = BlacklistCache(max_size=2, ttl=30, clock=self.clock)
+
+    def test_unknown_jti_returns_none(self):
+        self.assertIsNone(self.cache.lookup('unknown'))
+
+    def test_valid_jti_goes_stale_after_ttl(self):
+        self.cache.mark_valid('jti')
+        self.assertFalse(self.cache.lookup('jti'))
+
+        self.clock.now += 31
+        self.assertIsNone(self.cache.lookup('jti'))
+
+    def test_valid_jtis_are_evicted_in_lru_order(self):
+        self.cache.mark_valid('one')
+        self.cache.mark_valid('two')
+        self.cache.lookup('one')
+        self.cache.mark_valid('three')
+
+        self.assertFalse(self.cache.lookup('one'))
+        self.assertIsNone(self.cache.lookup('two'))
+        self.assertFalse(self.cache.lookup('three'))
+
+    def test_revoked_jti_overrides_valid_entry_until_expiry(self):
+        self.cache.mark_valid('jti')
+        self.cache.mark_revoked('jti', expires=self.clock.now + 60)
+        self.assertTrue(self.cache.lookup('jti'))
+
+        self.clock.now += 61
+        self.assertIsNone(self.cache.lookup('jti'))
+
+    def test_logout_updates_cache_immediately(self):
+        self.register_user(
+            username=self.test_user.username, email=self.test_user.email,
+            password=self.test_user.password, confirm=self.test_user.password)
+
+        login_response = self.login_user(
+            username=self.test_user.username, password=self.test_user.password)
+        token = json.loads(login_response.get_data(as_text=True))['data']['auth_token']
+
+        # first request caches the token as valid.
+        self.assert200(self.get_user_details(token))
+
+        self.logout_user(token)
+
+        # revoked token is rejected from the cache alone.
+        BlacklistToken.query.delete()
+        DB.session.commit()
+
+        self.assert401(self.get_user_details(token))
+
+    def test_rolled_back_logout_leaves_cache_unrevoked(self):
+        decrypted_token = dict(jti='rolled-back', exp=int(time.time()) + 60)
+
+        with self.assertRaises(RuntimeError):
+            with unit_of_work():
+                blacklist_token(decrypted_token)
+                raise RuntimeError
+
+        self.assertIsNone(blacklist_cache.lookup('rolled-back'))
+        self.assertFalse(BlacklistToken.is_blacklisted('rolled-back'))
+
+
+class TestUserVersionCache(TestAuthenticationBaseCase):
+    def setUp(self):
+        super(TestUserVersionCache, self).setUp()
+        self.clock = FakeClock()
+        self.cache = UserVersionCache(max_size=2, ttl=30, clock=self.clock)
+
+    def test_entry_goes_stale_after_ttl(self):
+        self.cache.remember(1, 'gideon', 2)
+        self.assertEqual(self.cache.lookup(1), ('gideon', 2))
+
+        self.clock.now += 31
+        self.assertIsNone(self.cache.lookup(1))
+
+    def test_entries_are_evicted_in_lru_order(self):
+        self.cache.remember(1, 'one', 1)
+        self.cache.remember(2, 'two', 1)
+        self.cache.lookup(1)
+        self.cache.remember(3, 'three', 1)
+
+        self.assertEqual(self.cache.lookup(1), ('one', 1))
+        self.assertIsNone(self.cache.lookup(2))
+
+    def test_forgotten_user_is_unknown(self):
+        self.cache.remember(1, 'gideon', 1)
+        self.cache.forget(1)
+        self.assertIsNone(self.cache.lookup(1))
+
+
+class TestBlacklistCompaction(TestAuthenticationBaseCase):
+    def setUp(self):
+        super(TestBlacklistCompaction, self).setUp()
+        now = datetime.now(tz=pytz.utc)
+
+        for index in range(5):
+            BlacklistToken('expired-%s' % index, expires=now - timedelta(minutes=1)).save()
+
+        BlacklistToken('active', expires=now + timedelta(hours=1)).save()
+
+    def test_expired_tokens_are_ignored(self):
+        self.assertFalse(BlacklistToken.is_blacklisted('expired-0'))
+        self.assertTrue(BlacklistToken.is_blacklisted('active'))
+
+    def test_purge_deletes_expired_tokens_in_batches(self):
+        deleted = purge_blacklist(self.app, batch_size=2)
+
+        self.assertEqual(deleted, 5)
+        self.assertEqual([t.token for t in BlacklistToken.query.all()], ['active'])
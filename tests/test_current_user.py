@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module tests user id claims in access tokens and the request scoped current user loader.
+"""
+
+from flask import json, url_for
+from flask_jwt_extended import decode_token
+
+from app import messages as msg
+from app.models import ShoppingList, User
+from .shopping_base import TestShoppingItemsBaseCase
+
+
+class TestCurrentUserCase(TestShoppingItemsBaseCase):
+    def setUp(self):
+        super(TestCurrentUserCase, self).setUp()
+        self.register_user()
+        login_response = self.login_user()
+        self.token = json.loads(login_response.get_data(as_text=True))['data']['auth_token']
+
+    def test_token_carries_user_id_and_version(self):
+        user = User.get_by_username(self.test_user.username)
+
+        with self.app.app_context():
+            claims = decode_token(self.token)['user_claims']
+
+        self.assertEqual(claims, dict(id=user.id, version=user.version))
+
+    def test_shoppinglist_requests_do_not_query_users(self):
+        with self.record_statements() as statements:
+            self.create_shoppinglist(self.token, dict(name='Breakfast'))
+            self.get_shoppinglists(self.token)
+
+        self.assertTrue(statements)
+        self.assertFalse([s for s in statements if 'FROM users' in s])
+
+    def reset_test_user_password(self):
+        response = self.get_password_reset_token(dict(email=self.test_user.email))
+        reset_token = json.loads(response.get_data(as_text=True))['data']['password_reset_token']
+
+        new_password = 'm@yN3wpassword'
+        response = self.reset_password(dict(
+            username=self.test_user.username, new_password=new_password,
+            confirm=new_password, reset_token=reset_token))
+        self.assert200(response)
+
+    def test_password_reset_invalidates_existing_tokens(self):
+        self.reset_test_user_password()
+
+        response = self.get_user_details(self.token)
+
+        self.assert401(response)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['message'], msg.user_not_found)
+
+    def test_stale_token_is_rejected_by_shoppinglist_and_item_endpoints(self):
+        response = self.create_shoppinglist(self.token, dict(name='Breakfast'))
+        shl_id = json.loads(response.get_data(as_text=True))['data']['id']
+        item = dict(name='bread', price=10, quantity_description='1')
+
+        self.reset_test_user_password()
+
+        responses = [
+            self.get_shoppinglists(self.token),
+            self.create_shoppinglist(self.token, dict(name='Lunch')),
+            self.get_shoppingitems(self.token, shl_id),
+            self.create_shoppingitem(self.token, shl_id, item),
+        ]
+
+        for response in responses:
+            self.assert401(response)
+            self.assertEqual(json.loads(response.get_data(as_text=True))['message'], msg.user_not_found)
+
+        self.assertEqual(ShoppingList.query.get(shl_id).item_count, 0)
+
+    def test_token_of_deleted_account_is_rejected_when_id_is_reused(self):
+        user_id = User.get_by_username(self.test_user.username).id
+        login_response = self.login_user()
+        other_token = json.loads(login_response.get_data(as_text=True))['data']['auth_token']
+
+        self.assert200(self.delete_user(self.token, self.test_user.password))
+
+        # SQLite hands out the id of the deleted account again.
+        response = self.client.post(url_for('user_register'), data=dict(
+            username='usertwo', email='user_two@gmail.com',
+            password=self.test_user.password, confirm=self.test_user.password))
+        self.assertStatus(response, 201)
+        self.assertEqual(User.get_by_username('usertwo').id, user_id)
+        ShoppingList(name='Secret', owner_id=user_id).save()
+
+        response = self.get_shoppinglists(other_token)
+
+        self.assert401(response)
+        self.assertNotIn('Secret', response.get_data(as_text=True))
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module tests typo tolerant search of shopping lists.
+"""
+
+from unittest import mock
+
+from flask import json
+
+from app.db.base import unit_of_work
+from app.models import ShoppingItem, ShoppingList
+from app.shoppinglist.fuzzy import TrigramIndex, trigrams
+from app.shoppinglist.search import search_index, tokenize
+from .shopping_base import TestSearchAndPaginationBaseCase
+
+
+class TestFuzzySearchCase(TestSearchAndPaginationBaseCase):
+    def setUp(self):
+        super(TestFuzzySearchCase, self).setUp()
+        self.token = self.init_shoppinglists()
+
+        for name, item in [('Birthday', 'tomatoes'), ('Breakfast', 'bread'), ('Lunch', 'bread rolls')]:
+            shl = ShoppingList.query.filter_by(name=name).first()
+            self.create_shoppingitem(self.token, shl.id, dict(
+                name=item, price=10, quantity_description='1'))
+
+    def fuzzy_search(self, keyword, **params):
+        response = self.search_shoppinglist(self.token, keyword, mode='fuzzy', **params)
+        self.assert200(response)
+        data = json.loads(response.get_data(as_text=True))
+        return [shl['name'] for shl in data.get('shoppinglists', [])]
+
+    def test_misspelled_words_are_found(self):
+        self.assertEqual(self.fuzzy_search('tomatos'), ['Birthday'])
+        self.assertEqual(self.fuzzy_search('bred'), ['Breakfast', 'Lunch'])
+
+    def test_results_are_ranked_by_similarity(self):
+        self.assertEqual(self.fuzzy_search('bread rolls'), ['Lunch', 'Breakfast'])
+
+    def test_threshold_is_configurable(self):
+        self.app.config['FUZZY_SEARCH_THRESHOLD'] = 0.9
+        self.assertEqual(self.fuzzy_search('bred'), [])
+
+    def test_index_follows_changes(self):
+        self.assertEqual(self.fuzzy_search('chrismas'), ['Christmas'])
+
+        shl = ShoppingList.query.filter_by(name='Christmas').first()
+        self.update_shoppinglist(self.token, shl.id, dict(name='Holiday'))
+
+        self.assertEqual(self.fuzzy_search('chrismas'), [])
+        self.assertEqual(self.fuzzy_search('holyday'), ['Holiday'])
+
+    def test_rolled_back_changes_are_not_indexed(self):
+        self.assertEqual(self.fuzzy_search('chocolate'), [])
+
+        shl = ShoppingList.query.filter_by(name='Breakfast').first()
+
+        with self.assertRaises(RuntimeError):
+            with unit_of_work():
+                shl.add_item(ShoppingItem(name='chocolate', price=10, quantity_description='1'))
+                search_index.index_list(shl.id)
+                raise RuntimeError('failed')
+
+        self.assertFalse(search_index.backend.trigrams.match(shl.owner_id, 'chocolate', 0.3))
+        self.assertEqual(self.fuzzy_search('chocolate'), [])
+
+    def test_unknown_mode_is_rejected(self):
+        response = self.search_shoppinglist(self.token, 'bred', mode='magic')
+        self.assertStatus(response, 422)
+
+
+class TestTrigramIndex(TestSearchAndPaginationBaseCase):
+    def test_trigrams_are_padded_like_pg_trgm(self):
+        self.assertEqual(trigrams('cat'), {'  c', ' ca', 'cat', 'at '})
+
+    def test_lookup_only_visits_shared_trigrams(self):
+        documents = {shl_id: (1, ['list %s' % shl_id]) for shl_id in range(1, 1001)}
+        documents[1001] = (1, ['milk'])
+
+        index = TrigramIndex(tokenize)
+        with mock.patch('app.shoppinglist.fuzzy.load_documents', return_value=documents):
+            index.load_owner(1)
+
+        self.assertEqual([shl_id for shl_id, _ in index.match(1, 'milc', 0.3)], [1001])
+        self.assertEqual(index._trigrams[1][' mi'], {'milk'})
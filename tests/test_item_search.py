@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module tests searching shopping items across all user shopping lists.
+"""
+
+from flask import json, url_for
+
+from app.messages import search_not_found
+from app.models import ShoppingList
+from .shopping_base import TestSearchAndPaginationBaseCase
+
+
+class TestItemSearchCase(TestSearchAndPaginationBaseCase):
+    def setUp(self):
+        super(TestItemSearchCase, self).setUp()
+        self.token = self.init_shoppinglists()
+        self.lists = {shl.name: shl.id for shl in ShoppingList.query}
+
+        for name in ['Birthday', 'Breakfast', 'Lunch']:
+            for item in self.shoppingitems:
+                self.create_shoppingitem(self.token, self.lists[name], dict(
+                    name=item.name, price=item.price,
+                    quantity_description=item.quantity_description))
+
+    def search(self, keyword, **params):
+        response = self.search_shoppingitems(self.token, keyword, **params)
+        self.assert200(response)
+        return json.loads(response.get_data(as_text=True))
+
+    def test_search_returns_parent_lists(self):
+        data = self.search('BRE')
+
+        self.assertEqual([item['name'] for item in data['shoppingitems']], ['bread'] * 3)
+        self.assertEqual([item['shoppinglist']['name'] for item in data['shoppingitems']],
+                         ['Birthday', 'Breakfast', 'Lunch'])
+        self.assertEqual(data['shoppingitems'][0]['shoppinglist']['id'], self.lists['Birthday'])
+
+    def test_search_matches_quantity_description(self):
+        data = self.search('one pack')
+
+        self.assertEqual({item['name'] for item in data['shoppingitems']}, {'sausages'})
+
+    def test_search_pages_with_cursor(self):
+        first = self.search('b', limit=4)
+        second = self.search('b', limit=4, cursor=first['next_cursor'])
+
+        self.assertEqual(first['items_in_page'], 4)
+        self.assertIn('q=b', first['next_page_url'])
+        self.assertEqual(second['items_in_page'], 2)
+        self.assertNotIn('next_cursor', second)
+
+        ids = [item['id'] for item in first['shoppingitems'] + second['shoppingitems']]
+        self.assertEqual(ids, sorted(set(ids)))
+
+    def test_search_is_limited_to_own_lists(self):
+        details = dict(username='usertwo', email='usertwo@gmail.com', password=self.test_user.password)
+        self.client.post(url_for('user_register'), data=dict(details, confirm=details['password']))
+        login = self.client.post(url_for('user_login'), data=dict(
+            username=details['username'], password=details['password']))
+        token = json.loads(login.get_data(as_text=True))['data']['auth_token']
+
+        data = json.loads(self.search_shoppingitems(token, 'bread').get_data(as_text=True))
+
+        self.assertEqual(data['message'], search_not_found)
+
+    def test_wildcards_are_matched_literally(self):
+        data = self.search('%')
+
+        self.assertEqual(data['items_in_page'], 0)
@@ -1,6 +1,8 @@
 from ddt import ddt, data
 
 from flask import json
+
+from app import messages as msg
 from .shopping_base import TestSearchAndPaginationBaseCase
 
 
@@ -65,6 +67,14 @@ class TestPaginationCase(TestSearchAndPaginationBaseCase):
 
         self.assertStatus(res, 422)
 
+    @data(0, -1, -2, -3)
+    def test_cannot_use_negative_limit_query_parameter_in_item_search(self, limit_no: int):
+        token, _ = self.init_shoppingitems()
+        res = self.search_shoppingitems(token, 'b', limit=limit_no)
+
+        self.assertStatus(res, 422)
+        self.assertEqual(json.loads(res.get_data(as_text=True))['message'], msg.negative_limit)
+
     @data(1, 2, 3)
     def test_can_limit_returned_shoppingitems_objects(self, limit_no: int):
         try:
@@ -172,3 +182,105 @@ class TestPaginationCase(TestSearchAndPaginationBaseCase):
         # assertions.
         self.assert200(response)
         self.assertTrue(response_data['items_in_page'] == limit)
+
+    def test_can_walk_shoppinglists_with_cursor(self):
+        token = self.init_shoppinglists()
+
+        names, cursor, pages = [], '', 0
+        while cursor is not None:
+            res = self.get_shoppinglists(token, limit=4, cursor=cursor)
+            res_data = json.loads(res.get_data(as_text=True))
+
+            self.assert200(res)
+            names.extend(shl['name'] for shl in res_data['data'])
+            cursor = res_data.get('next_cursor')
+            pages += 1
+
+        self.assertEqual(names, self.shoppinglists)
+        self.assertEqual(pages, 2)
+
+        # walk back to the first page.
+        prev_cursor = res_data['prev_cursor']
+        self.assertIn('cursor=%s' % prev_cursor, res_data['previous_page_url'])
+
+        res = self.get_shoppinglists(token, limit=4, cursor=prev_cursor)
+        res_data = json.loads(res.get_data(as_text=True))
+
+        self.assertEqual([shl['name'] for shl in res_data['data']], self.shoppinglists[:4])
+        self.assertNotIn('prev_cursor', res_data)
+        self.assertIn('next_cursor', res_data)
+
+    def test_can_walk_shoppingitems_with_cursor_ordered_by_updated(self):
+        token, shl_id = self.init_shoppingitems()
+
+        names, cursor = [], ''
+        while cursor is not None:
+            res = self.get_shoppingitems(token, shl_id, limit=3, cursor=cursor, order='updated')
+            res_data = json.loads(res.get_data(as_text=True))
+
+            self.assert200(res)
+            names.extend(item['name'] for item in res_data['shopping_items'])
+            cursor = res_data.get('next_cursor')
+
+        self.assertEqual(names, [item.name for item in self.shoppingitems])
+
+    def test_cannot_use_invalid_cursor(self):
+        token = self.init_shoppinglists()
+        res = self.get_shoppinglists(token, limit=2, cursor='not-a-cursor')
+
+        self.assertStatus(res, 422)
+        self.assertEqual(json.loads(res.get_data(as_text=True))['message'], msg.invalid_cursor)
+
+    def test_count_none_skips_totals(self):
+        token = self.init_shoppinglists()
+
+        with self.record_statements() as statements:
+            res = self.get_shoppinglists(token, limit=2, page=3, count='none')
+
+        res_data = json.loads(res.get_data(as_text=True))
+
+        self.assert200(res)
+        self.assertEqual(len(res_data['data']), 2)
+        self.assertNotIn('total_shoppinglist', res_data)
+        self.assertNotIn('total_pages', res_data)
+        self.assertIn('previous_page_url', res_data)
+        self.assertNotIn('next_page_url', res_data)
+        self.assertFalse([s for s in statements if 'count(' in s.lower()])
+
+        # the previous page is fetched with the same counting mode.
+        with self.record_statements() as statements:
+            res = self.client.get(res_data['previous_page_url'], headers={self.header_name: token})
+
+        res_data = json.loads(res.get_data(as_text=True))
+
+        self.assert200(res)
+        self.assertEqual(res_data['current_page'], 2)
+        self.assertNotIn('total_shoppinglist', res_data)
+        self.assertIn('next_page_url', res_data)
+        self.assertIn('count=none', res_data['next_page_url'])
+        self.assertFalse([s for s in statements if 'count(' in s.lower()])
+
+    def test_count_exact_counts_once(self):
+        token = self.init_shoppinglists()
+
+        with self.record_statements() as statements:
+            res = self.get_shoppinglists(token, limit=2, page=1, count='exact')
+
+        res_data = json.loads(res.get_data(as_text=True))
+
+        self.assertEqual(res_data['total_shoppinglist'], len(self.shoppinglists))
+        self.assertEqual(res_data['total_items'], len(self.shoppinglists))
+        self.assertEqual(res_data['total_pages'], 3)
+        self.assertEqual(len([s for s in statements if 'count(' in s.lower()]), 1)
+
+    def test_count_estimate_of_shoppingitems_uses_counters(self):
+        token, shl_id = self.init_shoppingitems()
+
+        with self.record_statements() as statements:
+            res = self.get_shoppingitems(token, shl_id, limit=1, page=1, count='estimate')
+
+        res_data = json.loads(res.get_data(as_text=True))
+
+        self.assertEqual(res_data['total_items'], len(self.shoppingitems))
+        self.assertEqual(res_data['total_pages'], len(self.shoppingitems))
+        self.assertFalse([s for s in statements if 'count(' in s.lower()])
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module tests password hashing on the hashing pool.
+"""
+
+import threading
+import time
+from unittest import mock
+
+from flask import json
+
+from app import messages as msg
+from app.core.exceptions import HashingUnavailable
+from app.core.hashing import calibrate, hash_cost, hasher
+from app.models import User
+from .auth_base import TestAuthenticationBaseCase
+
+
+class TestPasswordHashing(TestAuthenticationBaseCase):
+    def setUp(self):
+        super(TestPasswordHashing, self).setUp()
+        self.register_user(
+            username=self.test_user.username, email=self.test_user.email,
+            password=self.test_user.password, confirm=self.test_user.password)
+
+    def test_hash_and_check_on_pool(self):
+        self.app.config['BCRYPT_POOL_SIZE'] = 1
+
+        hashed = hasher.hash('s3cret!Pass', rounds=4)
+
+        self.assertTrue(hasher.check(hashed, 's3cret!Pass'))
+        self.assertFalse(hasher.check(hashed, 'wrong'))
+        self.assertEqual(hasher.pending, 0)
+
+    def test_full_queue_is_rejected(self):
+        self.app.config['BCRYPT_POOL_SIZE'] = 1
+        self.app.config['BCRYPT_QUEUE_LIMIT'] = 1
+
+        def slow_hash():
+            with self.app.app_context():
+                hasher.hash('s3cret!Pass', rounds=14)
+
+        # occupy the only worker with a slow hash.
+        worker = threading.Thread(target=slow_hash)
+        worker.start()
+
+        try:
+            deadline = time.time() + 10
+            while hasher.pending < 1 and time.time() < deadline:
+                time.sleep(0.001)
+
+            with self.assertRaises(HashingUnavailable):
+                hasher.hash('s3cret!Pass', rounds=4)
+
+        finally:
+            worker.join()
+
+        self.assertEqual(hasher.pending, 0)
+
+    def test_login_verifies_password_once(self):
+        with mock.patch.object(hasher, 'check', wraps=hasher.check) as check:
+            response = self.login_user(
+                username=self.test_user.username, password=self.test_user.password)
+
+        self.assert200(response)
+        self.assertEqual(check.call_count, 1)
+
+    def test_login_over_budget_returns_503(self):
+        with mock.patch.object(hasher, 'check', side_effect=HashingUnavailable):
+            response = self.login_user(
+                username=self.test_user.username, password=self.test_user.password)
+
+        self.assertStatus(response, 503)
+        self.assertEqual(json.loads(response.get_data(as_text=True))['message'], msg.server_busy)
+
+    def test_login_rehashes_password_with_configured_cost(self):
+        user = User.get_by_username(self.test_user.username)
+        self.assertEqual(hash_cost(user.password), 4)
+
+        self.app.config['BCRYPT_LOG_ROUNDS'] = 5
+        self.assert200(self.login_user(
+            username=self.test_user.username, password=self.test_user.password))
+
+        user = User.get_by_username(self.test_user.username)
+        self.assertEqual(hash_cost(user.password), 5)
+        self.assertTrue(user.verify_password(self.test_user.password))
+
+    def test_login_rehash_uses_login_budget(self):
+        self.app.config['BCRYPT_LOG_ROUNDS'] = 5
+        self.app.config['BCRYPT_LOGIN_TIMEOUT'] = 1.5
+
+        with mock.patch.object(hasher, 'check', wraps=hasher.check) as check, \
+                mock.patch.object(hasher, 'hash', wraps=hasher.hash) as hash_password:
+            self.assert200(self.login_user(
+                username=self.test_user.username, password=self.test_user.password))
+
+        # verifying and rehashing share one budget.
+        self.assertEqual(check.call_args[1]['timeout'], 1.5)
+        self.assertGreater(hash_password.call_args[1]['timeout'], 0)
+        self.assertLess(hash_password.call_args[1]['timeout'], 1.5)
+
+    def test_login_skips_rehash_when_verify_uses_budget(self):
+        self.app.config['BCRYPT_LOG_ROUNDS'] = 5
+        self.app.config['BCRYPT_LOGIN_TIMEOUT'] = 0.05
+
+        def slow_check(*args, **kwargs):
+            time.sleep(0.1)
+            return True
+
+        with mock.patch.object(hasher, 'check', side_effect=slow_check), \
+                mock.patch.object(hasher, 'hash', wraps=hasher.hash) as hash_password:
+            self.assert200(self.login_user(
+                username=self.test_user.username, password=self.test_user.password))
+
+        self.assertFalse(hash_password.called)
+        self.assertEqual(hash_cost(User.get_by_username(self.test_user.username).password), 4)
+
+    def test_login_succeeds_when_rehash_is_over_budget(self):
+        self.app.config['BCRYPT_LOG_ROUNDS'] = 5
+
+        with mock.patch.object(hasher, 'hash', side_effect=HashingUnavailable):
+            self.assert200(self.login_user(
+                username=self.test_user.username, password=self.test_user.password))
+
+        self.assertEqual(hash_cost(User.get_by_username(self.test_user.username).password), 4)
+
+    def test_calibrate_picks_highest_cost_within_target(self):
+        rounds, timings = calibrate(target=60, min_rounds=4, max_rounds=5, samples=1)
+
+        self.assertEqual(rounds, 5)
+        self.assertEqual([cost for cost, _ in timings], [4, 5])
+
+    def test_doomed_registrations_skip_hashing(self):
+        attempts = [
+            # existing username.
+            dict(username=self.test_user.username, email='other@gmail.com',
+                 password=self.test_user.password, confirm=self.test_user.password),
+            # existing email.
+            dict(username='otheruser', email=self.test_user.email,
+                 password=self.test_user.password, confirm=self.test_user.password),
+            # weak password.
+            dict(username='otheruser', email='other@gmail.com',
+                 password='password', confirm='password'),
+            # passwords do not match.
+            dict(username='otheruser', email='other@gmail.com',
+                 password=self.test_user.password, confirm='g1Deonp@sswore'),
+        ]
+
+        with mock.patch.object(hasher, 'hash', wraps=hasher.hash) as hash_password:
+            statuses = [self.register_user(**attempt).status_code for attempt in attempts]
+
+        self.assertEqual(statuses, [409, 409, 422, 400])
+        self.assertEqual(hash_password.call_count, 0)
+
+    def test_constraint_backed_insert_reports_conflict(self):
+        with self.assertRaises(User.UsernameExists):
+            User.create(username=self.test_user.username, email='other@gmail.com',
+                        password=self.test_user.password)
+
+    def test_constraint_backed_insert_reports_email_conflict(self):
+        with self.assertRaises(User.EmailExists):
+            User.create(username='otheruser', email=self.test_user.email,
+                        password=self.test_user.password)
+
+    def test_other_constraint_violations_are_not_conflicts(self):
+        with self.assertRaises(User.AccountNotCreated):
+            User.create(username=None, email='other@gmail.com', password=self.test_user.password)
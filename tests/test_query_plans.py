@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module checks that hot queries are answered from indexes.
+
+Plans come from `EXPLAIN QUERY PLAN` on SQLite and `EXPLAIN` on Postgres, on
+Postgres sequential scans are disabled since tiny test tables are always
+cheaper to scan.
+"""
+
+from datetime import datetime
+
+import pytz
+
+from app import DB
+from app.models import BlacklistToken, ResetToken, ShoppingItem, ShoppingList
+from .base import TestBaseCase
+
+
+class TestQueryPlans(TestBaseCase):
+    def setUp(self):
+        DB.drop_all()
+        DB.create_all()
+
+    def tearDown(self):
+        DB.session.remove()
+        DB.drop_all()
+
+    def query_plan(self, query):
+        """
+        Plan of a query as text.
+
+        :param query: ORM query.
+        :return: plan, one line per step.
+        """
+
+        connection = DB.session.connection()
+        compiled = query.statement.compile(dialect=connection.dialect)
+
+        if connection.dialect.name == 'postgresql':
+            connection.execute('SET LOCAL enable_seqscan = off')
+            rows = connection.execute('EXPLAIN ' + str(compiled), compiled.params)
+            return '\n'.join(row[0] for row in rows)
+
+        params = [compiled.params[name] for name in compiled.positiontup]
+        rows = connection.execute('EXPLAIN QUERY PLAN ' + str(compiled), params)
+        return '\n'.join(row[-1] for row in rows)
+
+    def assertUsesIndex(self, query, index=None):
+        plan = self.query_plan(query)
+
+        self.assertNotIn('Seq Scan', plan)
+        for line in plan.splitlines():
+            self.assertFalse(line.startswith('SCAN') and 'INDEX' not in line, plan)
+
+        if index is not None:
+            self.assertIn(index, plan)
+
+    def test_shoppinglist_name_lookup(self):
+        self.assertUsesIndex(
+            ShoppingList.for_owner(1).filter_by(name='Breakfast'), 'ix_shopping_list_owner_id_name')
+
+    def test_shoppinglist_owner_listing(self):
+        self.assertUsesIndex(
+            ShoppingList.for_owner(1).order_by(ShoppingList.id), 'ix_shopping_list_owner_id_id')
+
+    def test_shoppinglist_get(self):
+        self.assertUsesIndex(ShoppingList.for_owner(1).filter_by(id=1))
+
+    def test_shoppingitem_duplicate_lookup(self):
+        self.assertUsesIndex(
+            ShoppingItem.query.filter_by(shoppinglist_id=1, name='bread', quantity_description='1'),
+            'ix_shopping_item_shoppinglist_id_name_quantity')
+
+    def test_shoppingitem_bought_filter(self):
+        self.assertUsesIndex(
+            ShoppingItem.query.filter_by(shoppinglist_id=1, bought=True),
+            'ix_shopping_item_shoppinglist_id_bought')
+
+    def test_shoppingitem_prefix_search(self):
+        if DB.session.get_bind().dialect.name != 'postgresql':
+            self.skipTest('SQLite does not use expression indexes for LIKE')
+
+        plan = self.query_plan(ShoppingItem.search(1, 'bre'))
+
+        self.assertIn('ix_shopping_item_lower_name', plan)
+        self.assertIn('ix_shopping_item_lower_quantity_description', plan)
+
+    def test_blacklist_check(self):
+        now = datetime.now(tz=pytz.utc)
+
+        self.assertUsesIndex(DB.session.query(BlacklistToken.id).filter(
+            BlacklistToken.token == 'jti',
+            DB.or_(BlacklistToken.expires.is_(None), BlacklistToken.expires > now)))
+
+    def test_reset_token_lookup(self):
+        self.assertUsesIndex(
+            ResetToken.query.filter_by(token='token', user_id=1), 'ix_reset_token_token_user_id')
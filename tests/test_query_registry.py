@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module tests the baked query registry.
+"""
+
+from flask import json
+
+from app import DB
+from app.db.queries import QueryRegistry, queries
+from app.models import ShoppingItem, ShoppingList, User
+from .shopping_base import TestShoppingItemsBaseCase
+
+
+class TestQueryRegistry(TestShoppingItemsBaseCase):
+    def setUp(self):
+        super(TestQueryRegistry, self).setUp()
+        self.register_user()
+        login_res = self.login_user()
+        self.token = json.loads(login_res.get_data(as_text=True))['data']['auth_token']
+
+        response = self.create_shoppinglist(self.token, dict(name='Breakfast'))
+        self.shl_id = json.loads(response.get_data(as_text=True))['data']['id']
+        self.owner_id = User.get_by_username(self.test_user.username).id
+        queries.reset_stats()
+
+    def test_queries_are_compiled_once(self):
+        registry = QueryRegistry()
+
+        @registry.register('shoppinglist')
+        def shoppinglist(session):
+            return session.query(ShoppingList).filter(ShoppingList.id == DB.bindparam('id'))
+
+        self.assertEqual(registry.run('shoppinglist', id=self.shl_id).first().id, self.shl_id)
+        compiled = registry.stats()['shoppinglist']
+        self.assertEqual(compiled.hits, 0)
+        self.assertGreater(compiled.misses, 0)
+
+        self.assertIsNone(registry.run('shoppinglist', id=self.shl_id + 1).first())
+        self.assertEqual(registry.run('shoppinglist', id=self.shl_id).first().id, self.shl_id)
+
+        stats = registry.stats()['shoppinglist']
+        self.assertEqual(stats.misses, compiled.misses)
+        self.assertEqual(stats.hits, 2 * compiled.misses)
+        self.assertAlmostEqual(stats.hit_rate, 2 / 3.0)
+
+    def test_lookups_are_scoped_to_owner(self):
+        self.assertEqual(ShoppingList.get(self.shl_id, self.owner_id).id, self.shl_id)
+        self.assertIsNone(ShoppingList.get(self.shl_id, self.owner_id + 1))
+
+    def test_item_lookup_is_scoped_to_list(self):
+        response = self.create_shoppingitem(self.token, self.shl_id, dict(
+            name='eggs', price=10, quantity_description='1 crate'))
+        item_id = json.loads(response.get_data(as_text=True))['data']['id']
+
+        self.assertEqual(ShoppingItem.get(self.shl_id, item_id).name, 'eggs')
+        self.assertIsNone(ShoppingItem.get(self.shl_id + 1, item_id))
+
+    def test_requests_use_cached_lookups(self):
+        for _ in range(2):
+            self.assert200(self.get_shoppinglist_detail(self.token, self.shl_id))
+
+        stats = queries.stats()
+        self.assertGreater(stats['shoppinglist_by_owner'].hits, 0)
+        self.assertEqual(stats['shoppinglist_by_owner'].misses, 0)
+
+    def test_names_are_unique(self):
+        with self.assertRaises(ValueError):
+            queries.register('user_by_username')(lambda session: None)
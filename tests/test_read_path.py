@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module tests that collection endpoints read projected rows.
+"""
+
+from flask import json
+
+from app import DB
+from app.models import ShoppingItem, ShoppingList
+from app.shoppinglist.benchmark import compare_item_encoding, compare_item_reads
+from .shopping_base import TestShoppingItemsBaseCase
+
+
+class TestReadPath(TestShoppingItemsBaseCase):
+    def setUp(self):
+        super(TestReadPath, self).setUp()
+        self.register_user()
+        login_res = self.login_user()
+        self.token = json.loads(login_res.get_data(as_text=True))['data']['auth_token']
+
+    def loaded(self, model):
+        return [key for key in DB.session.identity_map.keys() if key[0] is model]
+
+    def test_listings_do_not_load_instances(self):
+        response = self.create_shoppinglist(self.token, dict(name='Breakfast'))
+        shl_id = json.loads(response.get_data(as_text=True))['data']['id']
+
+        for item in self.shoppingitems:
+            self.create_shoppingitem(self.token, shl_id, dict(
+                name=item.name, price=item.price,
+                quantity_description=item.quantity_description))
+
+        DB.session.expunge_all()
+
+        response = self.get_shoppingitems(self.token, shl_id)
+        data = json.loads(response.get_data(as_text=True))
+
+        self.assert200(response)
+        self.assertEqual(data['total_items'], len(self.shoppingitems))
+        self.assertEqual(data['shopping_items'][0]['parent_name'], 'Breakfast')
+        self.assertEqual(self.loaded(ShoppingItem), [])
+
+        DB.session.expunge_all()
+
+        response = self.get_shoppinglists(self.token)
+        data = json.loads(response.get_data(as_text=True))
+
+        self.assert200(response)
+        self.assertEqual(data['shopping_lists'][0]['name'], 'Breakfast')
+        self.assertEqual(self.loaded(ShoppingList), [])
+
+    def test_benchmark_leaves_no_rows(self):
+        timings = compare_item_reads(items=50, repeat=1) + compare_item_encoding(items=50, repeat=1)
+
+        self.assertEqual([timing.name for timing in timings], ['orm', 'projected', 'stdlib', 'fast'])
+        self.assertEqual(ShoppingItem.query.count(), 0)
@@ -1,6 +1,9 @@
 
 from flask import json
+from app.db.base import unit_of_work
 from app.messages import search_not_found
+from app.models import ShoppingItem, ShoppingList
+from app.shoppinglist.search import search_index
 from .shopping_base import TestSearchAndPaginationBaseCase
 
 
@@ -64,3 +67,90 @@ class TestSearchCase(TestSearchAndPaginationBaseCase):
 
         self.assert200(search_response)
         self.assertIn(search_not_found, results['message'])
+
+    def test_search_loads_items_in_one_query(self):
+        """
+        Items of all lists in a page are loaded together and can be capped per list.
+        """
+
+        client_token = self.init_shoppinglists()
+        shl_ids = [shl.id for shl in ShoppingList.query.filter(
+            ShoppingList.name.in_(['Birthday', 'Breakfast']))]
+
+        for shl_id in shl_ids:
+            for item in self.shoppingitems:
+                self.create_shoppingitem(client_token, shl_id, dict(
+                    name=item.name, price=item.price,
+                    quantity_description=item.quantity_description))
+
+        with self.record_statements() as statements:
+            response = self.search_shoppinglist(client_token, 'B', items_limit=2)
+
+        results = json.loads(response.get_data(as_text=True))['shoppinglists']
+
+        self.assert200(response)
+        self.assertEqual([shl['items'] for shl in results],
+                         [['bread', 'blueband'], ['bread', 'blueband']])
+        self.assertEqual([shl['item_count'] for shl in results], [4, 4])
+        self.assertEqual(len([s for s in statements if 'shopping_item' in s]), 1)
+
+    def test_search_matches_descriptions_and_item_names(self):
+        """
+        Search covers descriptions and item names and ranks name matches first.
+        """
+
+        client_token = self.init_shoppinglists()
+        camping = ShoppingList.query.filter_by(name='Camping').first()
+        lunch = ShoppingList.query.filter_by(name='Lunch').first()
+
+        self.create_shoppingitem(client_token, camping.id, dict(
+            name='bread', price=20, quantity_description='2 loaves'))
+        self.create_shoppingitem(client_token, lunch.id, dict(
+            name='juice', price=10, quantity_description='1 litre'))
+
+        response = self.search_shoppinglist(client_token, 'bre')
+        names = [shl['name'] for shl in json.loads(response.get_data(as_text=True))['shoppinglists']]
+
+        self.assert200(response)
+        self.assertEqual(names, ['Breakfast', 'Camping'])
+
+    def test_search_index_follows_changes(self):
+        """
+        Renamed and deleted lists and deleted items drop out of the results.
+        """
+
+        client_token = self.init_shoppinglists()
+        lunch = ShoppingList.query.filter_by(name='Lunch').first()
+
+        self.create_shoppingitem(client_token, lunch.id, dict(
+            name='sandwich', price=20, quantity_description='1'))
+        item_id = lunch.shopping_items.first().id
+
+        self.assertEqual(self.search_names(client_token, 'sandwich'), ['Lunch'])
+
+        self.delete_shoppingitem(client_token, lunch.id, item_id, 'sandwich')
+        self.assertEqual(self.search_names(client_token, 'sandwich'), [])
+
+        self.update_shoppinglist(client_token, lunch.id, dict(name='Dinner'))
+        self.assertEqual(self.search_names(client_token, 'dinner'), ['Dinner'])
+        self.assertEqual(self.search_names(client_token, 'lunch'), [])
+
+        self.delete_shoppinglist(client_token, lunch.id, 'Dinner')
+        self.assertEqual(self.search_names(client_token, 'dinner'), [])
+
+    def test_document_is_written_once_per_unit_of_work(self):
+        client_token = self.init_shoppinglists()
+        lunch = ShoppingList.query.filter_by(name='Lunch').first()
+
+        with self.record_statements() as statements:
+            with unit_of_work():
+                for name in ('sandwich', 'apples'):
+                    lunch.add_item(ShoppingItem(name=name, price=10, quantity_description='1'))
+                    search_index.index_list(lunch.id)
+
+        self.assertEqual(len([s for s in statements if 'INSERT INTO shopping_list_fts' in s]), 1)
+        self.assertEqual(self.search_names(client_token, 'sandwich apples'), ['Lunch'])
+
+    def search_names(self, token, keyword):
+        data = json.loads(self.search_shoppinglist(token, keyword).get_data(as_text=True))
+        return [shl['name'] for shl in data.get('shoppinglists', [])]
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module tests response serialization helpers.
+"""
+
+import collections
+import decimal
+from datetime import datetime
+from unittest import mock
+
+import pytz
+from flask import json
+from flask.json import JSONEncoder as FlaskJSONEncoder
+
+from app.core import serializers
+from app.core.serializers import JSONEncoder, format_datetime, make_serializer
+from .base import TestBaseCase
+from .shopping_base import TestShoppingListBaseCase
+
+Row = collections.namedtuple('Row', ['id', 'name', 'timestamp'])
+
+
+class TestSerializers(TestBaseCase):
+    def test_format_datetime_matches_strftime(self):
+        naive = datetime(2017, 11, 3, 9, 5, 7, 123456)
+        aware = pytz.timezone('Africa/Nairobi').localize(naive)
+
+        for value in (naive, aware, aware.astimezone(pytz.utc)):
+            self.assertEqual(format_datetime(value), value.strftime("%Y-%m-%d %H:%M:%S"))
+
+    def test_serializer_formats_fields(self):
+        serialize = make_serializer(
+            [('id', 'id'), ('created_on', 'timestamp')],
+            formatters=dict(created_on=format_datetime))
+
+        self.assertEqual(serialize(Row(1, 'eggs', datetime(2017, 11, 3, 9, 5, 7))),
+                         dict(id=1, created_on='2017-11-03 09:05:07'))
+        self.assertEqual(serialize(Row(2, 'milk', None)), dict(id=2, created_on=None))
+
+    def test_encoder_matches_standard_library(self):
+        data = dict(items=[dict(id=1, name='mayai', price=10.5, bought=True)], total=None,
+                    ids=(1, 2), counts={1: 2})
+        encoded = JSONEncoder().encode(data)
+
+        self.assertEqual(json.loads(encoded), json.loads(json.dumps(data)))
+        self.assertEqual(json.loads(JSONEncoder().encode(dict(price=decimal.Decimal('2.5')))),
+                         dict(price=2.5))
+
+    def test_encoder_output_does_not_depend_on_library(self):
+        data = dict(name='chapati', items=[dict(name='maziwa ya ng\u2019ombe', price=2.5)], id=1)
+        settings = [
+            dict(),
+            dict(separators=(',', ':')),
+            dict(separators=(',', ':'), ensure_ascii=False),
+            dict(separators=(',', ':'), sort_keys=True),
+            dict(indent=2, separators=(',', ': ')),
+            dict(indent=2, separators=(', ', ': ')),
+            dict(indent=4),
+        ]
+
+        for kwargs in settings:
+            self.assertEqual(JSONEncoder(**kwargs).encode(data),
+                             FlaskJSONEncoder(**kwargs).encode(data), kwargs)
+
+        self.assertTrue(JSONEncoder(separators=(',', ':')).native)
+        self.assertFalse(JSONEncoder(indent=2, separators=(', ', ': ')).native)
+
+    def test_responses_use_app_encoder(self):
+        self.assertIs(self.app.json_encoder, JSONEncoder)
+
+        with self.app.test_request_context():
+            response = self.app.response_class(
+                json.dumps(dict(joined=datetime(2017, 11, 3, tzinfo=pytz.utc))))
+
+        self.assertIn('Fri, 03 Nov 2017', response.get_data(as_text=True))
+
+
+class TestResponseEncoding(TestShoppingListBaseCase):
+    def test_view_responses_use_fast_encoder(self):
+        if serializers.BACKEND != 'orjson':
+            self.skipTest('orjson is not installed')
+
+        self.register_user()
+        token = json.loads(self.login_user().get_data(as_text=True))['data']['auth_token']
+        self.create_shoppinglist(token, dict(name='Breakfast'))
+
+        with mock.patch.object(serializers.orjson, 'dumps', wraps=serializers.orjson.dumps) as dumps:
+            response = self.get_shoppinglists(token)
+
+        data = json.loads(response.get_data(as_text=True))
+
+        self.assert200(response)
+        self.assertEqual(data['shopping_lists'][0]['name'], 'Breakfast')
+        # the token is encoded with the app encoder too, the response body must be one of the calls.
+        self.assertIn(data, [call[0][0] for call in dumps.call_args_list])
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module tests that values generated by the database are loaded while saving.
+"""
+
+from flask import json
+
+from app import DB
+from app.models import ShoppingList, User
+from .shopping_base import TestShoppingItemsBaseCase
+
+
+class TestServerDefaults(TestShoppingItemsBaseCase):
+    def setUp(self):
+        super(TestServerDefaults, self).setUp()
+        self.register_user()
+        login_res = self.login_user()
+        self.token = json.loads(login_res.get_data(as_text=True))['data']['auth_token']
+
+    def test_generated_values_are_available_after_save(self):
+        owner = User.query.filter_by(username=self.test_user.username).first()
+        shoppinglist = ShoppingList(name='Breakfast', owner_id=owner.id)
+
+        with self.record_statements() as statements:
+            shoppinglist.save()
+
+        if DB.engine.dialect.name == 'postgresql':
+            self.assertEqual(len(statements), 1)
+            self.assertIn('RETURNING', statements[0])
+
+        with self.record_statements() as statements:
+            self.assertIsNotNone(shoppinglist.id)
+            self.assertIsNotNone(shoppinglist.timestamp)
+            self.assertIsNotNone(shoppinglist.updated)
+
+        self.assertEqual(statements, [])
+
+    def test_item_update_writes_one_row(self):
+        response = self.create_shoppinglist(self.token, dict(name='Breakfast'))
+        shl_id = json.loads(response.get_data(as_text=True))['data']['id']
+
+        response = self.create_shoppingitem(self.token, shl_id, dict(
+            name='eggs', price=10, quantity_description='1 crate'))
+        item_id = json.loads(response.get_data(as_text=True))['data']['id']
+
+        with self.record_statements() as statements:
+            response = self.update_shoppingitem(self.token, shl_id, item_id, dict(name='bacon'))
+
+        self.assert200(response)
+        writes = [statement for statement in statements if statement.startswith('UPDATE')]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('shopping_item', writes[0])
@@ -1,4 +1,6 @@
-from flask import json
+from unittest import mock
+
+from flask import json, url_for
 from app import messages as msg
 from app.models import ShoppingItem, ShoppingList
 from .shopping_base import TestShoppingItemsBaseCase
@@ -241,3 +243,160 @@ class TestShoppingItemsCase(TestShoppingItemsBaseCase):
 
         self.assert200(del_response)
         self.assertTrue(del_response_data['message'] == msg.shoppingitem_deleted)
+
+    def test_shoppinglist_detail_item_totals(self):
+        self.register_user()
+        login_res = self.login_user()
+        auth_token = json.loads(login_res.get_data(as_text=True))['data']['auth_token']
+
+        shl_response = self.create_shoppinglist(auth_token, dict(name=self.shopping_list.name))
+        shl_id = json.loads(shl_response.get_data(as_text=True))['data']['id']
+
+        item_ids = []
+        for item in self.shoppingitems:
+            item_response = self.create_shoppingitem(auth_token, shl_id, dict(
+                name=item.name, price=item.price,
+                quantity_description=item.quantity_description))
+            item_ids.append(json.loads(item_response.get_data(as_text=True))['data']['id'])
+
+        self.update_shoppingitem(auth_token, shl_id, item_ids[0], dict(bought='1'))
+
+        with self.record_statements() as statements:
+            response = self.get_shoppinglist_detail(auth_token, shl_id)
+
+        data = json.loads(response.get_data(as_text=True))['data']
+
+        self.assert200(response)
+        self.assertEqual(data['total_items'], 4)
+        self.assertEqual(data['bought_items'], 1)
+        self.assertEqual(data['items_not_bought'], 3)
+        self.assertEqual(data['total'], sum(item.price for item in self.shoppingitems))
+
+        # item totals are read from the shopping list counters.
+        self.assertEqual(len(statements), 1)
+
+    def test_shoppinglist_counters_follow_item_changes(self):
+        self.register_user()
+        login_res = self.login_user()
+        auth_token = json.loads(login_res.get_data(as_text=True))['data']['auth_token']
+
+        shl_response = self.create_shoppinglist(auth_token, dict(name=self.shopping_list.name))
+        shl_id = json.loads(shl_response.get_data(as_text=True))['data']['id']
+
+        item_ids = []
+        for item in self.shoppingitems:
+            item_response = self.create_shoppingitem(auth_token, shl_id, dict(
+                name=item.name, price=item.price,
+                quantity_description=item.quantity_description))
+            item_ids.append(json.loads(item_response.get_data(as_text=True))['data']['id'])
+
+        self.update_shoppingitem(auth_token, shl_id, item_ids[0], dict(bought='1', price=50))
+        self.update_shoppingitem(auth_token, shl_id, item_ids[1], dict(bought='1'))
+        self.delete_shoppingitem(auth_token, shl_id, item_ids[1], self.testdata_2.name)
+
+        shoppinglist = ShoppingList.query.get(shl_id)
+        stats = shoppinglist.item_stats()
+
+        self.assertEqual(shoppinglist.item_count, stats.total_items)
+        self.assertEqual(shoppinglist.bought_count, stats.bought_items)
+        self.assertAlmostEqual(shoppinglist.total_price, stats.total_price)
+
+        # counters are recomputed by the repair command.
+        ShoppingList.query.update(dict(item_count=0, bought_count=0, total_price=0))
+        self.assertEqual(ShoppingList.repair_counters(), 1)
+
+        shoppinglist = ShoppingList.query.get(shl_id)
+        self.assertEqual((shoppinglist.item_count, shoppinglist.bought_count), (3, 1))
+        self.assertAlmostEqual(shoppinglist.total_price, 50 + 10.5 + 30)
+
+    def test_delete_all_shoppinglists_cascades_in_database(self):
+        self.register_user()
+        login_res = self.login_user()
+        auth_token = json.loads(login_res.get_data(as_text=True))['data']['auth_token']
+
+        for name in ('Breakfast', 'Lunch'):
+            shl_response = self.create_shoppinglist(auth_token, dict(name=name))
+            shl_id = json.loads(shl_response.get_data(as_text=True))['data']['id']
+
+            for item in self.shoppingitems:
+                self.create_shoppingitem(auth_token, shl_id, dict(
+                    name=item.name, price=item.price,
+                    quantity_description=item.quantity_description))
+
+        with self.record_statements() as statements:
+            response = self.delete_all_shoppinglists(auth_token, self.test_user.password)
+
+        self.assert200(response)
+        self.assertEqual(ShoppingList.query.count(), 0)
+        self.assertEqual(ShoppingItem.query.count(), 0)
+
+        # items are neither loaded nor deleted one by one.
+        self.assertFalse([s for s in statements if 'shopping_item' in s])
+
+    def test_clear_bought_items_with_one_statement(self):
+        self.register_user()
+        login_res = self.login_user()
+        auth_token = json.loads(login_res.get_data(as_text=True))['data']['auth_token']
+
+        shl_response = self.create_shoppinglist(auth_token, dict(name=self.shopping_list.name))
+        shl_id = json.loads(shl_response.get_data(as_text=True))['data']['id']
+
+        item_ids = []
+        for item in self.shoppingitems:
+            item_response = self.create_shoppingitem(auth_token, shl_id, dict(
+                name=item.name, price=item.price,
+                quantity_description=item.quantity_description))
+            item_ids.append(json.loads(item_response.get_data(as_text=True))['data']['id'])
+
+        self.update_shoppingitem(auth_token, shl_id, item_ids[0], dict(bought='1'))
+        self.update_shoppingitem(auth_token, shl_id, item_ids[1], dict(bought='1'))
+
+        url = url_for('shoppingitem_detail', shl_id=shl_id, bought='1')
+
+        with self.record_statements() as statements:
+            response = self.client.delete(url, headers={self.header_name: auth_token})
+
+        shoppinglist = ShoppingList.query.get(shl_id)
+
+        self.assert200(response)
+        self.assertEqual([item.name for item in shoppinglist.shopping_items.order_by(ShoppingItem.id)],
+                         [self.testdata_3.name, self.testdata_4.name])
+        self.assertEqual((shoppinglist.item_count, shoppinglist.bought_count), (2, 0))
+        self.assertAlmostEqual(shoppinglist.total_price, self.testdata_3.price + self.testdata_4.price)
+        self.assertEqual(len([s for s in statements if s.startswith('DELETE FROM shopping_item')]), 1)
+
+        # nothing bought is left to clear.
+        self.assert404(self.client.delete(url, headers={self.header_name: auth_token}))
+
+    def test_all_shoppingitems_are_streamed_in_chunks(self):
+        self.register_user()
+        login_res = self.login_user()
+        auth_token = json.loads(login_res.get_data(as_text=True))['data']['auth_token']
+
+        shl_response = self.create_shoppinglist(auth_token, dict(name=self.shopping_list.name))
+        shl_id = json.loads(shl_response.get_data(as_text=True))['data']['id']
+
+        response = self.get_shoppingitems(auth_token, shl_id)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(json.loads(response.get_data(as_text=True)),
+                         dict(shopping_items=[], total_items=0))
+
+        for item in self.shoppingitems:
+            self.create_shoppingitem(auth_token, shl_id, dict(
+                name=item.name, price=item.price,
+                quantity_description=item.quantity_description))
+
+        with mock.patch('app.shoppinglist.views.STREAM_CHUNK_SIZE', 3):
+            response = self.get_shoppingitems(auth_token, shl_id)
+            chunks = list(response.response)
+
+        data = json.loads(''.join(chunk.decode('utf-8') for chunk in chunks))
+
+        self.assert200(response)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(data['total_items'], len(self.shoppingitems))
+        self.assertEqual(sorted(item['name'] for item in data['shopping_items']),
+                         sorted(item.name for item in self.shoppingitems))
+        self.assertEqual({item['parent_name'] for item in data['shopping_items']},
+                         {self.shopping_list.name})
@@ -1,7 +1,9 @@
 from ddt import ddt, data
 
 from flask import json
+from sqlalchemy.exc import IntegrityError
 from app import messages as msg
+from app.models import ShoppingItem, ShoppingList
 from .shopping_base import TestShoppingItemsBaseCase
 
 
@@ -80,6 +82,30 @@ class TestShoppingItemsErrorsCase(TestShoppingItemsBaseCase):
         res = self.create_shoppingitem(auth_token, shl_id, res_data)
         self.assertStatus(res, 409)
 
+    def test_conflicting_item_update_leaves_item_and_counters_unchanged(self):
+        self.register_user()
+        login_response = self.login_user()
+        auth_token = json.loads(login_response.get_data(as_text=True))['data']['auth_token']
+
+        create_response = self.create_shoppinglist(auth_token, {'name': 'Breakfast'})
+        shl_id = json.loads(create_response.get_data(as_text=True))['data']['id']
+
+        for item in (self.testdata_1, self.testdata_2):
+            self.create_shoppingitem(auth_token, shl_id, dict(
+                name=item.name, price=item.price, quantity_description=item.quantity_description))
+
+        item = ShoppingList.query.get(shl_id).shopping_items.filter_by(name=self.testdata_2.name).first()
+
+        res = self.update_shoppingitem(auth_token, shl_id, item.id, dict(
+            name=self.testdata_1.name, quantity_description=self.testdata_1.quantity_description,
+            price=1, bought='1'))
+
+        shoppinglist = ShoppingList.query.get(shl_id)
+        self.assertStatus(res, 409)
+        self.assertEqual(ShoppingItem.query.get(item.id).name, self.testdata_2.name)
+        self.assertEqual((shoppinglist.bought_count, shoppinglist.total_price),
+                         (0, self.testdata_1.price + self.testdata_2.price))
+
     def test_user_cannot_view_items_in_shoppinglist_that_does_not_exist(self):
         self.register_user()
         login_res = self.login_user()
@@ -304,6 +330,24 @@ class TestShoppingItemsErrorsCase(TestShoppingItemsBaseCase):
         self.assert404(del_response)
         self.assertEqual(del_response_data['message'], msg.shoppingitem_not_found)
 
+    def test_other_constraint_violations_are_not_conflicts(self):
+        self.register_user()
+        login_response = self.login_user()
+        auth_token = json.loads(login_response.get_data(as_text=True))['data']['auth_token']
+
+        response = self.create_shoppinglist(auth_token, dict(name='Breakfast'))
+        shoppinglist = ShoppingList.query.get(json.loads(response.get_data(as_text=True))['data']['id'])
+
+        # list owned by a user that does not exist.
+        with self.assertRaises(IntegrityError):
+            ShoppingList(name='Lunch', owner_id=shoppinglist.owner_id + 100).save()
+
+        # item without quantity description.
+        with self.assertRaises(IntegrityError):
+            shoppinglist.add_item(ShoppingItem(name='eggs', price=10, quantity_description=None))
+
+        self.assertEqual(ShoppingList.query.get(shoppinglist.id).item_count, 0)
+
     # def test_cannot_delete_item_using_incorrect_name(self):
     #     self.register_user()
     #     login_res = self.login_user()
@@ -37,6 +37,23 @@ class TestShoppingListErrorsCase(TestShoppingListBaseCase):
         self.assertStatus(second_create_response, 409)
         self.assertEquals(res_data['message'], msg.shoppinglist_name_exists)
 
+    def test_user_cannot_rename_shoppinglist_to_existing_name(self):
+        self.register_user()
+        login_response = self.login_user()
+        auth_token = json.loads(login_response.get_data(as_text=True))['data']['auth_token']
+
+        self.create_shoppinglist(auth_token, {'name': 'Breakfast'})
+        response = self.create_shoppinglist(auth_token, {'name': 'Lunch'})
+        shl_id = json.loads(response.get_data(as_text=True))['data']['id']
+
+        with self.record_statements() as statements:
+            update_response = self.update_shoppinglist(auth_token, shl_id, {'name': 'Breakfast'})
+
+        self.assertStatus(update_response, 409)
+        self.assertEqual(ShoppingList.query.get(shl_id).name, 'Lunch')
+        # the conflict is detected by the write itself.
+        self.assertFalse([s for s in statements if 'WHERE shopping_list.name' in s])
+
     @data('12 +344', 'shop1ngl1st---', 'f00d(s)', '""""""#$%&*&%$#@')
     def test_cannot_create_shoppinglist_with_invalid_names(self, name):
         self.register_user()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module tests item name suggestions.
+"""
+
+from flask import json, url_for
+
+from app.db.base import unit_of_work
+from app.models import ShoppingItem, ShoppingList
+from app.shoppinglist.suggest import PrefixTrie, SuggestionCache, suggestions
+from .shopping_base import TestSearchAndPaginationBaseCase
+
+
+class TestPrefixTrie(TestSearchAndPaginationBaseCase):
+    def test_most_used_names_come_first(self):
+        trie = PrefixTrie()
+        trie.add('bread', 2)
+        trie.add('Blueband')
+        trie.add('butter', 3)
+        trie.add('eggs')
+
+        self.assertEqual(trie.suggest('b', 10), ['butter', 'bread', 'Blueband'])
+        self.assertEqual(trie.suggest('BL', 10), ['Blueband'])
+        self.assertEqual(trie.suggest('b', 1), ['butter'])
+        self.assertEqual(trie.suggest('x', 10), [])
+
+    def test_removed_names_are_pruned(self):
+        trie = PrefixTrie()
+        trie.add('bread')
+        trie.add('bean')
+        size = trie.size
+
+        trie.add('breadsticks')
+        trie.remove('breadsticks')
+
+        self.assertEqual(trie.size, size)
+        self.assertEqual(trie.suggest('b', 10), ['bean', 'bread'])
+
+    def test_least_recently_used_tries_are_evicted(self):
+        cache = SuggestionCache(max_nodes=14)
+        cache._load = lambda ownerId: PrefixTrie()
+
+        for ownerId in (1, 2):
+            cache.suggest(ownerId, 'a', 10)
+            cache.add(ownerId, 'apple')
+
+        cache.suggest(1, 'a', 10)
+        cache.add(3, 'ignored')
+        cache.suggest(3, 'a', 10)
+        cache.add(3, 'avocado')
+
+        self.assertEqual(list(cache._tries), [1, 3])
+        self.assertEqual(cache.size, 14)
+
+
+class TestSuggestCase(TestSearchAndPaginationBaseCase):
+    def setUp(self):
+        super(TestSuggestCase, self).setUp()
+        self.token = self.init_shoppinglists()
+        self.lists = {shl.name: shl.id for shl in ShoppingList.query}
+
+        for name in ['Birthday', 'Breakfast']:
+            for item in self.shoppingitems:
+                self.create_shoppingitem(self.token, self.lists[name], dict(
+                    name=item.name, price=item.price,
+                    quantity_description=item.quantity_description))
+
+    def suggest(self, prefix, **params):
+        url = url_for('shoppingitem_suggest', prefix=prefix, **params)
+        response = self.client.get(url, headers={self.header_name: self.token})
+        self.assert200(response)
+        return json.loads(response.get_data(as_text=True))['suggestions']
+
+    def test_suggestions_come_from_user_items(self):
+        self.assertEqual(self.suggest('b'), ['blueband', 'bread'])
+        self.assertEqual(self.suggest('b', limit=1), ['blueband'])
+
+    def test_suggestions_do_not_touch_database_once_built(self):
+        self.suggest('b')
+
+        with self.record_statements() as statements:
+            self.suggest('s')
+
+        self.assertFalse([s for s in statements if 'shopping_item' in s])
+
+    def test_suggestions_follow_item_changes(self):
+        self.suggest('b')
+
+        self.create_shoppingitem(self.token, self.lists['Lunch'], dict(
+            name='bagels', price=10, quantity_description='6'))
+        self.assertEqual(self.suggest('ba'), ['bagels'])
+
+        item = ShoppingList.query.get(self.lists['Lunch']).shopping_items.first()
+        self.update_shoppingitem(self.token, self.lists['Lunch'], item.id, dict(name='baguette'))
+        self.assertEqual(self.suggest('ba'), ['baguette'])
+
+        self.delete_shoppingitem(self.token, self.lists['Lunch'], item.id, 'baguette')
+        self.assertEqual(self.suggest('ba'), [])
+
+    def test_rolled_back_items_are_not_suggested(self):
+        self.suggest('b')
+        lunch = ShoppingList.query.get(self.lists['Lunch'])
+
+        with self.assertRaises(RuntimeError):
+            with unit_of_work():
+                lunch.add_item(ShoppingItem(name='bagels', price=10, quantity_description='6'))
+                suggestions.add(lunch.owner_id, 'bagels')
+                raise RuntimeError('failed')
+
+        self.assertEqual(self.suggest('ba'), [])
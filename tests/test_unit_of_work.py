@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module tests grouping model changes into one transaction.
+"""
+
+import contextlib
+
+from flask import json
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.db.base import atomic, in_unit_of_work, unit_of_work
+from app.models import ShoppingItem, ShoppingList
+from .shopping_base import TestShoppingItemsBaseCase
+
+
+class TestUnitOfWork(TestShoppingItemsBaseCase):
+    def setUp(self):
+        super(TestUnitOfWork, self).setUp()
+        self.register_user()
+        login_res = self.login_user()
+        self.token = json.loads(login_res.get_data(as_text=True))['data']['auth_token']
+
+        response = self.create_shoppinglist(self.token, dict(name='Breakfast'))
+        self.shl_id = json.loads(response.get_data(as_text=True))['data']['id']
+
+    @contextlib.contextmanager
+    def count_commits(self):
+        commits = []
+
+        def record(session):
+            # releasing a SAVEPOINT is reported as a commit too.
+            if not session.transaction.nested:
+                commits.append(session)
+
+        event.listen(Session, 'after_commit', record)
+
+        try:
+            yield commits
+
+        finally:
+            event.remove(Session, 'after_commit', record)
+
+    def test_changes_are_committed_once(self):
+        shoppinglist = ShoppingList.query.get(self.shl_id)
+
+        with self.count_commits() as commits:
+            with unit_of_work():
+                with unit_of_work():
+                    shoppinglist.description = 'eggs and toast'
+                    shoppinglist.save()
+
+                shoppinglist.add_item(ShoppingItem(
+                    name='eggs', price=10, quantity_description='1 crate', bought=False))
+
+                self.assertTrue(in_unit_of_work())
+
+        self.assertFalse(in_unit_of_work())
+        self.assertEqual(len(commits), 1)
+        self.assertEqual(ShoppingList.query.get(self.shl_id).item_count, 1)
+
+    def test_handled_conflict_keeps_the_unit_of_work(self):
+        shoppinglist = ShoppingList.query.get(self.shl_id)
+
+        with self.count_commits() as commits:
+            with unit_of_work():
+                shoppinglist.add_item(ShoppingItem(
+                    name='eggs', price=10, quantity_description='1 crate', bought=False))
+
+                with self.assertRaises(ShoppingList.ShoppingListExists):
+                    ShoppingList(name='Breakfast', owner_id=shoppinglist.owner_id).save()
+
+                ShoppingList(name='Lunch', owner_id=shoppinglist.owner_id).save()
+
+        self.assertEqual(len(commits), 1)
+        self.assertEqual(ShoppingList.query.get(self.shl_id).item_count, 1)
+        self.assertEqual(ShoppingList.query.get(self.shl_id).shopping_items.count(), 1)
+        self.assertEqual(ShoppingList.query.filter_by(owner_id=shoppinglist.owner_id).count(), 2)
+
+    def test_changes_are_rolled_back_on_error(self):
+        @atomic
+        def failing():
+            ShoppingList(name='Lunch', owner_id=ShoppingList.query.get(self.shl_id).owner_id).save()
+            raise RuntimeError('failed')
+
+        with self.assertRaises(RuntimeError):
+            failing()
+
+        self.assertFalse(in_unit_of_work())
+        self.assertIsNone(ShoppingList.query.filter_by(name='Lunch').first())
+
+    def test_save_outside_unit_of_work_commits(self):
+        shoppinglist = ShoppingList.query.get(self.shl_id)
+
+        with self.count_commits() as commits:
+            shoppinglist.description = 'toast'
+            shoppinglist.save()
+
+        self.assertEqual(len(commits), 1)
+
+    def test_item_views_commit_once(self):
+        with self.count_commits() as commits:
+            response = self.create_shoppingitem(self.token, self.shl_id, dict(
+                name='eggs', price=10, quantity_description='1 crate'))
+
+        self.assertStatus(response, 201)
+        self.assertEqual(len(commits), 1)